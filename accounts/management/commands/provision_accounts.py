@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from accounts.services import provision_missing
+
+
+class Command(BaseCommand):
+    help = (
+        "Crée les wallets (et enveloppes) des étudiants et les comptes des parents qui n'en ont pas encore "
+        "(comptes inscrits avant le provisionnement automatique)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500, help="Utilisateurs traités par paquet.")
+
+    def handle(self, *args, **options):
+        done = provision_missing(chunk_size=max(1, options["chunk_size"]))
+        self.stdout.write(
+            self.style.SUCCESS(f"{done['students']} étudiant(s) et {done['parents']} parent(s) provisionnés.")
+        )
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.11 on 2026-10-17 05:18
+
+from django.db import migrations, models
+
+from core.media import existing_derivatives, record_derivatives
+
+
+def backfill(apps, schema_editor):
+    # Dérivés générés avant la colonne : constatés une fois ici, plus jamais à la lecture.
+    User = apps.get_model("accounts", "User")
+    names = (
+        User.objects.exclude(avatar="").exclude(avatar__isnull=True)
+        .values_list("avatar", flat=True).distinct()
+    )
+    for name in list(names):
+        kinds = existing_derivatives(name)
+        if kinds:
+            record_derivatives(User, "avatar", name, kinds)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_avatar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='avatar_derivatives',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -11,4 +11,6 @@ class User(AbstractUser):
 
     role = models.CharField(max_length=20, choices=Role.choices, default=Role.STUDENT)
     avatar = models.ImageField(upload_to="avatars/", null=True, blank=True)
+    # Dérivés de l'avatar déjà générés (voir core.media).
+    avatar_derivatives = models.JSONField(default=list, blank=True)
     
\ No newline at end of file
@@ -1,6 +1,10 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from rest_framework import serializers
 
+from core.media import derivative_url, schedule_derivatives, store_upload
+from .services import provision_user
+
 User = get_user_model()
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -10,20 +14,37 @@ class RegisterSerializer(serializers.ModelSerializer):
         model = User
         fields = ["username", "email", "password", "role", "first_name", "last_name"]
 
+    @transaction.atomic
     def create(self, validated_data):
         password = validated_data.pop("password")
         user = User(**validated_data)
         user.set_password(password)
         user.save()
+        provision_user(user)
         return user
 
 class UserSerializer(serializers.ModelSerializer):
     avatar = serializers.ImageField(read_only=True)
+    avatar_thumbnail = serializers.SerializerMethodField()
     class Meta:
         model = User
-        fields = ["id", "username", "email", "role", "first_name", "last_name", "avatar"]
+        fields = ["id", "username", "email", "role", "first_name", "last_name", "avatar", "avatar_thumbnail"]
+
+    def get_avatar_thumbnail(self, obj) -> str | None:
+        return derivative_url(obj.avatar, "thumbnail", obj.avatar_derivatives, self.context.get("request"))
 
 class ProfileUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
-        fields = ["first_name", "last_name", "email", "avatar"]
\ No newline at end of file
+        fields = ["first_name", "last_name", "email", "avatar"]
+
+    def update(self, instance, validated_data):
+        avatar = validated_data.pop("avatar", None)
+        if avatar is not None:
+            # Rangé par empreinte : la même image renvoyée n'est pas réécrite.
+            instance.avatar.name = store_upload(avatar, "avatars")
+            instance.avatar_derivatives = []
+        instance = super().update(instance, validated_data)
+        if avatar is not None:
+            schedule_derivatives(instance.avatar.name, User, "avatar")
+        return instance
@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+
+from parent_account.services import provision_parent_account, provision_parent_accounts
+from wallet.models import WalletBucket
+from wallet.services import provision_wallet, provision_wallets
+
+User = get_user_model()
+
+
+def provision_user(user):
+    """Crée, selon le rôle, le wallet (étudiant) ou le compte parent. Appelé une fois, à l'inscription."""
+    if user.role == User.Role.STUDENT:
+        provision_wallet(user)
+    elif user.role == User.Role.PARENT:
+        provision_parent_account(user)
+
+
+def _chunks(ids, size):
+    for i in range(0, len(ids), size):
+        yield ids[i : i + size]
+
+
+def provision_missing(chunk_size: int = 500) -> dict:
+    """
+    Rattrapage pour les comptes créés avant le provisionnement à l'inscription : wallets / enveloppes
+    et comptes parents manquants, créés par paquets. Idempotent.
+    """
+    students = list(
+        User.objects.filter(role=User.Role.STUDENT)
+        .annotate(n_buckets=Count("wallet__buckets"))
+        .filter(n_buckets__lt=len(WalletBucket.Type.values))
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    parents = list(
+        User.objects.filter(role=User.Role.PARENT, parent_account__isnull=True)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    for ids in _chunks(students, chunk_size):
+        provision_wallets(ids)
+    for ids in _chunks(parents, chunk_size):
+        provision_parent_accounts(ids)
+    return {"students": len(students), "parents": len(parents)}
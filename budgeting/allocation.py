@@ -1,58 +1,52 @@
-from decimal import Decimal, ROUND_HALF_UP
-from .models import BudgetPlan
-
-Q = Decimal("0.01")
+from decimal import Decimal
 
-
-def _q(v: Decimal) -> Decimal:
-    return (v or Decimal("0")).quantize(Q, rounding=ROUND_HALF_UP)
+from core.money import Money, quantize
+from .models import BudgetPlan
 
 
 def compute_allocation(plan: BudgetPlan, deposit_amount: Decimal) -> dict:
-    amount = _q(deposit_amount)
+    # Calcul en centimes (Money) : arithmétique entière dans la boucle, un seul arrondi à l'entrée.
+    amount = Money.of(deposit_amount)
     remaining = amount
 
     bills_breakdown = []
-    bills_allocated = Decimal("0")
+    bills_allocated = Money()
 
-    bills = plan.bills.all().order_by("priority", "created_at")
+    # Tri en Python : réutilise les bills préchargées (prefetch_related) au lieu de relancer une requête.
+    bills = sorted(plan.bills.all(), key=lambda b: (b.priority, b.created_at))
     for bill in bills:
         if remaining <= 0:
             break
-        need = _q(bill.amount)
-        alloc = need if remaining >= need else remaining
-        alloc = _q(alloc)
+        need = Money.of(bill.amount)
+        alloc = min(need, remaining)
         if alloc > 0:
             bills_breakdown.append(
                 {"bill_id": bill.id, "title": bill.title, "need": str(need), "allocated": str(alloc)}
             )
             bills_allocated += alloc
             remaining -= alloc
-            remaining = _q(remaining)
 
-    savings_target = Decimal("0")
+    savings_target = Money()
     if plan.savings_mode == BudgetPlan.SavingsMode.AMOUNT:
-        savings_target = _q(plan.savings_amount)
+        savings_target = Money.of(plan.savings_amount)
     elif plan.savings_mode == BudgetPlan.SavingsMode.PERCENT:
-        savings_target = _q(amount * _q(plan.savings_percent) / Decimal("100"))
+        savings_target = amount.percent(quantize(plan.savings_percent))
 
-    savings_allocated = Decimal("0")
+    savings_allocated = Money()
     if remaining > 0 and savings_target > 0:
-        savings_allocated = savings_target if remaining >= savings_target else remaining
-        savings_allocated = _q(savings_allocated)
+        savings_allocated = min(savings_target, remaining)
         remaining -= savings_allocated
-        remaining = _q(remaining)
 
-    daily_allocated = _q(remaining)
+    daily_allocated = remaining
 
     return {
         "plan_id": plan.id,
         "deposit_amount": str(amount),
-        "bills_allocated": str(_q(bills_allocated)),
+        "bills_allocated": str(bills_allocated),
         "bills_breakdown": bills_breakdown,
-        "savings_target": str(_q(savings_target)),
-        "savings_allocated": str(_q(savings_allocated)),
-        "daily_allocated": str(_q(daily_allocated)),
+        "savings_target": str(savings_target),
+        "savings_allocated": str(savings_allocated),
+        "daily_allocated": str(daily_allocated),
         "currency": plan.currency,
-        "daily_limit": str(_q(plan.daily_limit)),
+        "daily_limit": str(quantize(plan.daily_limit)),
     }
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.11 on 2026-10-17 03:58
+
+import core.money
+from django.db import migrations, models
+from django.db.models import ExpressionWrapper, F, Value
+from django.db.models.functions import Round
+
+# Passage en centimes en trois temps, portable (SQLite / PostgreSQL) et réversible :
+# 1. colonnes élargies (le montant × 100 doit tenir), 2. montants × 100, 3. colonnes BIGINT (MoneyField).
+WIDE = models.DecimalField(decimal_places=2, max_digits=20)
+MONEY_FIELDS = {
+    "billitem": ["amount"],
+    "budgetplan": ["daily_limit", "savings_amount"],
+}
+
+
+def to_minor_units(apps, schema_editor):
+    for model_name, fields in MONEY_FIELDS.items():
+        model = apps.get_model("budgeting", model_name)
+        model.objects.update(**{f: Round(F(f) * 100) for f in fields})
+
+
+def from_minor_units(apps, schema_editor):
+    for model_name, fields in MONEY_FIELDS.items():
+        model = apps.get_model("budgeting", model_name)
+        model.objects.update(
+            **{f: ExpressionWrapper(F(f) / Value(100.0), output_field=WIDE) for f in fields}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgeting', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='billitem',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, max_digits=20),
+        ),
+        migrations.AlterField(
+            model_name='budgetplan',
+            name='daily_limit',
+            field=models.DecimalField(decimal_places=2, max_digits=20, default=0),
+        ),
+        migrations.AlterField(
+            model_name='budgetplan',
+            name='savings_amount',
+            field=models.DecimalField(decimal_places=2, max_digits=20, default=0),
+        ),
+        migrations.RunPython(to_minor_units, from_minor_units),
+        migrations.AlterField(
+            model_name='billitem',
+            name='amount',
+            field=core.money.MoneyField(decimal_places=2, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='budgetplan',
+            name='daily_limit',
+            field=core.money.MoneyField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='budgetplan',
+            name='savings_amount',
+            field=core.money.MoneyField(decimal_places=2, default=0, max_digits=14),
+        ),
+    ]
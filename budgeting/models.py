@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.db import models
+from core.money import MoneyField
 
 User = settings.AUTH_USER_MODEL
 
@@ -17,10 +18,10 @@ class BudgetPlan(models.Model):
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name="budget_plans")
     name = models.CharField(max_length=80, default="My Monthly Plan")
     currency = models.CharField(max_length=8, default="XAF")
-    daily_limit = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    daily_limit = MoneyField(max_digits=12, default=0)
 
     savings_mode = models.CharField(max_length=10, choices=SavingsMode.choices, default=SavingsMode.NONE)
-    savings_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    savings_amount = MoneyField(default=0)
     savings_percent = models.DecimalField(max_digits=5, decimal_places=2, default=0)
 
     status = models.CharField(max_length=10, choices=Status.choices, default=Status.INACTIVE)
@@ -37,7 +38,7 @@ class BudgetPlan(models.Model):
 class BillItem(models.Model):
     plan = models.ForeignKey(BudgetPlan, on_delete=models.CASCADE, related_name="bills")
     title = models.CharField(max_length=80)
-    amount = models.DecimalField(max_digits=14, decimal_places=2)
+    amount = MoneyField()
     due_day = models.PositiveSmallIntegerField(null=True, blank=True)
     priority = models.PositiveSmallIntegerField(default=1)
     is_mandatory = models.BooleanField(default=True)
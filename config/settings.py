@@ -14,6 +14,8 @@ from pathlib import Path
 import os
 from dotenv import load_dotenv
 from decimal import Decimal
+from datetime import timedelta
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -95,6 +97,16 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # SQLite n'a pas de verrou de ligne (`select_for_update` y est sans effet) : chaque transaction
+        # prend le verrou d'écriture dès BEGIN et attend (timeout, en secondes) qu'il se libère. En mode
+        # DEFERRED, deux transactions qui lisent puis écrivent échouent aussitôt ("database is locked").
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': int(os.getenv('SQLITE_TIMEOUT', '30')),
+        },
+        # Base de test sur fichier (et non en mémoire partagée) : les tests multi-threads
+        # (wallet.tests.ConcurrentMovementTests) ouvrent une connexion par thread.
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -142,6 +154,7 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
 
 AUTH_USER_MODEL = "accounts.User"
 
@@ -161,4 +174,54 @@ SPECTACULAR_SETTINGS = {
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
-PLATFORM_FEE_PERCENT = Decimal("2.5")
\ No newline at end of file
+# Fichiers envoyés (cf. core/media.py) : reçus et avatars écrits sur disque par morceaux pendant la
+# réception, rangés par SHA-256 ; vignette et aperçu JPEG générés hors requête par un pool de threads.
+FILE_UPLOAD_HANDLERS = [
+    "django.core.files.uploadhandler.MemoryFileUploadHandler",
+    "core.media.HashingUploadHandler",
+]
+MEDIA_ASYNC = os.getenv("MEDIA_ASYNC", "True") == "True"
+MEDIA_WORKERS = 2
+MEDIA_THUMBNAIL_SIZE = 320
+MEDIA_PREVIEW_SIZE = 1600
+MEDIA_JPEG_QUALITY = 85
+
+PLATFORM_FEE_PERCENT = Decimal("2.5")
+
+LEDGER_PAGE_SIZE = 50
+LEDGER_MAX_PAGE_SIZE = 200
+
+BULK_DEPOSIT_MAX_ITEMS = 200
+EXPENSE_BULK_MAX_ITEMS = 200
+
+LEDGER_EXPORT_CHUNK_SIZE = 2000
+
+# Idempotency-Key : durée de conservation des réponses rejouables.
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+# Une clé restée "en cours" plus longtemps (processus tué) peut être reprise.
+IDEMPOTENCY_IN_PROGRESS_TIMEOUT = timedelta(minutes=2)
+
+# Cache partagé par tous les processus (fichiers sous CACHE_LOCATION) : les jetons de version des
+# payloads wallet et des catégories (wallet/cache.py, expenses/cache.py) y sont remplacés à chaque
+# écriture, et chaque worker doit voir le nouveau jeton. Redis / memcached conviennent aussi.
+# Un cache locmem n'est sûr qu'avec un seul processus : un autre worker garderait l'ancien jeton et
+# servirait un solde périmé jusqu'à WALLET_CACHE_TIMEOUT.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", str(BASE_DIR / ".cache")),
+    }
+}
+WALLET_CACHE_TIMEOUT = 300
+# Hits / misses comptés en mémoire par processus, ajoutés en base (CacheCounter) par paquets.
+WALLET_CACHE_STATS_FLUSH_EVERY = 100
+WALLET_CACHE_STATS_FLUSH_INTERVAL = 60
+# Catégories personnelles gardées en mémoire (LRU par processus, cf. expenses/cache.py).
+EXPENSE_CATEGORY_CACHE_SIZE = 1024
+
+# Écritures de ledger groupées (cf. wallet/writer.py) : un thread écrivain par processus valide
+# jusqu'à LEDGER_WRITER_BATCH_SIZE mouvements par transaction, en attendant au plus LEDGER_WRITER_MAX_DELAY.
+LEDGER_GROUP_COMMIT = os.getenv("LEDGER_GROUP_COMMIT", "False") == "True"
+LEDGER_WRITER_BATCH_SIZE = 50
+LEDGER_WRITER_MAX_DELAY = timedelta(milliseconds=5)
+LEDGER_WRITER_TIMEOUT = timedelta(seconds=30)
@@ -0,0 +1,35 @@
+"""
+Dates locales converties en bornes d'instants `[début, fin)` (aware, fuseau courant).
+
+`occurred_at__date__gte=...` convertit la colonne à chaque ligne : l'index `(owner, occurred_at)` n'est
+plus utilisable et toutes les lignes du propriétaire sont lues. Comparer la colonne à des instants
+(`occurred_at__gte=day_start(d)`, `occurred_at__lt=day_start(d + 1 jour)`) garde un parcours
+d'intervalle de l'index, déjà trié pour la pagination.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+
+def day_start(day) -> datetime:
+    """Minuit (fuseau courant) du jour donné."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def day_range(date_from=None, date_to=None):
+    """Bornes `[date_from 00:00, lendemain de date_to 00:00)` ; None pour une borne absente."""
+    start = day_start(date_from) if date_from else None
+    end = day_start(date_to + timedelta(days=1)) if date_to else None
+    return start, end
+
+
+def date_range_q(field: str, date_from=None, date_to=None) -> Q:
+    """Filtre `field` sur les jours locaux `date_from` à `date_to` inclus (Q vide sans borne)."""
+    start, end = day_range(date_from, date_to)
+    q = Q()
+    if start:
+        q &= Q(**{f"{field}__gte": start})
+    if end:
+        q &= Q(**{f"{field}__lt": end})
+    return q
@@ -0,0 +1,77 @@
+"""
+`UPDATE ... RETURNING` pour les écritures de solde, et taille des tables pour les mesures.
+
+Un `QuerySet.update(balance=F("balance") + ...)` ne rend que le nombre de lignes : connaître le nouveau
+solde (pour `balance_after`) demandait soit une relecture, soit une lecture préalable sous verrou.
+`update_returning` fait les deux en une instruction : la ligne modifiée revient telle qu'écrite.
+
+SQLite (3.35+) et PostgreSQL savent le faire. Ailleurs, repli en trois requêtes : clés verrouillées
+(SELECT ... FOR UPDATE), UPDATE par clé, relecture.
+"""
+from django.db import connections, transaction
+from django.db.models.sql import UpdateQuery
+
+RETURNING_VENDORS = {"sqlite", "postgresql"}
+
+
+def update_returning(queryset, **values) -> list:
+    """Comme `queryset.update(**values)`, mais renvoie les instances modifiées (valeurs après UPDATE)."""
+    queryset = queryset.all()
+    queryset._for_write = True
+    model, db = queryset.model, queryset.db
+    connection = connections[db]
+
+    if connection.vendor not in RETURNING_VENDORS:
+        pks = list(queryset.select_for_update().values_list("pk", flat=True))
+        model._base_manager.using(db).filter(pk__in=pks).update(**values)
+        return list(model._base_manager.using(db).filter(pk__in=pks))
+
+    query = queryset.query.chain(UpdateQuery)
+    query.add_update_values(values)
+    query.clear_select_clause()
+    sql, params = query.get_compiler(db).as_sql()
+
+    fields = model._meta.concrete_fields
+    columns = [field.get_col(model._meta.db_table) for field in fields]
+    sql += " RETURNING " + ", ".join(connection.ops.quote_name(field.column) for field in fields)
+    with transaction.mark_for_rollback_on_error(using=db), connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    converters = [
+        (col, connection.ops.get_db_converters(col) + col.get_db_converters(connection)) for col in columns
+    ]
+    instances = []
+    for row in rows:
+        converted = []
+        for value, (col, funcs) in zip(row, converters):
+            for func in funcs:
+                value = func(value, col, connection)
+            converted.append(value)
+        instances.append(model.from_db(db, [field.attname for field in fields], converted))
+    return instances
+
+
+def table_sizes(tables) -> dict:
+    """
+    Octets occupés sur disque par chaque table et par ses index : {table: (table, index)}.
+    SQLite : table virtuelle `dbstat` ; PostgreSQL : `pg_relation_size` / `pg_indexes_size`.
+    """
+    connection = connections["default"]
+    sizes = {}
+    with connection.cursor() as cursor:
+        for table in tables:
+            if connection.vendor == "postgresql":
+                cursor.execute("SELECT pg_relation_size(%s), pg_indexes_size(%s)", [table, table])
+                sizes[table] = tuple(cursor.fetchone())
+                continue
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s", [table])
+            indexes = [row[0] for row in cursor.fetchall()]
+            cursor.execute(
+                "SELECT name, SUM(pgsize) FROM dbstat WHERE name IN (%s) GROUP BY name"
+                % ", ".join(["%s"] * (len(indexes) + 1)),
+                [table, *indexes],
+            )
+            pages = dict(cursor.fetchall())
+            sizes[table] = (pages.get(table, 0), sum(pages.get(name, 0) for name in indexes))
+    return sizes
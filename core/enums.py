@@ -0,0 +1,48 @@
+"""
+Colonnes de type (enveloppe, sens, type de mouvement) stockées en SMALLINT.
+
+`EnumField` garde les valeurs texte des TextChoices côté Python : filtres (`txn_type="EXPENSE"`),
+`values()`, serializers et API voient toujours "DAILY" / "DEBIT" / "EXPENSE". Seule la base stocke
+le code entier (2 octets au lieu de la chaîne, dans chaque ligne et chaque index composite).
+
+Les codes suivent l'ordre de déclaration des choix (1, 2, 3...) et sont enregistrés dans les
+migrations : ajouter une valeur en fin de liste seulement, ne jamais réordonner.
+"""
+from django.db import models
+
+
+class EnumField(models.CharField):
+    def __init__(self, enum=None, *args, codes=None, **kwargs):
+        if enum is not None:
+            kwargs["choices"] = enum.choices
+            kwargs.setdefault("max_length", max(len(value) for value in enum.values))
+        if codes is None:
+            codes = {value: i for i, (value, _) in enumerate(kwargs.get("choices") or [], start=1)}
+        self.codes = dict(codes)
+        self.values_by_code = {code: value for value, code in self.codes.items()}
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs["codes"] = self.codes
+        return name, path, args, kwargs
+
+    def get_internal_type(self):
+        return "SmallIntegerField"
+
+    def from_db_value(self, value, expression, connection):
+        if value is None or isinstance(value, str):
+            return value
+        return self.values_by_code[value]
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if hasattr(value, "as_sql"):
+            return value
+        if not prepared:
+            value = self.get_prep_value(value)
+        if value is None or value == "":
+            return None
+        try:
+            return self.codes[value]
+        except KeyError:
+            raise ValueError(f"{self.name}: unknown value {value!r}.")
@@ -0,0 +1,209 @@
+"""
+Fichiers envoyés (reçus de dépense, avatars) : stockage par empreinte et dérivés produits hors requête.
+
+- Réception : `HashingUploadHandler` écrit le corps multipart sur disque par morceaux (jamais en
+  mémoire au-delà de FILE_UPLOAD_MAX_MEMORY_SIZE) et calcule le SHA-256 au passage.
+- Stockage : `store_upload` range l'original sous `<préfixe>/<aa>/<sha256>.<ext>`. Un contenu déjà
+  connu n'est pas réécrit : la ligne pointe sur le fichier existant. Ces noms ne changent jamais de
+  contenu ; le serveur frontal peut les servir avec un cache long.
+- Dérivés : une vignette et un aperçu JPEG normalisé (orientation EXIF appliquée, RGB, taille bornée)
+  sous `derived/<type>/<nom de l'original>.jpg`, générés par Pillow dans un pool de threads après le
+  COMMIT (`schedule_derivatives`). Les types générés sont alors notés sur les lignes qui portent le
+  fichier (colonne `<champ>_derivatives`) : les URL se construisent sans interroger le stockage.
+  Tant qu'un dérivé n'est pas noté, son URL vaut None et le client garde l'original. Un fichier qui
+  n'est pas une image (PDF) n'a pas de dérivé.
+
+`MEDIA_ASYNC = False` génère les dérivés dans la requête (tests, scripts).
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import connection, transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    """Fichier temporaire sur disque + SHA-256 calculé pendant la réception (attribut `sha256`)."""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self.digest.hexdigest()
+        return file
+
+
+def file_sha256(file) -> str:
+    digest = getattr(file, "sha256", None)
+    if digest:
+        return digest
+    h = hashlib.sha256()
+    for chunk in file.chunks():
+        h.update(chunk)
+    return h.hexdigest()
+
+
+def content_name(file, prefix) -> str:
+    digest = file_sha256(file)
+    ext = os.path.splitext(file.name or "")[1].lower()
+    ext = ext if re.fullmatch(r"\.[a-z0-9]{1,8}", ext) else ""
+    return f"{prefix}/{digest[:2]}/{digest}{ext}"
+
+
+def store_upload(file, prefix) -> str:
+    """Enregistre `file` sous son nom d'empreinte (une seule copie par contenu) et renvoie ce nom."""
+    name = content_name(file, prefix)
+    if not default_storage.exists(name):
+        file.seek(0)
+        saved = default_storage.save(name, file)
+        if saved != name:
+            # Même contenu enregistré en parallèle : le premier fichier suffit.
+            default_storage.delete(saved)
+    return name
+
+
+def derivative_name(name, kind) -> str:
+    return f"derived/{kind}/{os.path.splitext(name)[0]}.jpg"
+
+
+def derivative_sizes() -> dict:
+    return {
+        "thumbnail": getattr(settings, "MEDIA_THUMBNAIL_SIZE", 320),
+        "preview": getattr(settings, "MEDIA_PREVIEW_SIZE", 1600),
+    }
+
+
+def derivative_url(file, kind, available, request=None):
+    """URL du dérivé `kind` de `file` (FieldFile), ou None s'il n'est pas dans `available` (types notés)."""
+    if not file or kind not in (available or ()):
+        return None
+    url = default_storage.url(derivative_name(file.name, kind))
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def existing_derivatives(name) -> list:
+    """Types de dérivés présents dans le stockage pour l'original `name`."""
+    return [kind for kind in derivative_sizes() if default_storage.exists(derivative_name(name, kind))]
+
+
+def record_derivatives(model, field, name, kinds):
+    """Note `kinds` sur toutes les lignes de `model` dont le champ fichier `field` vaut `name`."""
+    return model._default_manager.filter(**{field: name}).update(**{f"{field}_derivatives": sorted(kinds)})
+
+
+def build_derivatives(name) -> list:
+    """Génère les dérivés manquants de l'original `name` ; renvoie les types disponibles ensuite."""
+    present = existing_derivatives(name)
+    sizes = {kind: size for kind, size in derivative_sizes().items() if kind not in present}
+    if not sizes:
+        return present
+    quality = getattr(settings, "MEDIA_JPEG_QUALITY", 85)
+    written = []
+    try:
+        with default_storage.open(name, "rb") as source, Image.open(source) as image:
+            if image.mode in ("1", "P"):
+                image = _flatten(image)
+            # Réduction avant tout le reste ; reducing_gap=1 laisse le décodeur JPEG lire directement à
+            # l'échelle 1/2, 1/4 ou 1/8 (draft) au lieu de décoder la pleine résolution.
+            largest = max(sizes.values())
+            image.thumbnail((largest, largest), reducing_gap=1.0)
+            image = ImageOps.exif_transpose(image)
+            if image.mode != "RGB":
+                image = _flatten(image)
+            for kind, size in sorted(sizes.items(), key=lambda item: -item[1]):
+                image.thumbnail((size, size))
+                buffer = BytesIO()
+                image.save(buffer, "JPEG", quality=quality, optimize=True, progressive=True)
+                target = derivative_name(name, kind)
+                saved = default_storage.save(target, ContentFile(buffer.getvalue()))
+                if saved != target:
+                    default_storage.delete(saved)
+                written.append(kind)
+    except (UnidentifiedImageError, Image.DecompressionBombError):
+        # Pas une image exploitable (PDF, fichier démesuré) : l'original reste seul.
+        pass
+    return present + written
+
+
+def _flatten(image):
+    """Transparence posée sur fond blanc (le JPEG n'a pas de canal alpha)."""
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def _executor_instance():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "MEDIA_WORKERS", 2), thread_name_prefix="media"
+        )
+    return _executor
+
+
+def _run(name, model, field, in_pool=False):
+    try:
+        record_derivatives(model, field, name, build_derivatives(name))
+    except Exception:
+        logger.exception("Dérivés non générés pour %s", name)
+    finally:
+        if in_pool:
+            connection.close()
+        with _lock:
+            _pending.discard((name, model, field))
+
+
+def schedule_derivatives(name, model, field):
+    """
+    Demande les dérivés de `name` après le COMMIT de la transaction courante (pool de threads), puis
+    les note sur les lignes de `model` qui portent ce fichier dans `field`.
+    """
+    if not name:
+        return
+    if not getattr(settings, "MEDIA_ASYNC", True):
+        transaction.on_commit(lambda: _run(name, model, field))
+        return
+
+    def submit():
+        key = (name, model, field)
+        with _lock:
+            if key in _pending:
+                return
+            _pending.add(key)
+            executor = _executor_instance()
+        executor.submit(_run, name, model, field, True)
+
+    transaction.on_commit(submit)
+
+
+def wait_for_derivatives():
+    """Attend la fin des dérivés en cours (commandes de maintenance, mesures)."""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
@@ -0,0 +1,145 @@
+"""
+Montants : représentation commune à toutes les apps.
+
+En base, les montants sont des entiers en unités mineures (centimes) : colonnes BIGINT via `MoneyField`.
+Les SUM et les mises à jour `F("balance") + ...` restent donc exactes et entières (SQLite stocke sinon
+les décimaux en REAL). Côté Python, le champ rend un `Decimal` à 2 décimales :
+serializers, formulaires et réponses de l'API ne changent pas.
+
+`Money` sert aux calculs en boucle (répartition d'un dépôt, frais) : arithmétique entière,
+un seul arrondi à l'entrée.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+from functools import total_ordering
+
+from django.db import models
+from django.db.models import ExpressionWrapper, Value
+
+CENT = Decimal("0.01")
+MINOR_UNITS = 100
+
+
+def quantize(v) -> Decimal:
+    """Arrondi au centime (demi vers le haut) ; None → 0.00."""
+    return Decimal(v or 0).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def to_minor(v) -> int:
+    if isinstance(v, Money):
+        return v.minor
+    return int((Decimal(v or 0) * MINOR_UNITS).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+
+def from_minor(minor) -> Decimal:
+    return Decimal(int(round(minor))).scaleb(-2)
+
+
+@total_ordering
+class Money:
+    __slots__ = ("minor",)
+
+    def __init__(self, minor: int = 0):
+        self.minor = int(minor)
+
+    @classmethod
+    def of(cls, amount) -> "Money":
+        return cls(to_minor(amount))
+
+    @property
+    def amount(self) -> Decimal:
+        return from_minor(self.minor)
+
+    def percent(self, pct) -> "Money":
+        """`pct` % du montant, arrondi au centime."""
+        return Money.of(self.amount * Decimal(pct) / 100)
+
+    def __add__(self, other):
+        if isinstance(other, Money):
+            return Money(self.minor + other.minor)
+        if other == 0:
+            return self
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, Money):
+            return Money(self.minor - other.minor)
+        return NotImplemented
+
+    def __neg__(self):
+        return Money(-self.minor)
+
+    def __eq__(self, other):
+        if isinstance(other, Money):
+            return self.minor == other.minor
+        if other == 0:
+            return self.minor == 0
+        return NotImplemented
+
+    def __lt__(self, other):
+        if isinstance(other, Money):
+            return self.minor < other.minor
+        if other == 0:
+            return self.minor < 0
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.minor)
+
+    def __bool__(self):
+        return self.minor != 0
+
+    def __str__(self):
+        return str(self.amount)
+
+    def __repr__(self):
+        return f"Money({self.amount})"
+
+
+class MoneyField(models.DecimalField):
+    """
+    Montant stocké en BIGINT (centimes), exposé en `Decimal` à 2 décimales.
+    Dans une expression, passer les montants par `money_value()` pour qu'ils soient convertis en centimes,
+    et envelopper le calcul dans `money_expr()` pour que le résultat soit relu en montant.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("max_digits", 14)
+        kwargs["decimal_places"] = 2
+        super().__init__(*args, **kwargs)
+
+    def get_internal_type(self):
+        return "BigIntegerField"
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return from_minor(value)
+
+    def get_prep_value(self, value):
+        if isinstance(value, Money):
+            return value.amount
+        return super().get_prep_value(value)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if hasattr(value, "as_sql"):
+            return value
+        if not prepared:
+            value = self.get_prep_value(value)
+        if value is None:
+            return value
+        return to_minor(value)
+
+
+def money_value(amount) -> Value:
+    """Montant littéral pour une expression ORM (`F("balance") + money_value(x)`), converti en centimes."""
+    return Value(amount.amount if isinstance(amount, Money) else amount, output_field=MoneyField())
+
+
+def money_expr(expression) -> ExpressionWrapper:
+    """
+    Expression sur des montants (`F("balance") + money_value(x)`) typée MoneyField : sans cela, Django
+    la type en DecimalField générique et un annotate / aggregate rend les centimes tels quels.
+    """
+    return ExpressionWrapper(expression, output_field=MoneyField())
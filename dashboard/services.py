@@ -4,8 +4,8 @@ from datetime import timedelta
 from django.db.models import Sum
 from django.utils import timezone
 
-from wallet.models import WalletTransaction, WalletBucket
-from wallet.services import get_or_create_wallet_for_student, spent_today
+from wallet.models import WalletBucket, WalletDailySpend, WalletMonthlyRollup, WalletTransaction
+from wallet.services import get_wallet_for_student, spent_today
 from expenses.services import summary_for_student
 from relationships.models import ParentStudentLink
 
@@ -26,7 +26,7 @@ def student_dashboard(student, date_from=None, date_to=None):
     today = timezone.localdate()
     ms = month_start(today)
 
-    wallet = get_or_create_wallet_for_student(student)
+    wallet = get_wallet_for_student(student)
     buckets = {b.bucket_type: b.balance for b in wallet.buckets.all()}
 
     daily_balance = buckets.get(WalletBucket.Type.DAILY, Decimal("0"))
@@ -38,14 +38,13 @@ def student_dashboard(student, date_from=None, date_to=None):
     daily_remaining_today = (daily_limit - spent_today_amount) if daily_limit > 0 else None
 
     total_month_expenses = (
-        WalletTransaction.objects.filter(
+        WalletMonthlyRollup.objects.filter(
             wallet=wallet,
+            month=ms,
             txn_type=WalletTransaction.TxnType.EXPENSE,
             direction=WalletTransaction.Direction.DEBIT,
-            created_at__date__gte=ms,
-            created_at__date__lte=today,
         )
-        .aggregate(s=Sum("amount"))
+        .aggregate(s=Sum("total"))
         .get("s")
         or Decimal("0")
     )
@@ -57,13 +56,7 @@ def student_dashboard(student, date_from=None, date_to=None):
 
     d7 = last_7_days_start(today)
     total_7d = (
-        WalletTransaction.objects.filter(
-            wallet=wallet,
-            txn_type=WalletTransaction.TxnType.EXPENSE,
-            direction=WalletTransaction.Direction.DEBIT,
-            created_at__date__gte=d7,
-            created_at__date__lte=today,
-        )
+        WalletDailySpend.objects.filter(wallet=wallet, day__gte=d7, day__lte=today)
         .aggregate(s=Sum("amount"))
         .get("s")
         or Decimal("0")
@@ -103,35 +96,22 @@ def parent_student_dashboard(parent, student, date_from=None, date_to=None):
     today = timezone.localdate()
     ms = month_start(today)
 
-    wallet = get_or_create_wallet_for_student(student)
-
-    sent_this_month = (
-        WalletTransaction.objects.filter(
-            wallet=wallet,
-            actor=parent,
-            txn_type=WalletTransaction.TxnType.DEPOSIT,
-            direction=WalletTransaction.Direction.CREDIT,
-            created_at__date__gte=ms,
-            created_at__date__lte=today,
-        )
-        .aggregate(s=Sum("amount"))
-        .get("s")
-        or Decimal("0")
-    )
+    wallet = get_wallet_for_student(student)
 
-    repartition = (
-        WalletTransaction.objects.filter(
+    # Une seule lecture des totaux mensuels : la répartition par enveloppe donne aussi le total envoyé.
+    repartition = list(
+        WalletMonthlyRollup.objects.filter(
             wallet=wallet,
             actor=parent,
+            month=ms,
             txn_type=WalletTransaction.TxnType.DEPOSIT,
             direction=WalletTransaction.Direction.CREDIT,
-            created_at__date__gte=ms,
-            created_at__date__lte=today,
         )
         .values("bucket_type")
-        .annotate(total=Sum("amount"))
-        .order_by()
+        .annotate(total=Sum("total"))
+        .order_by("bucket_type")
     )
+    sent_this_month = sum((r["total"] for r in repartition), Decimal("0"))
 
     expense_summary = summary_for_student(student, date_from=date_from, date_to=date_to)
     stu_dash = student_dashboard(student, date_from=date_from, date_to=date_to)
@@ -0,0 +1,88 @@
+"""
+Cache des catégories de dépense (résolution sans requête lors de la création d'une dépense).
+
+- Catégories par défaut (globales) : chargées une fois par processus et gardées dans une structure
+  immuable. Elles sont créées au `migrate` (signal `post_migrate`, cf. apps.py), qui vide aussi ce
+  cache ; une modification faite ailleurs (admin) n'est vue qu'après `reset_category_cache()` ou un
+  redémarrage.
+- Catégories personnelles : LRU en mémoire, clé (étudiant, version). La version est un jeton du cache
+  Django remplacé après commit à chaque création de catégorie (`bump_category_version`), comme pour
+  les payloads wallet (cf. wallet/cache.py) : avec le cache partagé par défaut (fichier, ou redis),
+  tous les processus voient la nouvelle catégorie à leur prochaine lecture. Avec un cache locmem, les
+  autres processus ne la voient pas tant que leur entrée LRU n'est pas évincée.
+"""
+from collections import OrderedDict, namedtuple
+from threading import Lock
+from types import MappingProxyType
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import ExpenseCategory
+
+CategorySet = namedtuple("CategorySet", ["categories", "by_id", "by_slug"])
+
+_defaults = None
+_custom = OrderedDict()
+_lock = Lock()
+
+
+def _freeze(categories) -> CategorySet:
+    categories = tuple(categories)
+    return CategorySet(
+        categories,
+        MappingProxyType({c.id: c for c in categories}),
+        MappingProxyType({c.slug: c for c in categories}),
+    )
+
+
+def _version_key(student_id):
+    return f"expense-categories:{student_id}:version"
+
+
+def category_version(student_id) -> str:
+    key = _version_key(student_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_category_version(student_id):
+    """Invalide les catégories personnelles de l'étudiant une fois la transaction courante validée."""
+    transaction.on_commit(lambda: cache.set(_version_key(student_id), uuid4().hex, timeout=None))
+
+
+def default_categories() -> CategorySet:
+    global _defaults
+    if _defaults is None:
+        _defaults = _freeze(ExpenseCategory.objects.filter(owner__isnull=True).order_by("name"))
+    return _defaults
+
+
+def student_categories(student_id) -> CategorySet:
+    key = (student_id, category_version(student_id))
+    with _lock:
+        entry = _custom.get(key)
+        if entry is not None:
+            _custom.move_to_end(key)
+            return entry
+
+    entry = _freeze(ExpenseCategory.objects.filter(owner_id=student_id).order_by("name"))
+    with _lock:
+        _custom[key] = entry
+        _custom.move_to_end(key)
+        # Les entrées d'anciennes versions ne sont plus lues : elles sortent par l'ancienneté.
+        while len(_custom) > getattr(settings, "EXPENSE_CATEGORY_CACHE_SIZE", 1024):
+            _custom.popitem(last=False)
+    return entry
+
+
+def reset_category_cache():
+    global _defaults
+    with _lock:
+        _defaults = None
+        _custom.clear()
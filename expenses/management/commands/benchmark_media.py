@@ -0,0 +1,126 @@
+import statistics
+import time
+from decimal import Decimal
+from io import BytesIO
+from uuid import uuid4
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from django.urls import resolve
+from PIL import Image
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.media import derivative_name, derivative_sizes, wait_for_derivatives
+from expenses.cache import default_categories
+from expenses.models import Expense
+from wallet.models import WalletBucket, WalletTransaction
+from wallet.services import credit, lock_for_movement, provision_wallets
+
+User = get_user_model()
+
+CREATE_URL = "/api/expenses/me/create/"
+LIST_URL = "/api/expenses/me/?page_size={n}"
+
+
+def sample_photo(width) -> bytes:
+    """JPEG de la taille d'une photo de téléphone (bruit lissé : se compresse comme une vraie photo)."""
+    height = width * 3 // 4
+    channels = [Image.effect_noise((width // 8, height // 8), 64).resize((width, height), Image.Resampling.BICUBIC)
+                for _ in range(3)]
+    buffer = BytesIO()
+    Image.merge("RGB", channels).save(buffer, "JPEG", quality=92)
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure l'envoi de reçus (latence de POST /api/expenses/me/create/) avec dérivés générés dans la requête "
+        "(inline) ou par le pool (pool), les octets que la liste fait télécharger (originaux vs vignettes) et sa "
+        "durée de réponse. "
+        "Travaille sur un étudiant temporaire, supprimé à la fin avec ses fichiers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--uploads", type=int, default=10, help="Envois par mode.")
+        parser.add_argument("--width", type=int, default=4000, help="Largeur de la photo envoyée (px).")
+        parser.add_argument("--mode", choices=["both", "inline", "pool"], default="both")
+
+    def handle(self, *args, **options):
+        uploads = max(1, options["uploads"])
+        modes = ["inline", "pool"] if options["mode"] == "both" else [options["mode"]]
+        photo = sample_photo(options["width"])
+        self.stdout.write(f"photo : {options['width']}px, {len(photo) / 1024:.0f} Ko")
+
+        student = User.objects.create(username=f"bench-{uuid4().hex[:12]}", role=User.Role.STUDENT)
+        wallet = provision_wallets([student.id])[student.id]
+        with transaction.atomic():
+            lock_for_movement(wallet_ids=[wallet.id], bucket_types=[WalletBucket.Type.DAILY])
+            credit(wallet, None, WalletBucket.Type.DAILY, Decimal("1000000"), WalletTransaction.TxnType.ADJUSTMENT, "benchmark")
+        category = default_categories().categories[0]
+        factory = APIRequestFactory()
+        names = []
+        try:
+            with override_settings(ALLOWED_HOSTS=["testserver"]):
+                for mode in modes:
+                    with override_settings(MEDIA_ASYNC=mode == "pool"):
+                        timings = [self._upload(factory, student, category, photo, names) for _ in range(uploads)]
+                        start = time.perf_counter()
+                        wait_for_derivatives()
+                        drain = time.perf_counter() - start
+                    timings.sort()
+                    self.stdout.write(
+                        f"{mode:>6} : médiane {statistics.median(timings) * 1000:.0f} ms, "
+                        f"max {timings[-1] * 1000:.0f} ms par envoi ; file vidée en {drain * 1000:.0f} ms"
+                    )
+                self._bytes_served(factory, student, uploads * len(modes))
+        finally:
+            wait_for_derivatives()
+            for name in names:
+                for target in [name] + [derivative_name(name, kind) for kind in derivative_sizes()]:
+                    default_storage.delete(target)
+            User.objects.filter(id=student.id).delete()
+
+    def _upload(self, factory, student, category, photo, names) -> float:
+        # Octets ajoutés après la fin du JPEG : contenu (donc empreinte) différent à chaque envoi.
+        receipt = SimpleUploadedFile("receipt.jpg", photo + uuid4().bytes, content_type="image/jpeg")
+        data = {"amount": "1.00", "bucket_type": "DAILY", "category_slug": category.slug, "receipt": receipt}
+        request = factory.post(CREATE_URL, data, format="multipart")
+        force_authenticate(request, user=student)
+        match = resolve(CREATE_URL)
+        start = time.perf_counter()
+        response = match.func(request)
+        elapsed = time.perf_counter() - start
+        request.close()
+        if response.status_code != 201:
+            raise RuntimeError(f"HTTP {response.status_code} : {response.data}")
+        names.append(Expense.objects.get(id=response.data["id"]).receipt.name)
+        return elapsed
+
+    def _bytes_served(self, factory, student, count):
+        url = LIST_URL.format(n=count)
+        request = factory.get(url)
+        force_authenticate(request, user=student)
+        match = resolve(url.split("?")[0])
+        timings = []
+        for _ in range(5):
+            start = time.perf_counter()
+            response = match.func(request)
+            response.render()
+            timings.append(time.perf_counter() - start)
+        rows = response.data["results"]
+
+        def size(url):
+            if not url:
+                return 0
+            return default_storage.size(url.split(default_storage.base_url, 1)[1])
+
+        originals = sum(size(row["receipt"]) for row in rows)
+        thumbnails = sum(size(row["receipt_thumbnail"]) for row in rows)
+        self.stdout.write(
+            f"liste ({len(rows)} dépenses) : originaux {originals / 1024:.0f} Ko, "
+            f"vignettes {thumbnails / 1024:.0f} Ko ; réponse en {statistics.median(timings) * 1000:.1f} ms (médiane)"
+        )
@@ -0,0 +1,49 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from core.media import build_derivatives, record_derivatives
+from expenses.models import Expense
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère les dérivés JPEG manquants (vignette, aperçu) des reçus et avatars déjà enregistrés "
+        "(fichiers envoyés avant le pipeline média, ou dérivés perdus) et les note sur les lignes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Threads Pillow en parallèle.")
+
+    def handle(self, *args, **options):
+        sources = [(Expense, "receipt"), (User, "avatar")]
+        names = {
+            (model, field, name)
+            for model, field in sources
+            for name in model.objects.exclude(Q(**{field: ""}) | Q(**{f"{field}__isnull": True}))
+            .values_list(field, flat=True)
+            .distinct()
+        }
+
+        recorded = failed = 0
+        with ThreadPoolExecutor(max_workers=max(1, options["workers"]), thread_name_prefix="media") as pool:
+            futures = {key: pool.submit(build_derivatives, key[2]) for key in sorted(names, key=lambda k: k[2])}
+            for (model, field, name), future in futures.items():
+                try:
+                    kinds = future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f"{name} : {exc}"))
+                    continue
+                record_derivatives(model, field, name, kinds)
+                recorded += len(kinds)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(names)} fichier(s) examinés, {recorded} dérivé(s) disponibles notés, {failed} échec(s)."
+            )
+        )
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.11 on 2026-10-17 03:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0001_initial'),
+        ('wallet', '0007_walletledgermonth_wallettransactionarchive'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='expense',
+            name='transaction',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='expense', to='wallet.wallettransaction'),
+        ),
+    ]
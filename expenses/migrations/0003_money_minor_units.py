@@ -0,0 +1,48 @@
+# Generated by Django 5.2.11 on 2026-10-17 03:58
+
+import core.money
+from django.db import migrations, models
+from django.db.models import ExpressionWrapper, F, Value
+from django.db.models.functions import Round
+
+# Passage en centimes en trois temps, portable (SQLite / PostgreSQL) et réversible :
+# 1. colonnes élargies (le montant × 100 doit tenir), 2. montants × 100, 3. colonnes BIGINT (MoneyField).
+WIDE = models.DecimalField(decimal_places=2, max_digits=20)
+MONEY_FIELDS = {
+    "expense": ["amount"],
+}
+
+
+def to_minor_units(apps, schema_editor):
+    for model_name, fields in MONEY_FIELDS.items():
+        model = apps.get_model("expenses", model_name)
+        model.objects.update(**{f: Round(F(f) * 100) for f in fields})
+
+
+def from_minor_units(apps, schema_editor):
+    for model_name, fields in MONEY_FIELDS.items():
+        model = apps.get_model("expenses", model_name)
+        model.objects.update(
+            **{f: ExpressionWrapper(F(f) / Value(100.0), output_field=WIDE) for f in fields}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0002_alter_expense_transaction'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='expense',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, max_digits=20),
+        ),
+        migrations.RunPython(to_minor_units, from_minor_units),
+        migrations.AlterField(
+            model_name='expense',
+            name='amount',
+            field=core.money.MoneyField(decimal_places=2, max_digits=14),
+        ),
+    ]
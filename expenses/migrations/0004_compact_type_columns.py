@@ -0,0 +1,48 @@
+# Generated by Django 5.2.11 on 2026-10-17 04:05
+
+import core.enums
+from django.db import migrations
+from django.db.models import Case, F, Value, When
+
+# Les valeurs texte sont d'abord remplacées par leur code ("DEBIT" → "2") dans la colonne texte,
+# puis la colonne passe en SMALLINT : conversion directe ("2"::smallint), portable et réversible.
+TYPE_COLUMNS = {
+    "expense": {
+        "bucket_type": {"BILLS": 1, "SAVINGS": 2, "DAILY": 3},
+    },
+}
+
+
+def _recode(apps, mapping):
+    for model_name, fields in TYPE_COLUMNS.items():
+        model = apps.get_model("expenses", model_name)
+        model.objects.update(
+            **{
+                field: Case(*[When(**{field: old}, then=Value(new)) for old, new in mapping(codes)], default=F(field))
+                for field, codes in fields.items()
+            }
+        )
+
+
+def to_codes(apps, schema_editor):
+    _recode(apps, lambda codes: [(value, str(code)) for value, code in codes.items()])
+
+
+def from_codes(apps, schema_editor):
+    _recode(apps, lambda codes: [(str(code), value) for value, code in codes.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0003_money_minor_units'),
+    ]
+
+    operations = [
+        migrations.RunPython(to_codes, from_codes),
+        migrations.AlterField(
+            model_name='expense',
+            name='bucket_type',
+            field=core.enums.EnumField(choices=[('BILLS', 'Bills'), ('SAVINGS', 'Savings'), ('DAILY', 'Daily')], codes={'BILLS': 1, 'DAILY': 3, 'SAVINGS': 2}, default='DAILY', max_length=7),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.11 on 2026-10-17 04:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0004_compact_type_columns'),
+        ('wallet', '0015_deposit_group_ref'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='client_id',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='expense',
+            constraint=models.UniqueConstraint(condition=models.Q(('client_id__isnull', False)), fields=('student', 'client_id'), name='uniq_expense_client_id'),
+        ),
+    ]
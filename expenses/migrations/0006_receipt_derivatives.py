@@ -0,0 +1,34 @@
+# Generated by Django 5.2.11 on 2026-10-17 05:18
+
+from django.db import migrations, models
+
+from core.media import existing_derivatives, record_derivatives
+
+
+def backfill(apps, schema_editor):
+    # Dérivés générés avant la colonne : constatés une fois ici, plus jamais à la lecture.
+    Expense = apps.get_model("expenses", "Expense")
+    names = (
+        Expense.objects.exclude(receipt="").exclude(receipt__isnull=True)
+        .values_list("receipt", flat=True).distinct()
+    )
+    for name in list(names):
+        kinds = existing_derivatives(name)
+        if kinds:
+            record_derivatives(Expense, "receipt", name, kinds)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0005_expense_client_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='receipt_derivatives',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
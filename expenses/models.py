@@ -3,7 +3,9 @@ from django.db import models
 from django.db.models import Q
 from django.utils import timezone
 
-from wallet.models import Wallet, WalletTransaction, WalletBucket
+from core.enums import EnumField
+from core.money import MoneyField
+from wallet.models import Wallet, WalletBucket, WalletTransaction, WalletTransactionArchive
 
 
 class ExpenseCategory(models.Model):
@@ -41,25 +43,40 @@ class ExpenseCategory(models.Model):
 
 
 class Expense(models.Model):
+    # Sans contrainte DB : une fois la transaction archivée, `transaction_id` pointe vers
+    # WalletTransactionArchive (même identifiant) et `transaction` lève DoesNotExist ; lire la ligne
+    # par `ledger_transaction`.
     transaction = models.OneToOneField(
         WalletTransaction,
-        on_delete=models.CASCADE,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
         related_name="expense",
     )
     wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="expenses")
     student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="expenses")
     category = models.ForeignKey(ExpenseCategory, on_delete=models.PROTECT, related_name="expenses")
 
-    amount = models.DecimalField(max_digits=14, decimal_places=2)
-    bucket_type = models.CharField(max_length=10, choices=WalletBucket.Type.choices, default=WalletBucket.Type.DAILY)
+    amount = MoneyField()
+    bucket_type = EnumField(WalletBucket.Type, default=WalletBucket.Type.DAILY)
 
     note = models.CharField(max_length=255, blank=True, default="")
     receipt = models.FileField(upload_to="receipts/", null=True, blank=True)
+    # Dérivés du reçu déjà générés ("thumbnail", "preview") : les URL se construisent sans toucher au stockage.
+    receipt_derivatives = models.JSONField(default=list, blank=True)
     occurred_at = models.DateTimeField(default=timezone.now)
+    # Identifiant fourni par l'application (file hors ligne, import) : un renvoi ne crée pas de doublon.
+    client_id = models.CharField(max_length=64, null=True, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "client_id"],
+                condition=Q(client_id__isnull=False),
+                name="uniq_expense_client_id",
+            ),
+        ]
         indexes = [
             models.Index(fields=["student", "occurred_at"]),
             models.Index(fields=["wallet", "occurred_at"]),
@@ -68,3 +85,11 @@ class Expense(models.Model):
 
     def __str__(self):
         return f"Expense({self.student_id} {self.amount})"
+
+    @property
+    def ledger_transaction(self):
+        """Ligne de ledger de la dépense : WalletTransaction, ou WalletTransactionArchive si elle a été archivée."""
+        try:
+            return self.transaction
+        except WalletTransaction.DoesNotExist:
+            return WalletTransactionArchive.objects.filter(pk=self.transaction_id).first()
@@ -1,11 +1,19 @@
+import csv
+import io
 from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
 from django.utils.dateparse import parse_date
 from rest_framework import serializers
 
+from core.media import derivative_url, schedule_derivatives, store_upload
 from wallet.models import WalletBucket
-from wallet.services import get_or_create_wallet_for_student, spent_today
+from wallet.services import get_wallet_for_student, spent_on
+from wallet.writer import run_ledger_write
+from .cache import bump_category_version
 from .models import ExpenseCategory, Expense
-from .services import get_category_for_student, categories_for_student, create_expense
+from .services import bulk_create_expenses, get_category_for_student, categories_for_student, create_expense
 
 
 class ExpenseCategorySerializer(serializers.ModelSerializer):
@@ -30,11 +38,16 @@ class CategoryCreateSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         student = self.context["request"].user
-        return ExpenseCategory.objects.create(owner=student, is_default=False, **validated_data)
+        category = ExpenseCategory.objects.create(owner=student, is_default=False, **validated_data)
+        bump_category_version(student.id)
+        return category
 
 
 class ExpenseListSerializer(serializers.ModelSerializer):
     category = ExpenseCategorySerializer()
+    # Dérivés JPEG du reçu (None tant qu'ils ne sont pas générés, ou si le reçu n'est pas une image).
+    receipt_thumbnail = serializers.SerializerMethodField()
+    receipt_preview = serializers.SerializerMethodField()
 
     class Meta:
         model = Expense
@@ -47,9 +60,17 @@ class ExpenseListSerializer(serializers.ModelSerializer):
             "created_at",
             "category",
             "receipt",
+            "receipt_thumbnail",
+            "receipt_preview",
             "transaction_id",
         ]
 
+    def get_receipt_thumbnail(self, obj) -> str | None:
+        return derivative_url(obj.receipt, "thumbnail", obj.receipt_derivatives, self.context.get("request"))
+
+    def get_receipt_preview(self, obj) -> str | None:
+        return derivative_url(obj.receipt, "preview", obj.receipt_derivatives, self.context.get("request"))
+
 
 class ExpenseCreateSerializer(serializers.Serializer):
     amount = serializers.DecimalField(max_digits=14, decimal_places=2)
@@ -69,14 +90,16 @@ class ExpenseCreateSerializer(serializers.Serializer):
 
     def validate(self, attrs):
         student = self.context["request"].user
-        wallet = get_or_create_wallet_for_student(student)
+        wallet = get_wallet_for_student(student)
 
         bucket_type = attrs["bucket_type"]
         if bucket_type == WalletBucket.Type.DAILY:
             limit = wallet.daily_limit or Decimal("0")
             if limit > 0:
-                today_spent = spent_today(wallet, WalletBucket.Type.DAILY)
-                if today_spent + attrs["amount"] > limit:
+                # Plafond du jour de la dépense (une dépense datée compte pour son propre jour).
+                day = timezone.localdate(attrs.get("occurred_at") or timezone.now())
+                day_spent = spent_on(wallet, WalletBucket.Type.DAILY, day)
+                if day_spent + attrs["amount"] > limit:
                     raise serializers.ValidationError({"amount": "Daily limit exceeded."})
 
         try:
@@ -94,13 +117,76 @@ class ExpenseCreateSerializer(serializers.Serializer):
     def create(self, validated_data):
         student = self.context["request"].user
         category = validated_data["_category"]
-        wallet, exp, txn = create_expense(
+        # Fichier rangé avant la transaction : aucune écriture disque sous les verrous d'enveloppe.
+        receipt = validated_data.get("receipt")
+        if receipt is not None:
+            receipt = store_upload(receipt, "receipts")
+        wallet, exp, txn = run_ledger_write(
+            create_expense,
             student=student,
             amount=validated_data["amount"],
             bucket_type=validated_data["bucket_type"],
             category=category,
             note=validated_data.get("note", ""),
-            receipt=validated_data.get("receipt"),
+            receipt=receipt,
             occurred_at=validated_data.get("occurred_at"),
         )
+        schedule_derivatives(receipt, Expense, "receipt")
         return exp
+
+
+class ExpenseBulkItemSerializer(serializers.Serializer):
+    client_id = serializers.CharField(max_length=64, required=False, allow_blank=True)
+    amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+    bucket_type = serializers.ChoiceField(choices=WalletBucket.Type.choices, default=WalletBucket.Type.DAILY)
+    category_id = serializers.IntegerField(required=False)
+    category_slug = serializers.CharField(required=False, allow_blank=True)
+    note = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    occurred_at = serializers.DateTimeField(required=False)
+
+    def validate_amount(self, v):
+        if v <= 0:
+            raise serializers.ValidationError("Amount must be > 0.")
+        return v
+
+
+CSV_COLUMNS = [name for name in ExpenseBulkItemSerializer._declared_fields]
+
+
+class ExpenseBulkSerializer(serializers.Serializer):
+    """Lot de dépenses : `items` (JSON) ou `file` (CSV, en-têtes = champs d'un élément)."""
+
+    items = ExpenseBulkItemSerializer(many=True, required=False)
+    file = serializers.FileField(required=False)
+
+    def _items_from_csv(self, upload):
+        try:
+            text = upload.read().decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise serializers.ValidationError({"file": "CSV must be UTF-8."})
+        reader = csv.DictReader(io.StringIO(text))
+        unknown = [name for name in reader.fieldnames or [] if name.strip() not in CSV_COLUMNS]
+        if unknown:
+            raise serializers.ValidationError({"file": f"Unknown column(s): {', '.join(unknown)}."})
+        # Cellule vide = champ absent (valeur par défaut de l'élément).
+        rows = [{k.strip(): v.strip() for k, v in row.items() if k and v and v.strip()} for row in reader]
+        items = ExpenseBulkItemSerializer(data=rows, many=True)
+        if not items.is_valid():
+            raise serializers.ValidationError({"file": items.errors})
+        return items.validated_data
+
+    def validate(self, attrs):
+        if attrs.get("file") is not None:
+            items = self._items_from_csv(attrs.pop("file"))
+        else:
+            items = attrs.get("items") or []
+        if not items:
+            raise serializers.ValidationError("Provide `items` or a CSV `file`.")
+        max_items = getattr(settings, "EXPENSE_BULK_MAX_ITEMS", 200)
+        if len(items) > max_items:
+            raise serializers.ValidationError(f"At most {max_items} items per request.")
+        attrs["items"] = items
+        return attrs
+
+    def create(self, validated_data):
+        return run_ledger_write(bulk_create_expenses, student=self.context["request"].user, items=validated_data["items"])
@@ -1,12 +1,26 @@
 from decimal import Decimal
 from datetime import date, timedelta
 
-from django.db.models import Sum
+from django.apps import apps as global_apps
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import FilteredRelation, OuterRef, Q, Subquery, Sum
 from django.utils import timezone
 from django.utils.text import slugify
 
-from wallet.services import get_or_create_wallet_for_student, debit, spent_today
-from wallet.models import WalletBucket, WalletTransaction
+from core.dates import date_range_q, day_start
+from wallet.cache import bump_wallet_version
+from wallet.deposits import apply_bucket_deltas
+from wallet.services import (
+    debit,
+    get_wallet_for_student,
+    lock_for_movement,
+    record_daily_spends,
+    record_rollups,
+    spent_by_day,
+    spent_today,
+)
+from wallet.models import Wallet, WalletBucket, WalletDailySpend, WalletTransaction
+from .cache import default_categories, reset_category_cache, student_categories
 from .models import ExpenseCategory, Expense
 
 
@@ -21,26 +35,49 @@ DEFAULT_CATEGORIES = [
 ]
 
 
-def ensure_default_categories():
-    for name, slug in DEFAULT_CATEGORIES:
-        ExpenseCategory.objects.get_or_create(
-            owner=None,
-            slug=slug,
-            defaults={"name": name, "is_default": True},
-        )
+def ensure_default_categories(queryset=None):
+    """Crée les catégories par défaut manquantes (une seule lecture si elles existent toutes)."""
+    if queryset is None:
+        queryset = ExpenseCategory.objects.all()
+    existing = set(queryset.filter(owner__isnull=True).values_list("slug", flat=True))
+    missing = [
+        queryset.model(owner=None, name=name, slug=slug, is_default=True)
+        for name, slug in DEFAULT_CATEGORIES
+        if slug not in existing
+    ]
+    if missing:
+        queryset.bulk_create(missing)
+
+
+def seed_default_categories(using=DEFAULT_DB_ALIAS, apps=global_apps, **kwargs):
+    """`post_migrate` : catégories par défaut présentes après chaque migrate (et flush), cache vidé."""
+    try:
+        model = apps.get_model("expenses", "ExpenseCategory")
+    except LookupError:
+        return
+    ensure_default_categories(model.objects.using(using))
+    reset_category_cache()
 
 
 def categories_for_student(student):
-    ensure_default_categories()
-    return ExpenseCategory.objects.filter(owner__isnull=True).union(
-        ExpenseCategory.objects.filter(owner=student)
-    )
+    """Catégories par défaut + catégories personnelles, triées (personnelles d'abord, puis par nom)."""
+    categories = default_categories().categories + student_categories(student.id).categories
+    return sorted(categories, key=lambda c: (c.is_default, c.name))
 
 
 def get_category_for_student(student, category_id=None, category_slug=None):
-    ensure_default_categories()
+    """
+    Catégorie choisie par l'étudiant : par id, sinon par slug (la sienne avant celle par défaut),
+    sinon "other". Résolue depuis le cache des catégories, sans requête dans le cas courant ;
+    une référence absente du cache est vérifiée en base avant d'être refusée.
+    """
+    defaults = default_categories()
+    custom = student_categories(student.id)
 
     if category_id:
+        cat = defaults.by_id.get(category_id) or custom.by_id.get(category_id)
+        if cat:
+            return cat
         cat = ExpenseCategory.objects.get(id=category_id)
         if cat.owner is None or cat.owner_id == student.id:
             return cat
@@ -48,6 +85,9 @@ def get_category_for_student(student, category_id=None, category_slug=None):
 
     if category_slug:
         slug = slugify(category_slug)
+        cat = custom.by_slug.get(slug) or defaults.by_slug.get(slug)
+        if cat:
+            return cat
         cat = ExpenseCategory.objects.filter(owner=student, slug=slug).first()
         if cat:
             return cat
@@ -56,7 +96,7 @@ def get_category_for_student(student, category_id=None, category_slug=None):
             return cat
         raise ExpenseCategory.DoesNotExist()
 
-    return ExpenseCategory.objects.get(owner__isnull=True, slug="other")
+    return defaults.by_slug.get("other") or ExpenseCategory.objects.get(owner__isnull=True, slug="other")
 
 
 def week_start(d: date):
@@ -67,11 +107,13 @@ def month_start(d: date):
     return d.replace(day=1)
 
 
-def build_alerts(wallet):
+def build_alerts(wallet, today_spent=None):
+    """Alertes de plafond journalier ; `today_spent` : dépense DAILY du jour si déjà lue par l'appelant."""
     alerts = []
     limit = wallet.daily_limit or Decimal("0")
     if limit > 0:
-        today_spent = spent_today(wallet, WalletBucket.Type.DAILY)
+        if today_spent is None:
+            today_spent = spent_today(wallet, WalletBucket.Type.DAILY)
         if today_spent >= limit:
             alerts.append({"type": "DAILY_LIMIT_REACHED", "message": "Daily limit reached."})
         elif today_spent >= (limit * Decimal("0.8")):
@@ -79,6 +121,7 @@ def build_alerts(wallet):
     return alerts
 
 
+@transaction.atomic
 def create_expense(
     student,
     amount: Decimal,
@@ -88,7 +131,8 @@ def create_expense(
     receipt=None,
     occurred_at=None,
 ):
-    wallet = get_or_create_wallet_for_student(student)
+    wallet = get_wallet_for_student(student)
+    lock_for_movement(wallet_ids=[wallet.id], bucket_types=[bucket_type])
 
     if occurred_at is None:
         occurred_at = timezone.now()
@@ -101,6 +145,7 @@ def create_expense(
         txn_type=WalletTransaction.TxnType.EXPENSE,
         description=note or "",
         metadata={"category_slug": category.slug, "category_name": category.name},
+        spend_day=timezone.localdate(occurred_at),
     )
 
     exp = Expense.objects.create(
@@ -118,35 +163,180 @@ def create_expense(
     return wallet, exp, txn
 
 
+@transaction.atomic
+def bulk_create_expenses(student, items) -> list:
+    """
+    Enregistre un lot de dépenses (file hors ligne rejouée, import CSV) en une transaction :
+
+    - enveloppes concernées verrouillées une seule fois (`lock_for_movement`), soldes suivis en mémoire ;
+    - plafond journalier contrôlé jour par jour (jour de `occurred_at`) sur tout le lot, en partant des
+      compteurs déjà enregistrés (une requête) ;
+    - WalletTransaction puis Expense écrites via `bulk_create`, enveloppes en un seul UPDATE,
+      compteurs journaliers et totaux mensuels mis à jour en bloc.
+
+    `client_id` : un élément déjà enregistré pour cet étudiant est rendu en DUPLICATE (avec l'id de la
+    dépense existante), sans nouveau débit : une file peut être rejouée sans risque.
+    Chaque élément réussit ou échoue indépendamment, dans l'ordre de la requête.
+    Retourne les résultats par élément ({index, client_id, status, error | expense | expense_id}).
+    """
+    results = [{"index": i, "client_id": item.get("client_id") or None, "status": "PENDING"} for i, item in enumerate(items)]
+
+    def fail(i, error):
+        results[i]["status"] = "FAILED"
+        results[i]["error"] = error
+
+    wallet = get_wallet_for_student(student)
+    # Verrou pris avant la lecture des client_id : deux renvois simultanés du même lot sont sérialisés.
+    _, buckets = lock_for_movement(wallet_ids=[wallet.id], bucket_types=sorted({item["bucket_type"] for item in items}))
+    by_type = {b.bucket_type: b for b in buckets}
+
+    client_ids = {item["client_id"] for item in items if item.get("client_id")}
+    known = dict(
+        Expense.objects.filter(student=student, client_id__in=client_ids).values_list("client_id", "id")
+    ) if client_ids else {}
+
+    now = timezone.now()
+    candidates = []
+    seen = set()
+    for i, item in enumerate(items):
+        client_id = item.get("client_id") or None
+        if client_id in known:
+            results[i].update(status="DUPLICATE", expense_id=known[client_id])
+            continue
+        if client_id:
+            if client_id in seen:
+                fail(i, "Duplicate client_id in request.")
+                continue
+            seen.add(client_id)
+        try:
+            category = get_category_for_student(
+                student, category_id=item.get("category_id"), category_slug=item.get("category_slug")
+            )
+        except ExpenseCategory.DoesNotExist:
+            fail(i, "Invalid category.")
+            continue
+        occurred_at = item.get("occurred_at") or now
+        candidates.append((i, category, occurred_at, timezone.localdate(occurred_at)))
+
+    limit = wallet.daily_limit or Decimal("0")
+    spent = {}
+    if limit > 0:
+        days = {day for i, _, _, day in candidates if items[i]["bucket_type"] == WalletBucket.Type.DAILY}
+        spent = spent_by_day(wallet, WalletBucket.Type.DAILY, days) if days else {}
+
+    balances = {bucket_type: bucket.balance for bucket_type, bucket in by_type.items()}
+    deltas = {}
+    spends = {}
+    txns = []
+    expenses = []
+    for i, category, occurred_at, day in candidates:
+        item = items[i]
+        bucket_type, amount = item["bucket_type"], item["amount"]
+        if bucket_type not in balances or balances[bucket_type] < amount:
+            fail(i, "Insufficient funds.")
+            continue
+        if bucket_type == WalletBucket.Type.DAILY and limit > 0:
+            if spent.get(day, Decimal("0")) + amount > limit:
+                fail(i, "Daily limit exceeded.")
+                continue
+            spent[day] = spent.get(day, Decimal("0")) + amount
+
+        balances[bucket_type] -= amount
+        bucket_id = by_type[bucket_type].id
+        deltas[bucket_id] = deltas.get(bucket_id, Decimal("0")) - amount
+        spends[(bucket_type, day)] = spends.get((bucket_type, day), Decimal("0")) + amount
+        note = item.get("note") or ""
+        txn = WalletTransaction(
+            wallet=wallet,
+            actor=student,
+            bucket_type=bucket_type,
+            direction=WalletTransaction.Direction.DEBIT,
+            txn_type=WalletTransaction.TxnType.EXPENSE,
+            amount=amount,
+            balance_after=balances[bucket_type],
+            description=note,
+            metadata={"category_slug": category.slug, "category_name": category.name},
+        )
+        txns.append(txn)
+        expenses.append(
+            Expense(
+                transaction=txn,
+                wallet=wallet,
+                student=student,
+                category=category,
+                amount=amount,
+                bucket_type=bucket_type,
+                note=note,
+                occurred_at=occurred_at,
+                client_id=item.get("client_id") or None,
+            )
+        )
+        results[i].update(status="OK", expense=expenses[-1])
+
+    if not txns:
+        return results
+
+    apply_bucket_deltas(deltas, now)
+    WalletTransaction.objects.bulk_create(txns)
+    # transaction_id est repris des WalletTransaction, identifiants connus après leur INSERT groupé.
+    Expense.objects.bulk_create(expenses)
+    record_daily_spends(wallet, spends)
+    record_rollups(txns)
+    bump_wallet_version(wallet.id)
+    return results
+
+
 def summary_for_student(student, date_from=None, date_to=None):
-    qs = Expense.objects.filter(student=student)
+    """
+    Résumé des dépenses en deux requêtes :
 
-    if date_from:
-        qs = qs.filter(occurred_at__date__gte=date_from)
-    if date_to:
-        qs = qs.filter(occurred_at__date__lte=date_to)
+    1. le wallet, avec les totaux du jour / de la semaine / du mois en sommes conditionnelles sur un
+       seul intervalle `[début de semaine ou de mois, demain)` de l'index (wallet, occurred_at), et le
+       compteur DAILY du jour (WalletDailySpend) servant à l'alerte de plafond ;
+    2. le top 5 des catégories.
 
+    Les bornes sont des instants (début de journée, fuseau courant) : pas de conversion de
+    `occurred_at` en date, l'index reste utilisable.
+    """
     today = timezone.localdate()
-    ws = week_start(today)
-    ms = month_start(today)
-
-    total_today = Expense.objects.filter(student=student, occurred_at__date=today).aggregate(s=Sum("amount")).get("s") or Decimal("0")
-    total_week = Expense.objects.filter(student=student, occurred_at__date__gte=ws, occurred_at__date__lte=today).aggregate(s=Sum("amount")).get("s") or Decimal("0")
-    total_month = Expense.objects.filter(student=student, occurred_at__date__gte=ms, occurred_at__date__lte=today).aggregate(s=Sum("amount")).get("s") or Decimal("0")
+    today_from = day_start(today)
+    week_from = day_start(week_start(today))
+    month_from = day_start(month_start(today))
+    until = day_start(today + timedelta(days=1))
+
+    wallet = (
+        Wallet.objects.filter(student=student)
+        .annotate(
+            recent=FilteredRelation(
+                "expenses",
+                condition=Q(expenses__occurred_at__gte=min(week_from, month_from), expenses__occurred_at__lt=until),
+            ),
+            total_today=Sum("recent__amount", filter=Q(recent__occurred_at__gte=today_from)),
+            total_week=Sum("recent__amount", filter=Q(recent__occurred_at__gte=week_from)),
+            total_month=Sum("recent__amount", filter=Q(recent__occurred_at__gte=month_from)),
+            daily_spent=Subquery(
+                WalletDailySpend.objects.filter(
+                    wallet=OuterRef("pk"), bucket_type=WalletBucket.Type.DAILY, day=today
+                ).values("amount")[:1]
+            ),
+        )
+        .first()
+    )
+    if wallet is None:
+        wallet = get_wallet_for_student(student)
+        wallet.total_today = wallet.total_week = wallet.total_month = wallet.daily_spent = None
 
+    qs = Expense.objects.filter(student=student).filter(date_range_q("occurred_at", date_from, date_to))
     top = (
         qs.values("category__slug", "category__name")
         .annotate(total=Sum("amount"))
         .order_by("-total")[:5]
     )
 
-    wallet = get_or_create_wallet_for_student(student)
-    alerts = build_alerts(wallet)
-
     return {
-        "total_today": str(total_today),
-        "total_week": str(total_week),
-        "total_month": str(total_month),
+        "total_today": str(wallet.total_today or Decimal("0")),
+        "total_week": str(wallet.total_week or Decimal("0")),
+        "total_month": str(wallet.total_month or Decimal("0")),
         "top_categories": list(top),
-        "alerts": alerts,
+        "alerts": build_alerts(wallet, today_spent=wallet.daily_spent or Decimal("0")),
     }
@@ -1,3 +1,289 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from core.media import derivative_name, wait_for_derivatives
+
+from wallet.archive import archive_wallet_batch
+from wallet.models import Wallet, WalletBucket, WalletDailySpend, WalletTransaction, WalletTransactionArchive
+from wallet.reconciliation import check_wallet_chunk
+from wallet.services import rebuild_daily_spend
+from wallet.tests import LedgerFixtures
+from .models import Expense
+
+
+class ExpenseSummaryTests(LedgerFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.topup()
+        self.deposit("1000.00")
+        self.expense("40.00", category_slug="food")
+        self.expense("25.00", category_slug="transport")
+        self.expense("10.00", category_slug="food", occurred_at=(timezone.now() - timedelta(days=40)).isoformat())
+
+    def test_summary_runs_two_statements(self):
+        with self.assertNumQueries(2):
+            response = self.student_client.get("/api/expenses/me/summary/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Decimal(response.data["total_today"]), Decimal("65.00"))
+        self.assertEqual(response.data["top_categories"][0]["category__slug"], "food")
+
+
+class ArchivedExpenseTests(LedgerFixtures, TestCase):
+    def test_expense_keeps_its_archived_transaction(self):
+        self.topup()
+        self.deposit("1000.00")
+        occurred = timezone.now() - timedelta(days=40)
+        response = self.expense("12.00", occurred_at=occurred.isoformat())
+        self.assertEqual(response.status_code, 201, response.content)
+        expense = Expense.objects.get(id=response.data["id"])
+        WalletTransaction.objects.update(created_at=occurred)
+        archive_wallet_batch(timezone.now() - timedelta(days=30), 100)
+
+        expense = Expense.objects.get(pk=expense.pk)
+        with self.assertRaises(WalletTransaction.DoesNotExist):
+            expense.transaction
+        archived = expense.ledger_transaction
+        self.assertIsInstance(archived, WalletTransactionArchive)
+        self.assertEqual((archived.pk, archived.amount), (expense.transaction_id, Decimal("12.00")))
+
+        listed = self.student_client.get("/api/expenses/me/")
+        self.assertEqual(listed.status_code, 200)
+        self.assertEqual(listed.data["results"][0]["transaction_id"], archived.pk)
+
+
+class ExpenseListFilterTests(LedgerFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.topup()
+        self.deposit("1000.00")
+        self.expense("10.00")
+        self.urls = ["/api/expenses/me/", f"/api/expenses/students/{self.student.id}/"]
+        self.clients = [self.student_client, self.parent_client]
+
+    def test_bucket_type_is_case_insensitive(self):
+        for client, url in zip(self.clients, self.urls):
+            response = client.get(url, {"bucket_type": "daily"})
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertEqual(len(response.data["results"]), 1)
+            self.assertEqual(client.get(url, {"bucket_type": "SAVINGS"}).data["results"], [])
+
+    def test_unknown_bucket_type_is_rejected(self):
+        for client, url in zip(self.clients, self.urls):
+            response = client.get(url, {"bucket_type": "FOO"})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("bucket_type", response.data)
+
+
+class BulkExpenseTests(LedgerFixtures, TestCase):
+    URL = "/api/expenses/me/bulk/"
+
+    def setUp(self):
+        super().setUp()
+        self.topup()
+        self.deposit("1000.00")
+        self.wallet = Wallet.objects.get(student=self.student)
+        Wallet.objects.filter(pk=self.wallet.pk).update(daily_limit=Decimal("100.00"))
+        self.yesterday = (timezone.now() - timedelta(days=1)).isoformat()
+
+    def bulk(self, items):
+        return self.student_client.post(self.URL, {"items": items}, format="json")
+
+    def outcomes(self, response):
+        return [(r["status"], r.get("error")) for r in response.data["results"]]
+
+    def test_items_succeed_or_fail_independently(self):
+        response = self.bulk([
+            {"client_id": "a1", "amount": "60.00", "occurred_at": self.yesterday, "category_slug": "transport"},
+            {"client_id": "a2", "amount": "50.00", "occurred_at": self.yesterday},
+            {"client_id": "a3", "amount": "90.00"},
+            {"client_id": "a3", "amount": "1.00"},
+            {"client_id": "a4", "amount": "5.00", "category_slug": "nope"},
+            {"client_id": "a5", "amount": "40.00", "occurred_at": self.yesterday},
+            {"amount": "1.00", "bucket_type": "SAVINGS"},
+        ])
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(self.outcomes(response), [
+            ("OK", None),
+            ("FAILED", "Daily limit exceeded."),
+            ("OK", None),
+            ("FAILED", "Duplicate client_id in request."),
+            ("FAILED", "Invalid category."),
+            ("OK", None),
+            ("FAILED", "Insufficient funds."),
+        ])
+        self.assertEqual(response.data["results"][0]["expense"]["category"]["slug"], "transport")
+
+        # Débits appliqués dans l'ordre de la requête, chacun lié à sa dépense.
+        txns = WalletTransaction.objects.filter(txn_type=WalletTransaction.TxnType.EXPENSE).order_by("id")
+        self.assertEqual([t.balance_after for t in txns], [Decimal("940.00"), Decimal("850.00"), Decimal("810.00")])
+        self.assertFalse(Expense.objects.filter(transaction__isnull=True).exists())
+        daily = WalletBucket.objects.get(wallet=self.wallet, bucket_type=WalletBucket.Type.DAILY)
+        self.assertEqual(daily.balance, Decimal("810.00"))
+        self.assertEqual(check_wallet_chunk([self.wallet.id]), [])
+
+    def test_daily_limit_applies_to_the_occurred_day(self):
+        self.assertEqual(self.bulk([
+            {"client_id": "y1", "amount": "60.00", "occurred_at": self.yesterday},
+            {"client_id": "y2", "amount": "40.00", "occurred_at": self.yesterday},
+            {"client_id": "t1", "amount": "90.00"},
+        ]).status_code, 201)
+        spends = dict(WalletDailySpend.objects.filter(wallet=self.wallet).values_list("day", "amount"))
+        self.assertEqual(sorted(spends.values()), [Decimal("90.00"), Decimal("100.00")])
+
+        # Totaux par jour identiques à ceux recalculés depuis le ledger.
+        rebuild_daily_spend([self.wallet.id])
+        self.assertEqual(dict(WalletDailySpend.objects.filter(wallet=self.wallet).values_list("day", "amount")), spends)
+
+        # Hier est plein, aujourd'hui non : en lot comme à l'unité.
+        response = self.bulk([
+            {"client_id": "y3", "amount": "1.00", "occurred_at": self.yesterday},
+            {"client_id": "t2", "amount": "10.00"},
+        ])
+        self.assertEqual(self.outcomes(response), [("FAILED", "Daily limit exceeded."), ("OK", None)])
+        self.assertEqual(self.expense("1.00", occurred_at=self.yesterday).status_code, 400)
+
+    def test_replayed_client_id_is_duplicate(self):
+        item = {"client_id": "a1", "amount": "10.00"}
+        self.assertEqual(self.outcomes(self.bulk([item])), [("OK", None)])
+        response = self.bulk([item, {"client_id": "a2", "amount": "5.00"}])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([r["status"] for r in response.data["results"]], ["DUPLICATE", "OK"])
+        self.assertEqual(Expense.objects.count(), 2)
+        daily = WalletBucket.objects.get(wallet=self.wallet, bucket_type=WalletBucket.Type.DAILY)
+        self.assertEqual(daily.balance, Decimal("985.00"))
+
+    def test_csv_file(self):
+        content = "client_id,amount,category_slug,note\nc1,2.00,food,café\nc2,3.00,,\n".encode()
+        response = self.student_client.post(
+            self.URL, {"file": SimpleUploadedFile("expenses.csv", content)}, format="multipart"
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(
+            [(r["status"], r["expense"]["category"]["slug"], r["expense"]["note"]) for r in response.data["results"]],
+            [("OK", "food", "café"), ("OK", "other", "")],
+        )
+
+    def test_rejected_payloads(self):
+        def post_csv(content):
+            return self.student_client.post(
+                self.URL, {"file": SimpleUploadedFile("expenses.csv", content)}, format="multipart"
+            )
+
+        response = post_csv(b"amount,foo\n1,2\n")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["file"], ["Unknown column(s): foo."])
+        self.assertEqual(post_csv(b"amount\n-1\n").status_code, 400)
+        self.assertEqual(self.bulk([]).status_code, 400)
+        self.assertFalse(Expense.objects.exists())
+
+
+def image_bytes(size, fmt="JPEG") -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", size, (120, 90, 60)).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ASYNC=False)
+class ReceiptTests(LedgerFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.topup()
+        self.deposit()
+
+    def upload(self, name, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.student_client.post(
+                "/api/expenses/me/create/",
+                {"amount": "1.00", "category_slug": "food", "receipt": SimpleUploadedFile(name, content)},
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, 201, response.content)
+        return response, Expense.objects.get(id=response.data["id"]).receipt.name
+
+    def test_image_gets_bounded_derivatives(self):
+        response, name = self.upload("IMG.JPG", image_bytes((3000, 2000)))
+        self.assertRegex(name, r"^receipts/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$")
+        with Image.open(default_storage.path(derivative_name(name, "thumbnail"))) as thumbnail:
+            self.assertEqual((thumbnail.format, thumbnail.size), ("JPEG", (320, 213)))
+        with Image.open(default_storage.path(derivative_name(name, "preview"))) as preview:
+            self.assertEqual(preview.size, (1600, 1067))
+
+        listed = self.student_client.get("/api/expenses/me/").data["results"][0]
+        self.assertTrue(listed["receipt_thumbnail"].endswith(derivative_name(name, "thumbnail")))
+        self.assertTrue(listed["receipt_preview"].endswith(derivative_name(name, "preview")))
+
+    def test_same_content_is_stored_once(self):
+        photo = image_bytes((800, 600))
+        _, first = self.upload("a.jpg", photo)
+        _, second = self.upload("b.jpg", photo)
+        self.assertEqual(first, second)
+        self.assertEqual(default_storage.listdir(first.rsplit("/", 1)[0])[1], [first.rsplit("/", 1)[1]])
+
+    def test_pdf_has_no_derivative(self):
+        response, name = self.upload("receipt.pdf", b"%PDF-1.4 receipt")
+        self.assertTrue(response.data["receipt"])
+        self.assertIsNone(response.data["receipt_thumbnail"])
+        self.assertIsNone(response.data["receipt_preview"])
+        self.assertFalse(default_storage.exists(derivative_name(name, "thumbnail")))
+
+    def test_urls_come_from_recorded_kinds(self):
+        _, name = self.upload("r.png", image_bytes((640, 480), "PNG"))
+        self.assertEqual(Expense.objects.get().receipt_derivatives, ["preview", "thumbnail"])
+        # La liste ne sonde plus le stockage : seule la colonne décide.
+        with mock.patch.object(default_storage, "exists", side_effect=AssertionError("exists() appelé")):
+            listed = self.student_client.get("/api/expenses/me/").data["results"][0]
+        self.assertTrue(listed["receipt_thumbnail"].endswith(derivative_name(name, "thumbnail")))
+        Expense.objects.update(receipt_derivatives=[])
+        listed = self.student_client.get("/api/expenses/me/").data["results"][0]
+        self.assertIsNone(listed["receipt_thumbnail"])
+
+    def test_maintenance_command_records_existing_derivatives(self):
+        _, name = self.upload("r.png", image_bytes((640, 480), "PNG"))
+        Expense.objects.update(receipt_derivatives=[])
+        call_command("build_media_derivatives", stdout=StringIO())
+        self.assertEqual(Expense.objects.get().receipt_derivatives, ["preview", "thumbnail"])
+
+
+@override_settings(MEDIA_ASYNC=True)
+class ReceiptPoolTests(LedgerFixtures, TransactionTestCase):
+    """Le pool écrit depuis son propre thread : il faut des lignes réellement validées."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.topup()
+        self.deposit()
+
+    def test_pool_builds_after_commit(self):
+        receipt = SimpleUploadedFile("p.png", image_bytes((640, 480), "PNG"))
+        response = self.student_client.post(
+            "/api/expenses/me/create/",
+            {"amount": "1.00", "category_slug": "food", "receipt": receipt},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        # La réponse part avant les dérivés : elle renvoie l'original seul.
+        self.assertIsNone(response.data["receipt_thumbnail"])
+        wait_for_derivatives()
+        listed = self.student_client.get("/api/expenses/me/").data["results"][0]
+        self.assertIsNotNone(listed["receipt_thumbnail"])
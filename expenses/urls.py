@@ -3,6 +3,7 @@ from .views import (
     StudentCategoryListAPIView,
     StudentCategoryCreateAPIView,
     StudentExpenseCreateAPIView,
+    StudentExpenseBulkCreateAPIView,
     StudentExpenseListAPIView,
     StudentExpenseSummaryAPIView,
     ParentStudentExpenseListAPIView,
@@ -15,6 +16,7 @@ urlpatterns = [
 
     path("me/", StudentExpenseListAPIView.as_view()),
     path("me/create/", StudentExpenseCreateAPIView.as_view()),
+    path("me/bulk/", StudentExpenseBulkCreateAPIView.as_view()),
     path("me/summary/", StudentExpenseSummaryAPIView.as_view()),
 
     path("students/<int:student_id>/", ParentStudentExpenseListAPIView.as_view()),
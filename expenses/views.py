@@ -1,12 +1,17 @@
 from django.contrib.auth import get_user_model
 from django.utils.dateparse import parse_date
 from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
 from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiParameter, inline_serializer
 from rest_framework import serializers
 
 from accounts.permissions import IsStudent
+from core.dates import date_range_q
+from wallet.idempotency import IDEMPOTENCY_PARAMETER, IdempotentCreateMixin
+from wallet.models import WalletBucket
+from wallet.pagination import ExpenseCursorPagination
 from wallet.permissions import IsLinkedParent
 from relationships.models import ParentStudentLink
 
@@ -14,6 +19,7 @@ from .models import Expense, ExpenseCategory
 from .serializers import (
     ExpenseCategorySerializer,
     CategoryCreateSerializer,
+    ExpenseBulkSerializer,
     ExpenseCreateSerializer,
     ExpenseListSerializer,
 )
@@ -22,6 +28,14 @@ from .services import categories_for_student, summary_for_student
 User = get_user_model()
 
 
+def bucket_type_param(request):
+    """`?bucket_type=` normalisé (casse ignorée) ; 400 si la valeur n'est pas une enveloppe connue."""
+    raw = (request.query_params.get("bucket_type") or "").strip().upper()
+    if raw and raw not in WalletBucket.Type.values:
+        allowed = ", ".join(sorted(WalletBucket.Type.values))
+        raise ValidationError({"bucket_type": f"Invalid value(s): {raw}. Allowed: {allowed}."})
+    return raw
+
 SummarySerializer = inline_serializer(
     name="ExpenseSummary",
     fields={
@@ -49,7 +63,7 @@ class StudentCategoryListAPIView(generics.ListAPIView):
     serializer_class = ExpenseCategorySerializer
 
     def get_queryset(self):
-        return categories_for_student(self.request.user).order_by("is_default", "name")
+        return categories_for_student(self.request.user)
 
 
 @extend_schema(
@@ -89,12 +103,13 @@ class StudentCategoryCreateAPIView(generics.CreateAPIView):
         "- `amount`, `bucket_type` (DAILY par défaut)\n"
         "- `category_id` ou `category_slug`\n"
         "- `note` (description)\n"
-        "- `receipt` (optionnel - V2)\n\n"
+        "- `receipt` (optionnel) : `receipt_thumbnail` / `receipt_preview` (JPEG) renseignés une fois générés\n\n"
         "Règles :\n"
         "- solde suffisant dans l’enveloppe\n"
         "- si DAILY + daily_limit > 0 : ne doit pas dépasser le plafond du jour"
     ),
     request=ExpenseCreateSerializer,
+    parameters=[IDEMPOTENCY_PARAMETER],
     responses={201: ExpenseListSerializer},
     examples=[
         OpenApiExample(
@@ -104,7 +119,7 @@ class StudentCategoryCreateAPIView(generics.CreateAPIView):
         )
     ],
 )
-class StudentExpenseCreateAPIView(generics.CreateAPIView):
+class StudentExpenseCreateAPIView(IdempotentCreateMixin, generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated, IsStudent]
     serializer_class = ExpenseCreateSerializer
 
@@ -115,6 +130,71 @@ class StudentExpenseCreateAPIView(generics.CreateAPIView):
         return Response(ExpenseListSerializer(exp).data, status=status.HTTP_201_CREATED)
 
 
+ExpenseBulkResponseSerializer = inline_serializer(
+    name="ExpenseBulkResponse",
+    fields={
+        "succeeded": serializers.IntegerField(),
+        "duplicates": serializers.IntegerField(),
+        "failed": serializers.IntegerField(),
+        "results": serializers.ListField(child=serializers.DictField()),
+    },
+)
+
+
+@extend_schema(
+    tags=["Expenses"],
+    summary="Enregistrer un lot de dépenses (Étudiant)",
+    description=(
+        "Rejoue une file de dépenses saisies hors ligne, ou importe un CSV, en une seule requête.\n\n"
+        "- JSON : `items` = liste de dépenses (mêmes champs que la création unitaire, sans reçu, "
+        "plus `client_id`).\n"
+        "- Multipart : `file` = CSV UTF-8, une ligne par dépense, en-têtes parmi "
+        "`client_id, amount, bucket_type, category_id, category_slug, note, occurred_at`.\n\n"
+        "Le plafond journalier s'applique au jour de chaque dépense (`occurred_at`), lot compris.\n\n"
+        "Chaque élément réussit ou échoue indépendamment (`status` : OK / DUPLICATE / FAILED + `error`). "
+        "Un `client_id` déjà enregistré renvoie DUPLICATE et l'id de la dépense existante, sans nouveau débit : "
+        "la file peut être rejouée sans risque.\n\n"
+        "Réponse 201 si au moins un élément n'a pas échoué, sinon 400."
+    ),
+    request=ExpenseBulkSerializer,
+    parameters=[IDEMPOTENCY_PARAMETER],
+    responses={201: ExpenseBulkResponseSerializer, 400: ExpenseBulkResponseSerializer},
+    examples=[
+        OpenApiExample(
+            "Requête (exemple)",
+            value={
+                "items": [
+                    {"client_id": "c8f1-0001", "amount": "1500.00", "category_slug": "food",
+                     "occurred_at": "2026-03-02T12:10:00Z"},
+                    {"client_id": "c8f1-0002", "amount": "500.00", "category_slug": "transport",
+                     "occurred_at": "2026-03-02T17:45:00Z"},
+                ],
+            },
+            request_only=True,
+        ),
+    ],
+)
+class StudentExpenseBulkCreateAPIView(IdempotentCreateMixin, generics.CreateAPIView):
+    permission_classes = [permissions.IsAuthenticated, IsStudent]
+    serializer_class = ExpenseBulkSerializer
+
+    def create(self, request, *args, **kwargs):
+        s = self.get_serializer(data=request.data)
+        s.is_valid(raise_exception=True)
+        results = []
+        for r in s.save():
+            if "expense" in r:
+                r = {**r, "expense": ExpenseListSerializer(r["expense"]).data}
+            results.append(r)
+        succeeded = sum(1 for r in results if r["status"] == "OK")
+        duplicates = sum(1 for r in results if r["status"] == "DUPLICATE")
+        failed = len(results) - succeeded - duplicates
+        return Response(
+            {"succeeded": succeeded, "duplicates": duplicates, "failed": failed, "results": results},
+            status=status.HTTP_201_CREATED if failed < len(results) else status.HTTP_400_BAD_REQUEST,
+        )
+
+
 @extend_schema(
     tags=["Expenses"],
     summary="Lister mes dépenses (Étudiant)",
@@ -124,7 +204,8 @@ class StudentExpenseCreateAPIView(generics.CreateAPIView):
         "- `date_from=YYYY-MM-DD`\n"
         "- `date_to=YYYY-MM-DD`\n"
         "- `category_id=<id>`\n"
-        "- `bucket_type=DAILY|BILLS|SAVINGS`"
+        "- `bucket_type=DAILY|BILLS|SAVINGS`\n\n"
+        "Pagination par curseur : suivre `next` / `previous` (`page_size` optionnel)."
     ),
     parameters=[
         OpenApiParameter(name="date_from", type=str, required=False),
@@ -137,6 +218,7 @@ class StudentExpenseCreateAPIView(generics.CreateAPIView):
 class StudentExpenseListAPIView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated, IsStudent]
     serializer_class = ExpenseListSerializer
+    pagination_class = ExpenseCursorPagination
 
     def get_queryset(self):
         qs = Expense.objects.filter(student=self.request.user).select_related("category").order_by("-occurred_at")
@@ -144,12 +226,9 @@ class StudentExpenseListAPIView(generics.ListAPIView):
         df = parse_date(self.request.query_params.get("date_from") or "")
         dt = parse_date(self.request.query_params.get("date_to") or "")
         cid = self.request.query_params.get("category_id")
-        bt = self.request.query_params.get("bucket_type")
+        bt = bucket_type_param(self.request)
 
-        if df:
-            qs = qs.filter(occurred_at__date__gte=df)
-        if dt:
-            qs = qs.filter(occurred_at__date__lte=dt)
+        qs = qs.filter(date_range_q("occurred_at", df, dt))
         if cid:
             qs = qs.filter(category_id=cid)
         if bt:
@@ -188,7 +267,7 @@ class StudentExpenseSummaryAPIView(generics.GenericAPIView):
     summary="Lister les dépenses d’un étudiant lié (Parent)",
     description=(
         "Permet au parent de consulter les dépenses d’un étudiant **uniquement s’ils sont liés**.\n"
-        "Filtres identiques à l’endpoint étudiant."
+        "Filtres et pagination identiques à l’endpoint étudiant."
     ),
     parameters=[
         OpenApiParameter(name="date_from", type=str, required=False),
@@ -201,6 +280,7 @@ class StudentExpenseSummaryAPIView(generics.GenericAPIView):
 class ParentStudentExpenseListAPIView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated, IsLinkedParent]
     serializer_class = ExpenseListSerializer
+    pagination_class = ExpenseCursorPagination
 
     def get_queryset(self):
         student = User.objects.get(id=self.kwargs["student_id"])
@@ -209,12 +289,9 @@ class ParentStudentExpenseListAPIView(generics.ListAPIView):
         df = parse_date(self.request.query_params.get("date_from") or "")
         dt = parse_date(self.request.query_params.get("date_to") or "")
         cid = self.request.query_params.get("category_id")
-        bt = self.request.query_params.get("bucket_type")
+        bt = bucket_type_param(self.request)
 
-        if df:
-            qs = qs.filter(occurred_at__date__gte=df)
-        if dt:
-            qs = qs.filter(occurred_at__date__lte=dt)
+        qs = qs.filter(date_range_q("occurred_at", df, dt))
         if cid:
             qs = qs.filter(category_id=cid)
         if bt:
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.11 on 2026-10-17 03:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parent_account', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='parentaccount',
+            constraint=models.CheckConstraint(condition=models.Q(('balance__gte', 0)), name='parent_account_balance_gte_0'),
+        ),
+    ]
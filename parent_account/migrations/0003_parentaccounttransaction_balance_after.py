@@ -0,0 +1,18 @@
+# Generated by Django 5.2.11 on 2026-10-17 03:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parent_account', '0002_balance_non_negative'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parentaccounttransaction',
+            name='balance_after',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from decimal import Decimal
+
+from django.db import migrations
+
+OWNER_CHUNK = 200
+BATCH_SIZE = 1000
+
+
+def backfill(apps, schema_editor):
+    ParentAccountTransaction = apps.get_model("parent_account", "ParentAccountTransaction")
+    owner_ids = list(
+        ParentAccountTransaction.objects.order_by("account_id").values_list("account_id", flat=True).distinct()
+    )
+    # Par paquets de propriétaires : mémoire bornée, et pas d'écriture pendant un curseur ouvert (SQLite).
+    for start in range(0, len(owner_ids), OWNER_CHUNK):
+        chunk = owner_ids[start:start + OWNER_CHUNK]
+        rows = list(
+            ParentAccountTransaction.objects.filter(account_id__in=chunk)
+            .order_by("account_id", "created_at", "id")
+            .only("id", "account_id", "direction", "net_amount")
+        )
+        running = {}
+        for txn in rows:
+            key = txn.account_id
+            delta = txn.net_amount if txn.direction == "CREDIT" else -txn.net_amount
+            running[key] = running.get(key, Decimal("0")) + delta
+            txn.balance_after = running[key]
+        ParentAccountTransaction.objects.bulk_update(rows, ["balance_after"], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parent_account', '0003_parentaccounttransaction_balance_after'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
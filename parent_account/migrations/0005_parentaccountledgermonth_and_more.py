@@ -0,0 +1,53 @@
+# Generated by Django 5.2.11 on 2026-10-17 03:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parent_account', '0004_backfill_balance_after'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParentAccountLedgerMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('direction', models.CharField(choices=[('CREDIT', 'Credit'), ('DEBIT', 'Debit')], max_length=10)),
+                ('txn_type', models.CharField(choices=[('TOPUP', 'Topup'), ('TRANSFER_OUT', 'Transfer out')], max_length=20)),
+                ('gross_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('fee_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('net_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_months', to='parent_account.parentaccount')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('account', 'month', 'direction', 'txn_type'), name='uniq_parent_ledger_month')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ParentAccountTransactionArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('direction', models.CharField(choices=[('CREDIT', 'Credit'), ('DEBIT', 'Debit')], max_length=10)),
+                ('txn_type', models.CharField(choices=[('TOPUP', 'Topup'), ('TRANSFER_OUT', 'Transfer out')], max_length=20)),
+                ('gross_amount', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('fee_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('net_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('balance_after', models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True)),
+                ('provider', models.CharField(blank=True, choices=[('MTN', 'MTN Money'), ('ORANGE', 'Orange Money')], max_length=10, null=True)),
+                ('external_ref', models.CharField(blank=True, max_length=80, null=True)),
+                ('description', models.CharField(blank=True, default='', max_length=255)),
+                ('metadata', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_transactions', to='parent_account.parentaccount')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['account', 'created_at'], name='parent_acco_account_ecf62f_idx')],
+            },
+        ),
+    ]
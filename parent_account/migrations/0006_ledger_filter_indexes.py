@@ -0,0 +1,29 @@
+# Generated by Django 5.2.11 on 2026-10-17 03:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parent_account', '0005_parentaccountledgermonth_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='parentaccounttransaction',
+            index=models.Index(fields=['account', 'txn_type', 'created_at'], name='parent_acco_account_e06c24_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='parentaccounttransaction',
+            index=models.Index(fields=['account', 'direction', 'created_at'], name='parent_acco_account_801023_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='parentaccounttransactionarchive',
+            index=models.Index(fields=['account', 'txn_type', 'created_at'], name='parent_acco_account_31cf36_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='parentaccounttransactionarchive',
+            index=models.Index(fields=['account', 'direction', 'created_at'], name='parent_acco_account_fcf19a_idx'),
+        ),
+    ]
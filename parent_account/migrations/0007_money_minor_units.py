@@ -0,0 +1,161 @@
+# Generated by Django 5.2.11 on 2026-10-17 03:58
+
+import core.money
+from django.db import migrations, models
+from django.db.models import ExpressionWrapper, F, Value
+from django.db.models.functions import Round
+
+# Passage en centimes en trois temps, portable (SQLite / PostgreSQL) et réversible :
+# 1. colonnes élargies (le montant × 100 doit tenir), 2. montants × 100, 3. colonnes BIGINT (MoneyField).
+WIDE = models.DecimalField(decimal_places=2, max_digits=20)
+MONEY_FIELDS = {
+    "parentaccount": ["balance"],
+    "parentaccountledgermonth": ["fee_total", "gross_total", "net_total"],
+    "parentaccounttransaction": ["balance_after", "fee_amount", "gross_amount", "net_amount"],
+    "parentaccounttransactionarchive": ["balance_after", "fee_amount", "gross_amount", "net_amount"],
+}
+
+
+def to_minor_units(apps, schema_editor):
+    for model_name, fields in MONEY_FIELDS.items():
+        model = apps.get_model("parent_account", model_name)
+        model.objects.update(**{f: Round(F(f) * 100) for f in fields})
+
+
+def from_minor_units(apps, schema_editor):
+    for model_name, fields in MONEY_FIELDS.items():
+        model = apps.get_model("parent_account", model_name)
+        model.objects.update(
+            **{f: ExpressionWrapper(F(f) / Value(100.0), output_field=WIDE) for f in fields}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parent_account', '0006_ledger_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='parentaccount',
+            name='balance',
+            field=models.DecimalField(decimal_places=2, max_digits=20, default=0),
+        ),
+        migrations.AlterField(
+            model_name='parentaccountledgermonth',
+            name='fee_total',
+            field=models.DecimalField(decimal_places=2, max_digits=20, default=0),
+        ),
+        migrations.AlterField(
+            model_name='parentaccountledgermonth',
+            name='gross_total',
+            field=models.DecimalField(decimal_places=2, max_digits=20, default=0),
+        ),
+        migrations.AlterField(
+            model_name='parentaccountledgermonth',
+            name='net_total',
+            field=models.DecimalField(decimal_places=2, max_digits=20, default=0),
+        ),
+        migrations.AlterField(
+            model_name='parentaccounttransaction',
+            name='balance_after',
+            field=models.DecimalField(decimal_places=2, max_digits=20, blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='parentaccounttransaction',
+            name='fee_amount',
+            field=models.DecimalField(decimal_places=2, max_digits=20, default=0),
+        ),
+        migrations.AlterField(
+            model_name='parentaccounttransaction',
+            name='gross_amount',
+            field=models.DecimalField(decimal_places=2, max_digits=20),
+        ),
+        migrations.AlterField(
+            model_name='parentaccounttransaction',
+            name='net_amount',
+            field=models.DecimalField(decimal_places=2, max_digits=20, default=0),
+        ),
+        migrations.AlterField(
+            model_name='parentaccounttransactionarchive',
+            name='balance_after',
+            field=models.DecimalField(decimal_places=2, max_digits=20, blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='parentaccounttransactionarchive',
+            name='fee_amount',
+            field=models.DecimalField(decimal_places=2, max_digits=20, default=0),
+        ),
+        migrations.AlterField(
+            model_name='parentaccounttransactionarchive',
+            name='gross_amount',
+            field=models.DecimalField(decimal_places=2, max_digits=20),
+        ),
+        migrations.AlterField(
+            model_name='parentaccounttransactionarchive',
+            name='net_amount',
+            field=models.DecimalField(decimal_places=2, max_digits=20, default=0),
+        ),
+        migrations.RunPython(to_minor_units, from_minor_units),
+        migrations.AlterField(
+            model_name='parentaccount',
+            name='balance',
+            field=core.money.MoneyField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='parentaccountledgermonth',
+            name='fee_total',
+            field=core.money.MoneyField(decimal_places=2, default=0, max_digits=16),
+        ),
+        migrations.AlterField(
+            model_name='parentaccountledgermonth',
+            name='gross_total',
+            field=core.money.MoneyField(decimal_places=2, default=0, max_digits=16),
+        ),
+        migrations.AlterField(
+            model_name='parentaccountledgermonth',
+            name='net_total',
+            field=core.money.MoneyField(decimal_places=2, default=0, max_digits=16),
+        ),
+        migrations.AlterField(
+            model_name='parentaccounttransaction',
+            name='balance_after',
+            field=core.money.MoneyField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AlterField(
+            model_name='parentaccounttransaction',
+            name='fee_amount',
+            field=core.money.MoneyField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='parentaccounttransaction',
+            name='gross_amount',
+            field=core.money.MoneyField(decimal_places=2, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='parentaccounttransaction',
+            name='net_amount',
+            field=core.money.MoneyField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='parentaccounttransactionarchive',
+            name='balance_after',
+            field=core.money.MoneyField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AlterField(
+            model_name='parentaccounttransactionarchive',
+            name='fee_amount',
+            field=core.money.MoneyField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='parentaccounttransactionarchive',
+            name='gross_amount',
+            field=core.money.MoneyField(decimal_places=2, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='parentaccounttransactionarchive',
+            name='net_amount',
+            field=core.money.MoneyField(decimal_places=2, default=0, max_digits=14),
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.11 on 2026-10-17 04:05
+
+import core.enums
+from django.db import migrations
+from django.db.models import Case, F, Value, When
+
+# Les valeurs texte sont d'abord remplacées par leur code ("DEBIT" → "2") dans la colonne texte,
+# puis la colonne passe en SMALLINT : conversion directe ("2"::smallint), portable et réversible.
+TYPE_COLUMNS = {
+    "parentaccountledgermonth": {
+        "direction": {"CREDIT": 1, "DEBIT": 2},
+        "txn_type": {"TOPUP": 1, "TRANSFER_OUT": 2},
+    },
+    "parentaccounttransaction": {
+        "direction": {"CREDIT": 1, "DEBIT": 2},
+        "txn_type": {"TOPUP": 1, "TRANSFER_OUT": 2},
+    },
+    "parentaccounttransactionarchive": {
+        "direction": {"CREDIT": 1, "DEBIT": 2},
+        "txn_type": {"TOPUP": 1, "TRANSFER_OUT": 2},
+    },
+}
+
+
+def _recode(apps, mapping):
+    for model_name, fields in TYPE_COLUMNS.items():
+        model = apps.get_model("parent_account", model_name)
+        model.objects.update(
+            **{
+                field: Case(*[When(**{field: old}, then=Value(new)) for old, new in mapping(codes)], default=F(field))
+                for field, codes in fields.items()
+            }
+        )
+
+
+def to_codes(apps, schema_editor):
+    _recode(apps, lambda codes: [(value, str(code)) for value, code in codes.items()])
+
+
+def from_codes(apps, schema_editor):
+    _recode(apps, lambda codes: [(str(code), value) for value, code in codes.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parent_account', '0007_money_minor_units'),
+    ]
+
+    operations = [
+        migrations.RunPython(to_codes, from_codes),
+        migrations.AlterField(
+            model_name='parentaccountledgermonth',
+            name='direction',
+            field=core.enums.EnumField(choices=[('CREDIT', 'Credit'), ('DEBIT', 'Debit')], codes={'CREDIT': 1, 'DEBIT': 2}, max_length=6),
+        ),
+        migrations.AlterField(
+            model_name='parentaccountledgermonth',
+            name='txn_type',
+            field=core.enums.EnumField(choices=[('TOPUP', 'Topup'), ('TRANSFER_OUT', 'Transfer out')], codes={'TOPUP': 1, 'TRANSFER_OUT': 2}, max_length=12),
+        ),
+        migrations.AlterField(
+            model_name='parentaccounttransaction',
+            name='direction',
+            field=core.enums.EnumField(choices=[('CREDIT', 'Credit'), ('DEBIT', 'Debit')], codes={'CREDIT': 1, 'DEBIT': 2}, max_length=6),
+        ),
+        migrations.AlterField(
+            model_name='parentaccounttransaction',
+            name='txn_type',
+            field=core.enums.EnumField(choices=[('TOPUP', 'Topup'), ('TRANSFER_OUT', 'Transfer out')], codes={'TOPUP': 1, 'TRANSFER_OUT': 2}, max_length=12),
+        ),
+        migrations.AlterField(
+            model_name='parentaccounttransactionarchive',
+            name='direction',
+            field=core.enums.EnumField(choices=[('CREDIT', 'Credit'), ('DEBIT', 'Debit')], codes={'CREDIT': 1, 'DEBIT': 2}, max_length=6),
+        ),
+        migrations.AlterField(
+            model_name='parentaccounttransactionarchive',
+            name='txn_type',
+            field=core.enums.EnumField(choices=[('TOPUP', 'Topup'), ('TRANSFER_OUT', 'Transfer out')], codes={'TOPUP': 1, 'TRANSFER_OUT': 2}, max_length=12),
+        ),
+    ]
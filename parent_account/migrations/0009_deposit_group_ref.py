@@ -0,0 +1,37 @@
+# Generated by Django 5.2.11 on 2026-10-17 04:14
+
+from django.db import migrations, models
+from django.db.models import Value
+from django.db.models.functions import Length, Left
+
+SUFFIX = "-TRANSFER"
+
+
+def backfill_group_ref(apps, schema_editor):
+    # Transferts de dépôt : external_ref = "<référence du dépôt ou du lot>-TRANSFER".
+    for model_name in ("ParentAccountTransaction", "ParentAccountTransactionArchive"):
+        Txn = apps.get_model("parent_account", model_name)
+        Txn.objects.filter(txn_type="TRANSFER_OUT", external_ref__endswith=SUFFIX, group_ref__isnull=True).update(
+            group_ref=Left("external_ref", Length("external_ref") - Value(len(SUFFIX)))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parent_account', '0008_compact_type_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parentaccounttransaction',
+            name='group_ref',
+            field=models.CharField(blank=True, db_index=True, max_length=80, null=True),
+        ),
+        migrations.AddField(
+            model_name='parentaccounttransactionarchive',
+            name='group_ref',
+            field=models.CharField(blank=True, db_index=True, max_length=80, null=True),
+        ),
+        migrations.RunPython(backfill_group_ref, migrations.RunPython.noop),
+    ]
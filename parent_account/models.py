@@ -1,15 +1,22 @@
 from django.conf import settings
 from django.db import models
+from core.enums import EnumField
+from core.money import MoneyField
 
 User = settings.AUTH_USER_MODEL
 
 class ParentAccount(models.Model):
     parent = models.OneToOneField(User, on_delete=models.CASCADE, related_name="parent_account")
     currency = models.CharField(max_length=8, default="XAF")
-    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    balance = MoneyField(default=0)
     updated_at = models.DateTimeField(auto_now=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.CheckConstraint(condition=models.Q(balance__gte=0), name="parent_account_balance_gte_0"),
+        ]
+
 
 class ParentAccountTransaction(models.Model):
     class Direction(models.TextChoices):
@@ -25,19 +32,72 @@ class ParentAccountTransaction(models.Model):
         ORANGE = "ORANGE", "Orange Money"
 
     account = models.ForeignKey(ParentAccount, on_delete=models.CASCADE, related_name="transactions")
-    direction = models.CharField(max_length=10, choices=Direction.choices)
-    txn_type = models.CharField(max_length=20, choices=TxnType.choices)
+    direction = EnumField(Direction)
+    txn_type = EnumField(TxnType)
 
-    gross_amount = models.DecimalField(max_digits=14, decimal_places=2)
-    fee_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
-    net_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    gross_amount = MoneyField()
+    fee_amount = MoneyField(default=0)
+    net_amount = MoneyField(default=0)
+    balance_after = MoneyField(null=True, blank=True)
 
     provider = models.CharField(max_length=10, choices=Provider.choices, null=True, blank=True)
     external_ref = models.CharField(max_length=80, null=True, blank=True, unique=True)
+    # Référence du dépôt financé (celle du lot pour un dépôt groupé) : relie le transfert à ses lignes wallet.
+    group_ref = models.CharField(max_length=80, null=True, blank=True, db_index=True)
     description = models.CharField(max_length=255, blank=True, default="")
     metadata = models.JSONField(default=dict, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        indexes = [models.Index(fields=["account", "created_at"])]
\ No newline at end of file
+        indexes = [
+            models.Index(fields=["account", "created_at"]),
+            models.Index(fields=["account", "txn_type", "created_at"]),
+            models.Index(fields=["account", "direction", "created_at"]),
+        ]
+
+
+class ParentAccountTransactionArchive(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    account = models.ForeignKey(ParentAccount, on_delete=models.CASCADE, related_name="archived_transactions")
+    direction = EnumField(ParentAccountTransaction.Direction)
+    txn_type = EnumField(ParentAccountTransaction.TxnType)
+
+    gross_amount = MoneyField()
+    fee_amount = MoneyField(default=0)
+    net_amount = MoneyField(default=0)
+    balance_after = MoneyField(null=True, blank=True)
+
+    provider = models.CharField(max_length=10, choices=ParentAccountTransaction.Provider.choices, null=True, blank=True)
+    external_ref = models.CharField(max_length=80, null=True, blank=True)
+    group_ref = models.CharField(max_length=80, null=True, blank=True, db_index=True)
+    description = models.CharField(max_length=255, blank=True, default="")
+    metadata = models.JSONField(default=dict, blank=True)
+
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["account", "created_at"]),
+            models.Index(fields=["account", "txn_type", "created_at"]),
+            models.Index(fields=["account", "direction", "created_at"]),
+        ]
+
+
+class ParentAccountLedgerMonth(models.Model):
+    account = models.ForeignKey(ParentAccount, on_delete=models.CASCADE, related_name="ledger_months")
+    month = models.DateField()
+    direction = EnumField(ParentAccountTransaction.Direction)
+    txn_type = EnumField(ParentAccountTransaction.TxnType)
+    gross_total = MoneyField(max_digits=16, default=0)
+    fee_total = MoneyField(max_digits=16, default=0)
+    net_total = MoneyField(max_digits=16, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["account", "month", "direction", "txn_type"], name="uniq_parent_ledger_month"
+            ),
+        ]
@@ -11,7 +11,7 @@ class ParentAccountTransactionSerializer(serializers.ModelSerializer):
         model = ParentAccountTransaction
         fields = [
             "id", "direction", "txn_type", "gross_amount", "fee_amount", "net_amount",
-            "provider", "external_ref", "description", "metadata", "created_at"
+            "balance_after", "provider", "external_ref", "group_ref", "description", "metadata", "created_at"
         ]
 
 class TopUpSerializer(serializers.Serializer):
@@ -1,39 +1,62 @@
-from decimal import Decimal, ROUND_HALF_UP
+from decimal import Decimal
 from django.conf import settings
 from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from core.db import update_returning
+from core.money import Money, money_expr, money_value
 from .models import ParentAccount, ParentAccountTransaction
 
-Q = Decimal("0.01")
-
-def _q(v):
-    return (v or Decimal("0")).quantize(Q, rounding=ROUND_HALF_UP)
-
-def get_or_create_parent_account(parent):
+def provision_parent_account(parent):
     acc, _ = ParentAccount.objects.get_or_create(parent=parent)
     return acc
 
+def provision_parent_accounts(parent_ids):
+    ParentAccount.objects.bulk_create([ParentAccount(parent_id=i) for i in set(parent_ids)], ignore_conflicts=True)
+
+def get_parent_account(parent):
+    # `parent.parent_account` est mis en cache sur l'instance : une requête au plus par requête HTTP.
+    try:
+        return parent.parent_account
+    except ParentAccount.DoesNotExist:
+        acc = provision_parent_account(parent)
+        parent.parent_account = acc
+        return acc
+
+def _shift_account(parent_filter, delta, **conditions):
+    """UPDATE du solde du compte, compte rendu tel qu'écrit par la même instruction (None si aucune ligne)."""
+    rows = update_returning(
+        ParentAccount.objects.filter(**parent_filter, **conditions),
+        balance=money_expr(F("balance") + money_value(delta)),
+        updated_at=timezone.now(),
+    )
+    return rows[0] if rows else None
+
 def fee_percent():
     return getattr(settings, "PLATFORM_FEE_PERCENT", Decimal("0"))
 
 @transaction.atomic
 def topup(parent, amount, provider=None, external_ref=None, description=""):
-    amount = _q(Decimal(amount))
-    acc = ParentAccount.objects.select_for_update().get_or_create(parent=parent)[0]
-
+    amount = Money.of(amount)
     pct = fee_percent()
-    fee = _q(amount * pct / Decimal("100"))
-    net = _q(amount - fee)
+    fee = amount.percent(pct)
+    net = amount - fee
 
-    acc.balance = _q(acc.balance + net)
-    acc.save(update_fields=["balance", "updated_at"])
+    # Sans verrou préalable : l'incrément et la lecture du nouveau solde forment une seule instruction.
+    acc = _shift_account({"parent": parent}, net)
+    if acc is None:
+        provision_parent_account(parent)
+        acc = _shift_account({"parent": parent}, net)
+    parent.parent_account = acc
 
     txn = ParentAccountTransaction.objects.create(
         account=acc,
         direction=ParentAccountTransaction.Direction.CREDIT,
         txn_type=ParentAccountTransaction.TxnType.TOPUP,
-        gross_amount=amount,
-        fee_amount=fee,
-        net_amount=net,
+        gross_amount=amount.amount,
+        fee_amount=fee.amount,
+        net_amount=net.amount,
+        balance_after=acc.balance,
         provider=provider,
         external_ref=external_ref,
         description=description,
@@ -43,28 +66,38 @@ def topup(parent, amount, provider=None, external_ref=None, description=""):
     return acc, txn
 
 @transaction.atomic
-def transfer_out(parent, amount, external_ref=None, description="", metadata=None):
+def transfer_out(parent, amount, external_ref=None, description="", metadata=None, locked_account=None, group_ref=None):
+    """
+    Débite le compte parent. `locked_account` : compte déjà verrouillé par l'appelant
+    (`wallet.services.lock_for_movement`, mouvements sur plusieurs lignes) ; sans lui, l'UPDATE
+    conditionnel suffit.
+    `group_ref` : référence du dépôt (ou du lot) financé par ce transfert.
+    """
     if metadata is None:
         metadata = {}
-    amount = _q(Decimal(amount))
-    acc = ParentAccount.objects.select_for_update().get_or_create(parent=parent)[0]
+    amount = Money.of(amount)
 
-    if _q(acc.balance) < amount:
+    # Contrôle de solde, débit et lecture du nouveau solde en une seule instruction.
+    if locked_account is not None:
+        acc = _shift_account({"pk": locked_account.pk}, -amount, balance__gte=amount.amount)
+    else:
+        acc = _shift_account({"parent": parent}, -amount, balance__gte=amount.amount)
+    if acc is None:
         raise ValueError("INSUFFICIENT_PARENT_BALANCE")
-
-    acc.balance = _q(acc.balance - amount)
-    acc.save(update_fields=["balance", "updated_at"])
+    parent.parent_account = acc
 
     txn = ParentAccountTransaction.objects.create(
         account=acc,
         direction=ParentAccountTransaction.Direction.DEBIT,
         txn_type=ParentAccountTransaction.TxnType.TRANSFER_OUT,
-        gross_amount=amount,
+        gross_amount=amount.amount,
         fee_amount=Decimal("0"),
-        net_amount=amount,
+        net_amount=amount.amount,
+        balance_after=acc.balance,
         external_ref=external_ref,
+        group_ref=group_ref,
         description=description,
         metadata=metadata,
     )
 
-    return acc, txn
\ No newline at end of file
+    return acc, txn
@@ -1,3 +1,40 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-# Create your tests here.
+from wallet.tests import LedgerFixtures
+from .models import ParentAccount
+from .services import topup, transfer_out
+
+User = get_user_model()
+
+
+class ParentAccountWriteTests(LedgerFixtures, TestCase):
+    def fresh_parent(self):
+        return User.objects.get(pk=self.parent.pk)
+
+    def test_topup_without_lock_or_read(self):
+        topup(self.parent, Decimal("1000.00"))
+        parent = self.fresh_parent()
+        # UPDATE ... RETURNING du compte, INSERT de la transaction : ni verrou préalable, ni relecture.
+        with self.assertStatements(2):
+            acc, txn = topup(parent, Decimal("200.00"))
+        self.assertEqual(txn.balance_after, Decimal("1170.00"))
+        self.assertEqual(acc.balance, Decimal("1170.00"))
+        self.assertEqual(ParentAccount.objects.get(pk=acc.pk).balance, Decimal("1170.00"))
+
+    def test_topup_provisions_a_missing_account(self):
+        ParentAccount.objects.filter(parent=self.parent).delete()
+        acc, txn = topup(self.fresh_parent(), Decimal("100.00"))
+        self.assertEqual((acc.balance, txn.balance_after), (Decimal("97.50"), Decimal("97.50")))
+
+    def test_transfer_out_without_a_locked_account(self):
+        topup(self.parent, Decimal("1000.00"))
+        parent = self.fresh_parent()
+        with self.assertStatements(2):
+            acc, txn = transfer_out(parent, Decimal("75.00"))
+        self.assertEqual(txn.balance_after, Decimal("900.00"))
+        self.assertEqual(ParentAccount.objects.get(pk=acc.pk).balance, Decimal("900.00"))
+        with self.assertRaisesMessage(ValueError, "INSUFFICIENT_PARENT_BALANCE"):
+            transfer_out(parent, Decimal("901.00"))
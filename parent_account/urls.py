@@ -1,8 +1,14 @@
 from django.urls import path
-from .views import ParentAccountMeAPIView, ParentAccountTransactionsAPIView, ParentTopUpAPIView
+from .views import (
+    ParentAccountMeAPIView,
+    ParentAccountTransactionsAPIView,
+    ParentAccountTransactionsExportAPIView,
+    ParentTopUpAPIView,
+)
 
 urlpatterns = [
     path("me/", ParentAccountMeAPIView.as_view()),
     path("me/transactions/", ParentAccountTransactionsAPIView.as_view()),
+    path("me/transactions/export/", ParentAccountTransactionsExportAPIView.as_view()),
     path("topup/", ParentTopUpAPIView.as_view()),
 ]
\ No newline at end of file
@@ -1,8 +1,15 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
 from accounts.permissions import IsParent
-from .services import get_or_create_parent_account, topup
-from .models import ParentAccountTransaction
+from wallet.deposits import legs_by_transfer
+from wallet.exports import LedgerExportAPIView
+from wallet.filters import LedgerFilterBackend
+from wallet.idempotency import IDEMPOTENCY_PARAMETER, IdempotentCreateMixin
+from wallet.pagination import LedgerCursorPagination
+from wallet.serializers import WalletTransactionSerializer
+from .services import get_parent_account, topup
+from .models import ParentAccountTransaction, ParentAccountTransactionArchive
 from .serializers import ParentAccountSerializer, ParentAccountTransactionSerializer, TopUpSerializer
 
 class ParentAccountMeAPIView(generics.RetrieveAPIView):
@@ -10,17 +17,77 @@ class ParentAccountMeAPIView(generics.RetrieveAPIView):
     serializer_class = ParentAccountSerializer
 
     def get_object(self):
-        return get_or_create_parent_account(self.request.user)
+        return get_parent_account(self.request.user)
 
+@extend_schema(
+    tags=["Parent account"],
+    summary="Transactions du compte parent",
+    description=(
+        "Historique du compte parent (archives incluses), du plus récent au plus ancien.\n\n"
+        "`expand=legs` : chaque transfert de dépôt est accompagné de ses lignes wallet (`legs`, "
+        "avec `student_id`), chargées en une requête groupée pour toute la page."
+    ),
+    parameters=[
+        OpenApiParameter(name="expand", type=str, required=False, enum=["legs"]),
+    ],
+)
 class ParentAccountTransactionsAPIView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated, IsParent]
     serializer_class = ParentAccountTransactionSerializer
+    pagination_class = LedgerCursorPagination
+    filter_backends = [LedgerFilterBackend]
+    ledger_filter_fields = ["txn_type", "direction"]
+    ledger_amount_field = "net_amount"
 
     def get_queryset(self):
-        acc = get_or_create_parent_account(self.request.user)
-        return ParentAccountTransaction.objects.filter(account=acc).order_by("-created_at")
+        return ParentAccountTransaction.objects.filter(account__parent=self.request.user).order_by("-created_at")
 
-class ParentTopUpAPIView(generics.CreateAPIView):
+    def get_archive_queryset(self):
+        return ParentAccountTransactionArchive.objects.filter(account__parent=self.request.user)
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        data = self.get_serializer(page, many=True).data
+        if request.query_params.get("expand") == "legs":
+            legs = legs_by_transfer([row.pk for row in page])
+            for row, item in zip(page, data):
+                item["legs"] = [
+                    {**WalletTransactionSerializer(leg).data, "student_id": leg.wallet.student_id}
+                    for leg in legs.get(row.pk, [])
+                ]
+        return self.get_paginated_response(data)
+
+@extend_schema(
+    tags=["Parent account"],
+    summary="Exporter les transactions du compte parent",
+    parameters=[
+        OpenApiParameter(name="format", type=str, required=False, enum=["csv", "ndjson"]),
+    ],
+    responses={200: OpenApiResponse(description="Fichier CSV ou NDJSON")},
+)
+class ParentAccountTransactionsExportAPIView(LedgerExportAPIView):
+    permission_classes = [permissions.IsAuthenticated, IsParent]
+    export_fields = [
+        "id", "created_at", "direction", "txn_type", "gross_amount", "fee_amount", "net_amount",
+        "balance_after", "provider", "external_ref", "description"
+    ]
+    export_name = "parent-account-transactions"
+    ledger_filter_fields = ["txn_type", "direction"]
+    ledger_amount_field = "net_amount"
+
+    def get_queryset(self):
+        return ParentAccountTransaction.objects.filter(account__parent=self.request.user)
+
+    def get_archive_queryset(self):
+        return ParentAccountTransactionArchive.objects.filter(account__parent=self.request.user)
+
+@extend_schema(
+    tags=["Parent account"],
+    summary="Recharger le compte parent",
+    request=TopUpSerializer,
+    parameters=[IDEMPOTENCY_PARAMETER],
+)
+class ParentTopUpAPIView(IdempotentCreateMixin, generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated, IsParent]
     serializer_class = TopUpSerializer
 
@@ -1,7 +1,29 @@
 from django.contrib import admin
-from .models import Wallet, WalletBucket, WalletTransaction
+from .models import (
+    Wallet,
+    WalletBucket,
+    WalletTransaction,
+    WalletDailySpend,
+    ReconciliationReport,
+    ReconciliationDrift,
+    WalletTransactionArchive,
+    WalletLedgerMonth,
+    IdempotencyKey,
+    AllocationRun,
+    AllocationLine,
+    WalletMonthlyRollup,
+)
 
 # Register your models here.
 admin.site.register(Wallet)
 admin.site.register(WalletBucket)
-admin.site.register(WalletTransaction)
\ No newline at end of file
+admin.site.register(WalletTransaction)
+admin.site.register(WalletDailySpend)
+admin.site.register(ReconciliationReport)
+admin.site.register(ReconciliationDrift)
+admin.site.register(WalletTransactionArchive)
+admin.site.register(WalletLedgerMonth)
+admin.site.register(IdempotencyKey)
+admin.site.register(AllocationRun)
+admin.site.register(AllocationLine)
+admin.site.register(WalletMonthlyRollup)
@@ -0,0 +1,128 @@
+"""
+Archivage des mois clos du ledger.
+
+Les lignes antérieures à la date de coupure sont copiées par paquets (ordre d'id) dans les tables
+d'archive, puis supprimées des tables vivantes ; chaque paquet ajoute ses montants au résumé mensuel
+(WalletLedgerMonth / ParentAccountLedgerMonth), dans la même transaction. Les requêtes chaudes
+(spent_today, totaux du mois) ne lisent que les tables vivantes ; l'historique et les exports lisent
+les deux.
+"""
+from datetime import datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from parent_account.models import (
+    ParentAccountLedgerMonth,
+    ParentAccountTransaction,
+    ParentAccountTransactionArchive,
+)
+from .models import WalletLedgerMonth, WalletTransaction, WalletTransactionArchive
+from .services import month_of
+
+WALLET_ARCHIVE_FIELDS = [
+    "id", "wallet_id", "actor_id", "bucket_type", "direction", "txn_type", "amount", "balance_after",
+    "description", "external_ref", "metadata", "allocation_id", "group_ref", "transfer_id", "created_at",
+]
+ACCOUNT_ARCHIVE_FIELDS = [
+    "id", "account_id", "direction", "txn_type", "gross_amount", "fee_amount", "net_amount", "balance_after",
+    "provider", "external_ref", "group_ref", "description", "metadata", "created_at",
+]
+
+
+def month_cutoff(year: int, month: int):
+    """Début (aware, fuseau courant) du mois donné : tout ce qui précède est archivable."""
+    return timezone.make_aware(datetime(year, month, 1))
+
+
+@transaction.atomic
+def archive_wallet_batch(cutoff, batch_size: int) -> int:
+    rows = list(WalletTransaction.objects.filter(created_at__lt=cutoff).order_by("id")[:batch_size])
+    if not rows:
+        return 0
+
+    WalletTransactionArchive.objects.bulk_create(
+        [WalletTransactionArchive(**{f: getattr(r, f) for f in WALLET_ARCHIVE_FIELDS}) for r in rows]
+    )
+
+    totals = {}
+    for r in rows:
+        key = (r.wallet_id, month_of(r.created_at), r.bucket_type, r.direction, r.txn_type)
+        total, count = totals.get(key, (Decimal("0"), 0))
+        totals[key] = (total + r.amount, count + 1)
+
+    existing = {
+        (m.wallet_id, m.month, m.bucket_type, m.direction, m.txn_type): m
+        for m in WalletLedgerMonth.objects.filter(
+            wallet_id__in={k[0] for k in totals}, month__in={k[1] for k in totals}
+        )
+    }
+    to_create, to_update = [], []
+    for key, (total, count) in totals.items():
+        summary = existing.get(key)
+        if summary:
+            summary.total += total
+            summary.count += count
+            to_update.append(summary)
+        else:
+            wallet_id, month, bucket_type, direction, txn_type = key
+            to_create.append(
+                WalletLedgerMonth(
+                    wallet_id=wallet_id, month=month, bucket_type=bucket_type, direction=direction,
+                    txn_type=txn_type, total=total, count=count,
+                )
+            )
+    WalletLedgerMonth.objects.bulk_create(to_create)
+    WalletLedgerMonth.objects.bulk_update(to_update, ["total", "count"])
+
+    WalletTransaction.objects.filter(id__in=[r.id for r in rows]).delete()
+    return len(rows)
+
+
+@transaction.atomic
+def archive_account_batch(cutoff, batch_size: int) -> int:
+    rows = list(ParentAccountTransaction.objects.filter(created_at__lt=cutoff).order_by("id")[:batch_size])
+    if not rows:
+        return 0
+
+    ParentAccountTransactionArchive.objects.bulk_create(
+        [ParentAccountTransactionArchive(**{f: getattr(r, f) for f in ACCOUNT_ARCHIVE_FIELDS}) for r in rows]
+    )
+
+    zero = Decimal("0")
+    totals = {}
+    for r in rows:
+        key = (r.account_id, month_of(r.created_at), r.direction, r.txn_type)
+        gross, fee, net, count = totals.get(key, (zero, zero, zero, 0))
+        totals[key] = (gross + r.gross_amount, fee + r.fee_amount, net + r.net_amount, count + 1)
+
+    existing = {
+        (m.account_id, m.month, m.direction, m.txn_type): m
+        for m in ParentAccountLedgerMonth.objects.filter(
+            account_id__in={k[0] for k in totals}, month__in={k[1] for k in totals}
+        )
+    }
+    to_create, to_update = [], []
+    for key, (gross, fee, net, count) in totals.items():
+        summary = existing.get(key)
+        if summary:
+            summary.gross_total += gross
+            summary.fee_total += fee
+            summary.net_total += net
+            summary.count += count
+            to_update.append(summary)
+        else:
+            account_id, month, direction, txn_type = key
+            to_create.append(
+                ParentAccountLedgerMonth(
+                    account_id=account_id, month=month, direction=direction, txn_type=txn_type,
+                    gross_total=gross, fee_total=fee, net_total=net, count=count,
+                )
+            )
+    ParentAccountLedgerMonth.objects.bulk_create(to_create)
+    ParentAccountLedgerMonth.objects.bulk_update(to_update, ["gross_total", "fee_total", "net_total", "count"])
+
+    ParentAccountTransaction.objects.filter(id__in=[r.id for r in rows]).delete()
+    return len(rows)
+
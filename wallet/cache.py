@@ -0,0 +1,120 @@
+"""
+Cache versionné des payloads wallet (wallet + enveloppes sérialisés).
+
+Clé : (wallet_id, version). La version est un jeton stocké dans le cache, remplacé après commit par
+chaque écriture (credit / debit, dépôts groupés, paramètres, correction de réconciliation) : les
+lectures suivantes manquent l'ancienne entrée et reconstruisent le payload. Le remplacement se fait
+dans `on_commit` pour qu'aucune lecture ne mette en cache, sous la nouvelle version, un état pas
+encore validé.
+
+Le jeton de version doit être partagé par tous les processus : backend fichier (défaut, cf. CACHES),
+redis ou memcached. Avec locmem, seul le processus qui a écrit voit le nouveau jeton ; les autres
+servent l'ancien payload jusqu'à WALLET_CACHE_TIMEOUT (à réserver à un déploiement mono-processus).
+
+Hits et misses ne passent pas par le cache : `incr` du backend fichier lit puis réécrit le fichier,
+et deux processus perdent des incréments. Chaque processus compte en mémoire (sous verrou) et ajoute
+ses comptes aux lignes `CacheCounter` par un UPDATE atomique, toutes les
+WALLET_CACHE_STATS_FLUSH_EVERY lectures ou WALLET_CACHE_STATS_FLUSH_INTERVAL secondes.
+"""
+import threading
+import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import CacheCounter
+
+HITS = "wallet-cache:hits"
+MISSES = "wallet-cache:misses"
+
+_counts_lock = threading.Lock()
+_counts = {HITS: 0, MISSES: 0}
+_last_flush = time.monotonic()
+
+
+def _version_key(wallet_id):
+    return f"wallet:{wallet_id}:version"
+
+
+def _payload_key(wallet_id, version):
+    return f"wallet:{wallet_id}:payload:{version}"
+
+
+def _add_to_counter(name, amount):
+    counter = CacheCounter.objects.filter(name=name)
+    if counter.update(value=F("value") + amount):
+        return
+    try:
+        with transaction.atomic():
+            CacheCounter.objects.create(name=name, value=amount)
+    except IntegrityError:
+        counter.update(value=F("value") + amount)
+
+
+def flush_cache_stats():
+    """Ajoute aux compteurs partagés ce que ce processus a compté depuis le dernier envoi."""
+    global _last_flush
+    with _counts_lock:
+        pending = {name: count for name, count in _counts.items() if count}
+        for name in _counts:
+            _counts[name] = 0
+        _last_flush = time.monotonic()
+    for name, count in pending.items():
+        _add_to_counter(name, count)
+
+
+def _count(name):
+    with _counts_lock:
+        _counts[name] += 1
+        due = (
+            sum(_counts.values()) >= getattr(settings, "WALLET_CACHE_STATS_FLUSH_EVERY", 100)
+            or time.monotonic() - _last_flush >= getattr(settings, "WALLET_CACHE_STATS_FLUSH_INTERVAL", 60)
+        )
+    if due:
+        flush_cache_stats()
+
+
+def wallet_version(wallet_id) -> str:
+    key = _version_key(wallet_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_wallet_version(wallet_id):
+    """Invalide le payload du wallet une fois la transaction courante validée."""
+    transaction.on_commit(lambda: cache.set(_version_key(wallet_id), uuid4().hex, timeout=None))
+
+
+def cached_wallet_payload(wallet_id, build):
+    """Payload du wallet depuis le cache, ou `build()` (mis en cache) si la version a changé."""
+    key = _payload_key(wallet_id, wallet_version(wallet_id))
+    payload = cache.get(key)
+    if payload is not None:
+        _count(HITS)
+        return payload
+    _count(MISSES)
+    payload = build()
+    cache.set(key, payload, timeout=getattr(settings, "WALLET_CACHE_TIMEOUT", 300))
+    return payload
+
+
+def cache_stats() -> dict:
+    """Hits / misses de tous les processus, hors comptes pas encore envoyés par les autres."""
+    flush_cache_stats()
+    values = dict(CacheCounter.objects.filter(name__in=[HITS, MISSES]).values_list("name", "value"))
+    hits, misses = values.get(HITS, 0), values.get(MISSES, 0)
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "hit_rate": round(hits / total, 4) if total else None}
+
+
+def reset_cache_stats():
+    with _counts_lock:
+        for name in _counts:
+            _counts[name] = 0
+    CacheCounter.objects.filter(name__in=[HITS, MISSES]).delete()
@@ -0,0 +1,383 @@
+from decimal import Decimal
+from uuid import uuid4
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Case, F, Prefetch, Q, When
+from django.utils import timezone
+
+from budgeting.allocation import compute_allocation
+from core.money import MoneyField, money_expr, money_value
+from budgeting.models import BillItem, BudgetPlan
+from parent_account.models import ParentAccountTransactionArchive
+from parent_account.services import get_parent_account, transfer_out
+from relationships.models import ParentStudentLink
+from .cache import bump_wallet_version
+from .models import AllocationLine, AllocationRun, Wallet, WalletBucket, WalletTransaction, WalletTransactionArchive
+from .services import lock_for_movement, provision_wallets, record_rollups
+
+User = get_user_model()
+
+BUCKET_ORDER = [WalletBucket.Type.BILLS, WalletBucket.Type.SAVINGS, WalletBucket.Type.DAILY]
+
+
+def active_plans_for(student_ids) -> dict:
+    """Plan ACTIVE le plus récent de chaque étudiant, bills préchargées (2 requêtes au total)."""
+    plans = (
+        BudgetPlan.objects.filter(student_id__in=student_ids, status=BudgetPlan.Status.ACTIVE)
+        .prefetch_related(Prefetch("bills", queryset=BillItem.objects.order_by("priority", "created_at")))
+        .order_by("-created_at")
+    )
+    by_student = {}
+    for plan in plans:
+        by_student.setdefault(plan.student_id, plan)
+    return by_student
+
+
+def allocation_legs(wallet, plan, amount: Decimal, group_ref: str):
+    """
+    Répartit un dépôt selon le plan. Retourne (alloc, run, lines, legs) :
+    `run` / `lines` sont l'AllocationRun et les AllocationLine (par charge) à enregistrer,
+    `legs` la liste de (bucket_type, montant, external_ref). Sans plan, tout va dans DAILY.
+    """
+    if not plan:
+        run = AllocationRun(wallet=wallet, mode=AllocationRun.Mode.AUTO_FALLBACK, group_ref=group_ref[:80])
+        return None, run, [], [(WalletBucket.Type.DAILY, amount, f"{group_ref}-DAILY"[:80])]
+
+    alloc = compute_allocation(plan, Decimal(amount))
+    run = AllocationRun(
+        wallet=wallet,
+        plan=plan,
+        mode=AllocationRun.Mode.AUTO_PLAN,
+        group_ref=group_ref[:80],
+        deposit_amount=Decimal(alloc["deposit_amount"]),
+        savings_target=Decimal(alloc["savings_target"]),
+    )
+    lines = [
+        AllocationLine(
+            run=run,
+            bill_id=b["bill_id"],
+            title=b["title"],
+            need=Decimal(b["need"]),
+            allocated=Decimal(b["allocated"]),
+        )
+        for b in alloc["bills_breakdown"]
+    ]
+    amounts = {
+        WalletBucket.Type.BILLS: Decimal(alloc["bills_allocated"]),
+        WalletBucket.Type.SAVINGS: Decimal(alloc["savings_allocated"]),
+        WalletBucket.Type.DAILY: Decimal(alloc["daily_allocated"]),
+    }
+    legs = [
+        (bucket_type, amounts[bucket_type], f"{group_ref}-{bucket_type}"[:80])
+        for bucket_type in BUCKET_ORDER
+        if amounts[bucket_type] > 0
+    ]
+    return alloc, run, lines, legs
+
+
+def save_allocations(runs, lines):
+    """Deux INSERT groupés (runs puis lignes) ; les lignes restent en cache sur leur run pour la réponse."""
+    AllocationRun.objects.bulk_create(runs)
+    if lines:
+        AllocationLine.objects.bulk_create(lines)
+    by_run = {}
+    for line in lines:
+        by_run.setdefault(id(line.run), []).append(line)
+    for run in runs:
+        run._prefetched_objects_cache = {"lines": by_run.get(id(run), [])}
+
+
+def apply_bucket_deltas(deltas: dict, now):
+    """Un seul UPDATE pour créditer plusieurs enveloppes : {bucket_id: montant}."""
+    WalletBucket.objects.filter(id__in=deltas).update(
+        balance=money_expr(
+            F("balance")
+            + Case(
+                *[When(id=bucket_id, then=money_value(delta)) for bucket_id, delta in deltas.items()],
+                output_field=MoneyField(),
+            )
+        ),
+        updated_at=now,
+    )
+
+
+@transaction.atomic
+def deposit(parent, student_id, amount: Decimal, external_ref=None, description: str = ""):
+    """
+    Dépôt parent → étudiant avec allocation automatique, en un nombre fixe d'instructions SQL,
+    quel que soit le nombre d'enveloppes créditées :
+
+    1.   plan actif de l'étudiant (SELECT)
+    2-3. `lock_for_movement` : compte parent, puis enveloppes par id, wallet joint (SELECT ... FOR UPDATE ×2)
+         (+1 SELECT de l'id du compte s'il n'est pas déjà en cache sur `parent`)
+    4-5. `transfer_out` : UPDATE conditionnel du solde parent (RETURNING), INSERT de la transaction parent
+    6.   INSERT de l'AllocationRun
+    7.   UPDATE unique des enveloppes créditées (CASE)
+    8.   INSERT groupé des WalletTransaction
+    9.   `record_rollups` : UPDATE du total mensuel (une seule enveloppe créditée) ;
+         plusieurs enveloppes : SELECT des totaux mensuels, puis UPDATE groupé
+         (+1 INSERT au premier dépôt du mois par enveloppe)
+
+    Avec un plan actif : +1 SELECT (bills), +1 UPDATE du wallet (devise / plafond journalier),
+    +1 INSERT groupé des AllocationLine si des charges sont servies et le SELECT des totaux. Soit
+    10 instructions sans plan et 14 avec (compte non caché, totaux du mois existants ; cf.
+    wallet/tests.py), 15 au plus.
+    Hors SAVEPOINT / RELEASE.
+
+    Les enveloppes verrouillées sont mises à jour en mémoire et posées comme cache de prefetch
+    `buckets` du wallet renvoyé : la réponse se sérialise sans relire la base.
+    Retourne (wallet, transactions).
+    """
+    group_ref = (external_ref or "").strip() or f"AUTO-{uuid4().hex[:10].upper()}"
+    plan = active_plans_for([student_id]).get(student_id)
+
+    account_id = get_parent_account(parent).pk
+    account, buckets = lock_for_movement(account_id=account_id, student_ids=[student_id])
+    if len(buckets) < len(BUCKET_ORDER):
+        # Compte antérieur au provisionnement à l'inscription : rattrapage, puis verrouillage.
+        provision_wallets([student_id])
+        _, buckets = lock_for_movement(student_ids=[student_id])
+    wallet = buckets[0].wallet
+
+    _, transfer_txn = transfer_out(
+        parent=parent,
+        amount=amount,
+        external_ref=f"{group_ref}-TRANSFER"[:80],
+        description=description,
+        metadata={"student_id": student_id},
+        locked_account=account,
+        group_ref=group_ref[:80],
+    )
+    by_type = {b.bucket_type: b for b in buckets}
+
+    alloc, run, lines, legs = allocation_legs(wallet, plan, amount, group_ref)
+    if alloc:
+        wallet.currency = alloc["currency"] or wallet.currency
+        wallet.daily_limit = Decimal(alloc["daily_limit"])
+        wallet.save(update_fields=["currency", "daily_limit"])
+    save_allocations([run], lines)
+
+    now = timezone.now()
+    deltas = {}
+    txns = []
+    for bucket_type, leg_amount, leg_ref in legs:
+        bucket = by_type[bucket_type]
+        bucket.balance += leg_amount
+        bucket.updated_at = now
+        deltas[bucket.id] = deltas.get(bucket.id, Decimal("0")) + leg_amount
+        txns.append(
+            WalletTransaction(
+                wallet=wallet,
+                actor=parent,
+                bucket_type=bucket_type,
+                direction=WalletTransaction.Direction.CREDIT,
+                txn_type=WalletTransaction.TxnType.DEPOSIT,
+                amount=leg_amount,
+                balance_after=bucket.balance,
+                description=description,
+                external_ref=leg_ref,
+                allocation=run,
+                group_ref=run.group_ref,
+                transfer=transfer_txn,
+            )
+        )
+
+    apply_bucket_deltas(deltas, now)
+    WalletTransaction.objects.bulk_create(txns)
+    record_rollups(txns)
+    bump_wallet_version(wallet.id)
+
+    wallet._prefetched_objects_cache = {"buckets": buckets}
+    return wallet, txns
+
+
+@transaction.atomic
+def bulk_deposit(parent, items, description: str = "") -> dict:
+    """
+    Dépôts d'un parent vers plusieurs étudiants en une seule transaction.
+
+    - liens parent/étudiant, wallets, plans et bills chargés en bloc ;
+    - un seul débit du compte parent pour le total accepté ;
+    - compte parent puis enveloppes verrouillés via `lock_for_movement`, enveloppes mises à jour en un seul UPDATE ;
+    - toutes les WalletTransaction écrites via `bulk_create`, totaux mensuels mis à jour en bloc.
+
+    Chaque élément réussit ou échoue indépendamment (étudiant non lié, référence déjà utilisée,
+    solde parent insuffisant). Les éléments acceptés sont traités dans l'ordre de la requête.
+    """
+    is_admin = parent.is_superuser or getattr(parent, "role", None) == "ADMIN"
+    results = [{"index": i, "student_id": item["student_id"], "status": "PENDING"} for i, item in enumerate(items)]
+
+    def fail(i, error):
+        results[i]["status"] = "FAILED"
+        results[i]["error"] = error
+
+    student_ids = {item["student_id"] for item in items}
+    if is_admin:
+        allowed = set(User.objects.filter(id__in=student_ids).values_list("id", flat=True))
+    else:
+        allowed = set(
+            ParentStudentLink.objects.filter(
+                parent=parent, student_id__in=student_ids, status=ParentStudentLink.Status.ACTIVE
+            ).values_list("student_id", flat=True)
+        )
+
+    group_refs = {}
+    seen_refs = set()
+    for i, item in enumerate(items):
+        if item["student_id"] not in allowed:
+            fail(i, "Parent not linked to this student.")
+            continue
+        ext = (item.get("external_ref") or "").strip() or None
+        group_ref = ext or f"AUTO-{uuid4().hex[:10].upper()}"
+        if group_ref in seen_refs:
+            fail(i, "Duplicate external_ref in request.")
+            continue
+        seen_refs.add(group_ref)
+        group_refs[i] = group_ref
+
+    candidate_refs = [f"{ref}-{suffix}"[:80] for ref in group_refs.values() for suffix in BUCKET_ORDER]
+    used_refs = set(WalletTransaction.objects.filter(external_ref__in=candidate_refs).values_list("external_ref", flat=True))
+    for i, group_ref in list(group_refs.items()):
+        if any(f"{group_ref}-{suffix}"[:80] in used_refs for suffix in BUCKET_ORDER):
+            fail(i, "external_ref already used.")
+            del group_refs[i]
+
+    account, _ = lock_for_movement(account_id=get_parent_account(parent).pk)
+    available = account.balance
+    accepted = []
+    total = Decimal("0")
+    for i in sorted(group_refs):
+        amount = items[i]["amount"]
+        if total + amount > available:
+            fail(i, "INSUFFICIENT_PARENT_BALANCE")
+            continue
+        total += amount
+        accepted.append(i)
+
+    if not accepted:
+        return {"transfer": None, "results": results}
+
+    accepted_students = {items[i]["student_id"] for i in accepted}
+    wallets = {w.student_id: w for w in Wallet.objects.filter(student_id__in=accepted_students)}
+    if len(wallets) < len(accepted_students):
+        wallets.update(provision_wallets(accepted_students - set(wallets)))
+    plans = active_plans_for(accepted_students)
+
+    # Compte parent déjà verrouillé ci-dessus : les enveloppes viennent ensuite, par id (ordre global).
+    _, locked = lock_for_movement(wallet_ids=[w.id for w in wallets.values()])
+    buckets = {(b.wallet_id, b.bucket_type): b for b in locked}
+
+    batch_ref = f"BULK-{uuid4().hex[:10].upper()}"
+    _, transfer_txn = transfer_out(
+        parent=parent,
+        amount=total,
+        external_ref=f"{batch_ref}-TRANSFER",
+        description=description,
+        metadata={"bulk": True, "student_ids": sorted(accepted_students), "deposits": len(accepted)},
+        locked_account=account,
+        group_ref=batch_ref,
+    )
+
+    pending = []
+    runs = []
+    lines = []
+    deltas = {}
+    touched_wallets = {}
+    for i in accepted:
+        item = items[i]
+        wallet = wallets[item["student_id"]]
+        plan = plans.get(item["student_id"])
+        alloc, run, run_lines, legs = allocation_legs(wallet, plan, item["amount"], group_refs[i])
+        if alloc:
+            wallet.currency = alloc["currency"] or wallet.currency
+            wallet.daily_limit = Decimal(alloc["daily_limit"])
+            touched_wallets[wallet.id] = wallet
+        runs.append(run)
+        lines.extend(run_lines)
+
+        txns = []
+        for bucket_type, amount, external_ref in legs:
+            key = (wallet.id, bucket_type)
+            if key not in buckets:
+                buckets[key] = WalletBucket.objects.create(wallet=wallet, bucket_type=bucket_type)
+            bucket = buckets[key]
+            deltas[bucket.id] = deltas.get(bucket.id, Decimal("0")) + amount
+            txns.append(
+                WalletTransaction(
+                    wallet=wallet,
+                    actor=parent,
+                    bucket_type=bucket_type,
+                    direction=WalletTransaction.Direction.CREDIT,
+                    txn_type=WalletTransaction.TxnType.DEPOSIT,
+                    amount=amount,
+                    balance_after=bucket.balance + deltas[bucket.id],
+                    description=description,
+                    external_ref=external_ref,
+                    allocation=run,
+                    group_ref=run.group_ref,
+                    transfer=transfer_txn,
+                )
+            )
+        pending.extend(txns)
+        results[i].update(status="OK", group_ref=group_refs[i], transactions=txns)
+
+    apply_bucket_deltas(deltas, timezone.now())
+    if touched_wallets:
+        Wallet.objects.bulk_update(touched_wallets.values(), ["currency", "daily_limit"])
+    save_allocations(runs, lines)
+    WalletTransaction.objects.bulk_create(pending)
+    record_rollups(pending)
+    for wallet_id in {txn.wallet_id for txn in pending}:
+        bump_wallet_version(wallet_id)
+
+    return {"transfer": transfer_txn, "results": results}
+
+
+def deposit_group(user, group_ref):
+    """
+    Lignes d'un dépôt (par `group_ref`) et transfert parent qui l'a financé : une requête (lignes,
+    transfert joint) plus le préchargement des charges servies. Repli sur les archives si le dépôt
+    n'est plus dans le ledger vivant. Visible par le parent auteur, l'étudiant crédité et les admins ;
+    le transfert (solde du compte parent) n'est montré qu'au parent et aux admins.
+    Retourne (transfer, legs) ; `legs` vide si le dépôt est inconnu ou hors de portée.
+    """
+    is_admin = user.is_superuser or getattr(user, "role", None) == "ADMIN"
+    scope = Q() if is_admin else Q(actor=user) | Q(wallet__student=user)
+
+    legs = []
+    for model in (WalletTransaction, WalletTransactionArchive):
+        legs = list(
+            model.objects.filter(scope, group_ref=group_ref, txn_type=WalletTransaction.TxnType.DEPOSIT)
+            .select_related("allocation", "transfer")
+            .prefetch_related("allocation__lines")
+            .order_by("id")
+        )
+        if legs:
+            break
+    if not legs:
+        return None, []
+
+    head = legs[0]
+    if not (is_admin or head.actor_id == user.id) or head.transfer_id is None:
+        return None, legs
+    transfer = head.transfer
+    if transfer is None:
+        # Transfert déjà archivé (même identifiant).
+        transfer = ParentAccountTransactionArchive.objects.filter(id=head.transfer_id).first()
+    return transfer, legs
+
+
+def legs_by_transfer(transfer_ids) -> dict:
+    """Lignes wallet financées par chaque transfert parent : {transfer_id: [lignes]}, requêtes groupées."""
+    by_transfer = {}
+    for model in (WalletTransaction, WalletTransactionArchive):
+        legs = (
+            model.objects.filter(transfer_id__in=transfer_ids)
+            .select_related("allocation", "wallet")
+            .prefetch_related("allocation__lines")
+            .order_by("id")
+        )
+        for leg in legs:
+            by_transfer.setdefault(leg.transfer_id, []).append(leg)
+    return by_transfer
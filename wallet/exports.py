@@ -0,0 +1,94 @@
+import csv
+import json
+from itertools import chain
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework import generics
+from rest_framework.renderers import BaseRenderer
+
+from .filters import LedgerFilterBackend
+
+
+class _Echo:
+    """Pseudo-fichier pour `csv.writer` : renvoie la ligne au lieu de l'écrire."""
+
+    def write(self, value):
+        return value
+
+
+class CSVRenderer(BaseRenderer):
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Utilisé seulement pour les réponses d'erreur (403, 404...) : l'export lui-même est streamé.
+        if not isinstance(data, dict):
+            data = {"detail": data}
+        writer = csv.writer(_Echo())
+        return (writer.writerow(list(data.keys())) + writer.writerow([str(v) for v in data.values()])).encode()
+
+
+class NDJSONRenderer(BaseRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return (json.dumps(data, cls=DjangoJSONEncoder) + "\n").encode()
+
+
+def _csv_lines(rows, fields):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(["" if v is None else (v.isoformat() if hasattr(v, "isoformat") else v) for v in row])
+
+
+def _ndjson_lines(rows, fields):
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder) + "\n"
+
+
+def stream_ledger(querysets, fields, fmt):
+    """
+    Générateur de lignes CSV / NDJSON à partir d'un ou plusieurs querysets lus l'un après l'autre.
+    Les lignes sont lues par paquets via `iterator(chunk_size)` : la mémoire reste constante
+    quel que soit le volume de l'historique.
+    """
+    chunk_size = getattr(settings, "LEDGER_EXPORT_CHUNK_SIZE", 2000)
+    rows = chain.from_iterable(qs.values_list(*fields).iterator(chunk_size=chunk_size) for qs in querysets)
+    if fmt == NDJSONRenderer.format:
+        return _ndjson_lines(rows, fields)
+    return _csv_lines(rows, fields)
+
+
+class LedgerExportAPIView(generics.GenericAPIView):
+    """
+    Base des exports de ledger : `?format=csv|ndjson` (CSV par défaut) et mêmes filtres que les listes
+    (cf. LedgerFilterBackend). Tri chronologique croissant.
+
+    Si la vue définit `get_archive_queryset()`, les lignes archivées (plus anciennes) sont exportées en premier.
+    """
+
+    renderer_classes = [CSVRenderer, NDJSONRenderer]
+    filter_backends = [LedgerFilterBackend]
+    pagination_class = None
+    export_fields = []
+    export_name = "ledger"
+
+    def get(self, request, *args, **kwargs):
+        querysets = [self.get_queryset()]
+        if hasattr(self, "get_archive_queryset"):
+            querysets.insert(0, self.get_archive_queryset())
+        querysets = [self.filter_queryset(qs).order_by("created_at", "id") for qs in querysets]
+
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            stream_ledger(querysets, self.export_fields, renderer.format),
+            content_type=f"{renderer.media_type}; charset=utf-8",
+        )
+        response["Content-Disposition"] = f'attachment; filename="{self.export_name}.{renderer.format}"'
+        return response
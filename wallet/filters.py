@@ -0,0 +1,136 @@
+"""
+Filtres des listes et exports de ledger (query params).
+
+Chaque filtre correspond à un index composite `(owner, colonne, created_at)` ou `(owner, created_at)` :
+la requête reste un parcours d'intervalle d'index, déjà trié dans l'ordre de la pagination.
+Les bornes de dates sont converties en instants (début de journée, fuseau courant) pour que
+`created_at` reste comparable directement à l'index.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from core.dates import date_range_q
+
+CHOICE_FILTERS = ["txn_type", "direction", "bucket_type"]
+
+
+def _parse_date(raw, name, errors):
+    try:
+        day = parse_date(raw)
+    except ValueError:
+        day = None
+    if day is None:
+        errors[name] = "Invalid date, expected YYYY-MM-DD."
+    return day
+
+
+# Plus grand montant représentable par un MoneyField (14 chiffres dont 2 décimales).
+MAX_AMOUNT = Decimal(10) ** 12
+
+
+def _parse_amount(raw, name, errors):
+    try:
+        amount = Decimal(raw)
+    except InvalidOperation:
+        amount = None
+    # "nan", "inf", "1e999" passent Decimal() mais ne peuvent pas être comparés à la colonne.
+    if amount is None or not amount.is_finite() or abs(amount) >= MAX_AMOUNT:
+        errors[name] = "Invalid amount."
+        return None
+    return amount
+
+
+class LedgerFilterBackend(BaseFilterBackend):
+    """
+    Filtres : `txn_type`, `direction`, `bucket_type` (valeurs séparées par des virgules), `actor` (id),
+    `min_amount` / `max_amount`, `date_from` / `date_to` (YYYY-MM-DD, inclus).
+
+    La vue peut restreindre les filtres (`ledger_filter_fields`) et choisir la colonne du montant
+    (`ledger_amount_field`, "amount" par défaut).
+    """
+
+    default_filter_fields = CHOICE_FILTERS + ["actor"]
+
+    def get_filter_fields(self, view):
+        return getattr(view, "ledger_filter_fields", self.default_filter_fields)
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        model = queryset.model
+        errors = {}
+
+        for name in self.get_filter_fields(view):
+            raw = (params.get(name) or "").strip()
+            if not raw:
+                continue
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if name == "actor":
+                if not raw.isdigit():
+                    errors[name] = "Invalid user id."
+                    continue
+                queryset = queryset.filter(actor_id=int(raw))
+                continue
+            values = [v.strip().upper() for v in raw.split(",") if v.strip()]
+            valid = {value for value, _ in field.choices}
+            unknown = [v for v in values if v not in valid]
+            if unknown:
+                errors[name] = f"Invalid value(s): {', '.join(unknown)}. Allowed: {', '.join(sorted(valid))}."
+            elif len(values) == 1:
+                queryset = queryset.filter(**{name: values[0]})
+            else:
+                queryset = queryset.filter(**{f"{name}__in": values})
+
+        amount_field = getattr(view, "ledger_amount_field", "amount")
+        for name, lookup in (("min_amount", "gte"), ("max_amount", "lte")):
+            raw = (params.get(name) or "").strip()
+            if raw:
+                amount = _parse_amount(raw, name, errors)
+                if amount is not None:
+                    queryset = queryset.filter(**{f"{amount_field}__{lookup}": amount})
+
+        raw_from = (params.get("date_from") or "").strip()
+        if raw_from:
+            day = _parse_date(raw_from, "date_from", errors)
+            if day:
+                queryset = queryset.filter(date_range_q("created_at", date_from=day))
+        raw_to = (params.get("date_to") or "").strip()
+        if raw_to:
+            day = _parse_date(raw_to, "date_to", errors)
+            if day:
+                queryset = queryset.filter(date_range_q("created_at", date_to=day))
+
+        if errors:
+            raise ValidationError(errors)
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        descriptions = {
+            "txn_type": "Type(s) de transaction, séparés par des virgules.",
+            "direction": "CREDIT ou DEBIT.",
+            "bucket_type": "Enveloppe(s) : BILLS, SAVINGS, DAILY.",
+            "actor": "Id de l'utilisateur à l'origine du mouvement.",
+        }
+        parameters = [
+            {
+                "name": name,
+                "required": False,
+                "in": "query",
+                "description": descriptions[name],
+                "schema": {"type": "integer" if name == "actor" else "string"},
+            }
+            for name in self.get_filter_fields(view)
+        ]
+        parameters += [
+            {"name": "min_amount", "required": False, "in": "query", "description": "Montant minimum (inclus).", "schema": {"type": "string"}},
+            {"name": "max_amount", "required": False, "in": "query", "description": "Montant maximum (inclus).", "schema": {"type": "string"}},
+            {"name": "date_from", "required": False, "in": "query", "description": "YYYY-MM-DD (inclus).", "schema": {"type": "string", "format": "date"}},
+            {"name": "date_to", "required": False, "in": "query", "description": "YYYY-MM-DD (inclus).", "schema": {"type": "string", "format": "date"}},
+        ]
+        return parameters
@@ -0,0 +1,124 @@
+"""
+Support de l'en-tête `Idempotency-Key` pour les endpoints qui déplacent de l'argent.
+
+Le premier appel réserve la clé (statut IN_PROGRESS, validé tout de suite pour bloquer les appels
+concurrents), puis exécute la vue et enregistre sa réponse dans la même transaction que les écritures
+du ledger. Une répétition avec la même clé et le même corps renvoie la réponse enregistrée sans
+toucher au ledger ; avec un autre corps, elle est refusée (422). Seules les réponses 2xx sont
+conservées : en cas d'erreur la clé est libérée et le client peut réessayer.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+IDEMPOTENCY_PARAMETER = OpenApiParameter(
+    name=IDEMPOTENCY_HEADER,
+    type=str,
+    location=OpenApiParameter.HEADER,
+    required=False,
+    description="Clé unique par opération : une répétition renvoie la réponse initiale sans nouveau mouvement.",
+)
+
+
+def request_fingerprint(request) -> str:
+    data = request.data
+    if hasattr(data, "lists"):
+        # multipart / form : les fichiers sont représentés par (nom, taille)
+        data = {
+            k: [(v.name, v.size) if hasattr(v, "read") else v for v in values] for k, values in data.lists()
+        }
+    payload = json.dumps([request.method, request.path, data], sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _error(detail, code):
+    return Response({"detail": detail}, status=code)
+
+
+def claim_key(user, key, request, fingerprint):
+    """Réserve la clé. Retourne (entrée, None) si l'appel doit s'exécuter, sinon (None, réponse)."""
+    now = timezone.now()
+    ttl = getattr(settings, "IDEMPOTENCY_KEY_TTL", timedelta(hours=24))
+    fields = {
+        "method": request.method,
+        "path": request.path,
+        "request_hash": fingerprint,
+        "status": IdempotencyKey.Status.IN_PROGRESS,
+        "response_status": None,
+        "response_body": None,
+        "expires_at": now + ttl,
+    }
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(user=user, key=key, **fields), None
+    except IntegrityError:
+        pass
+
+    entry = IdempotencyKey.objects.get(user=user, key=key)
+    stale = timezone.now() - getattr(settings, "IDEMPOTENCY_IN_PROGRESS_TIMEOUT", timedelta(minutes=2))
+    if entry.expires_at <= now or (entry.status == IdempotencyKey.Status.IN_PROGRESS and entry.created_at < stale):
+        # Clé expirée ou abandonnée : reprise, à condition que personne ne l'ait reprise entre-temps.
+        taken = IdempotencyKey.objects.filter(pk=entry.pk, created_at=entry.created_at).update(
+            created_at=now, **fields
+        )
+        if taken:
+            entry.refresh_from_db()
+            return entry, None
+        entry.refresh_from_db()
+
+    if entry.request_hash != fingerprint:
+        return None, _error(
+            f"{IDEMPOTENCY_HEADER} already used with a different request.", status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    if entry.status == IdempotencyKey.Status.IN_PROGRESS:
+        return None, _error("A request with this Idempotency-Key is in progress.", status.HTTP_409_CONFLICT)
+
+    response = Response(entry.response_body, status=entry.response_status)
+    response["Idempotent-Replayed"] = "true"
+    return None, response
+
+
+class IdempotentCreateMixin:
+    """
+    À placer avant la vue générique DRF : `post` est rejoué depuis la table `IdempotencyKey`
+    quand l'en-tête `Idempotency-Key` est présent. Sans en-tête, comportement inchangé.
+    """
+
+    def post(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER, "").strip()
+        if not key:
+            return super().post(request, *args, **kwargs)
+        if len(key) > IdempotencyKey._meta.get_field("key").max_length:
+            return _error(f"{IDEMPOTENCY_HEADER} is too long.", status.HTTP_400_BAD_REQUEST)
+
+        entry, replay = claim_key(request.user, key, request, request_fingerprint(request))
+        if replay is not None:
+            return replay
+
+        try:
+            with transaction.atomic():
+                response = super().post(request, *args, **kwargs)
+                if status.is_success(response.status_code):
+                    entry.status = IdempotencyKey.Status.COMPLETED
+                    entry.response_status = response.status_code
+                    entry.response_body = response.data
+                    entry.save(update_fields=["status", "response_status", "response_body"])
+        except BaseException:
+            entry.delete()
+            raise
+
+        if entry.status != IdempotencyKey.Status.COMPLETED:
+            entry.delete()
+        return response
@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from wallet.archive import archive_account_batch, archive_wallet_batch, month_cutoff
+
+
+class Command(BaseCommand):
+    help = (
+        "Déplace les transactions (wallets et comptes parents) antérieures au mois donné vers les tables "
+        "d'archive, par paquets, en laissant un résumé par mois."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--before", required=True, help="YYYY-MM : archive tout ce qui précède ce mois.")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Lignes déplacées par transaction.")
+
+    def handle(self, *args, **options):
+        try:
+            before = datetime.strptime(options["before"], "%Y-%m")
+        except ValueError:
+            raise CommandError("--before doit être au format YYYY-MM.")
+
+        cutoff = month_cutoff(before.year, before.month)
+        current_month = timezone.localdate().replace(day=1)
+        if cutoff.date() > current_month:
+            raise CommandError("Seuls les mois clos peuvent être archivés (--before <= mois courant).")
+
+        batch_size = max(1, options["batch_size"])
+        for label, archive_batch in (("wallet", archive_wallet_batch), ("compte parent", archive_account_batch)):
+            moved = 0
+            while True:
+                n = archive_batch(cutoff, batch_size)
+                if not n:
+                    break
+                moved += n
+            self.stdout.write(f"{moved} transaction(s) {label} archivée(s) avant {cutoff:%Y-%m}.")
+
+        self.stdout.write(self.style.SUCCESS("Archivage terminé."))
@@ -0,0 +1,142 @@
+import json
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.db import table_sizes
+
+LEDGER_COLUMNS = (
+    "id BIGINT PRIMARY KEY, wallet_id INTEGER NOT NULL, bucket_type SMALLINT NOT NULL, "
+    "direction SMALLINT NOT NULL, txn_type SMALLINT NOT NULL, amount BIGINT NOT NULL, balance_after BIGINT, "
+    "external_ref VARCHAR(80), group_ref VARCHAR(80), created_at TIMESTAMP NOT NULL"
+)
+BUCKETS = ("BILLS", "SAVINGS", "DAILY")
+BUCKET_CODES = {"BILLS": 2, "SAVINGS": 3, "DAILY": 1}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare la taille des lignes de ledger et la durée d'écriture d'un dépôt avec la répartition copiée "
+        "dans `metadata` (JSON, avant) ou normalisée dans AllocationRun / AllocationLine (après). "
+        "Travaille sur des tables temporaires, supprimées à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--deposits", type=int, default=100_000)
+        parser.add_argument("--bills", type=int, default=2, help="Charges servies par dépôt.")
+
+    def handle(self, *args, **options):
+        deposits, bills = max(1, options["deposits"]), max(0, options["bills"])
+        rng = random.Random(15)
+        now = timezone.now()
+        data = [
+            {
+                "group_ref": f"AUTO-{rng.getrandbits(40):010X}",
+                "wallet_id": rng.randint(1, 5_000),
+                "plan_id": rng.randint(1, 5_000),
+                "created_at": now - timedelta(seconds=deposits - i),
+                "bills": [(rng.randint(1, 50_000), f"Bill {b}", 30_00 + b, 30_00 + b) for b in range(bills)],
+            }
+            for i in range(deposits)
+        ]
+        layouts = {
+            "json": {"ledger": "bench_alloc_json"},
+            "normalized": {"ledger": "bench_alloc_ledger", "run": "bench_alloc_run", "line": "bench_alloc_line"},
+        }
+        try:
+            self._create(layouts)
+            for layout, tables in layouts.items():
+                elapsed = self._write(layout, tables, data)
+                sizes = table_sizes(tables.values())
+                ledger_bytes = sum(sizes[tables["ledger"]])
+                total = sum(sum(size) for size in sizes.values())
+                self.stdout.write(
+                    f"{layout:>10} : ledger {ledger_bytes / (deposits * len(BUCKETS)):.0f} o/ligne, "
+                    f"toutes tables {total / deposits:.0f} o/dépôt, "
+                    f"écriture {elapsed / deposits * 1e6:.0f} µs/dépôt"
+                )
+        finally:
+            with connection.cursor() as cursor:
+                for tables in layouts.values():
+                    for table in tables.values():
+                        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+
+    def _create(self, layouts):
+        with connection.cursor() as cursor:
+            for tables in layouts.values():
+                for table in tables.values():
+                    cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            cursor.execute(f"CREATE TABLE bench_alloc_json ({LEDGER_COLUMNS}, metadata TEXT NOT NULL)")
+            cursor.execute(
+                "CREATE TABLE bench_alloc_run (id BIGINT PRIMARY KEY, wallet_id INTEGER NOT NULL, plan_id INTEGER, "
+                "mode VARCHAR(20) NOT NULL, group_ref VARCHAR(80) NOT NULL, deposit_amount BIGINT, "
+                "savings_target BIGINT, created_at TIMESTAMP NOT NULL)"
+            )
+            cursor.execute("CREATE INDEX bench_alloc_run_wallet_ref ON bench_alloc_run (wallet_id, group_ref)")
+            cursor.execute(
+                "CREATE TABLE bench_alloc_line (id BIGINT PRIMARY KEY, run_id BIGINT NOT NULL, bill_id INTEGER, "
+                "title VARCHAR(80) NOT NULL, need BIGINT NOT NULL, allocated BIGINT NOT NULL)"
+            )
+            cursor.execute("CREATE INDEX bench_alloc_line_run ON bench_alloc_line (run_id)")
+            # La colonne metadata reste (vide) après normalisation, comme sur WalletTransaction.
+            cursor.execute(
+                f"CREATE TABLE bench_alloc_ledger ({LEDGER_COLUMNS}, metadata TEXT NOT NULL, allocation_id BIGINT)"
+            )
+            for table in ("bench_alloc_json", "bench_alloc_ledger"):
+                cursor.execute(f"CREATE INDEX {table}_wallet_created ON {table} (wallet_id, created_at)")
+                cursor.execute(f"CREATE UNIQUE INDEX {table}_external_ref ON {table} (external_ref)")
+            cursor.execute("CREATE INDEX bench_alloc_ledger_allocation ON bench_alloc_ledger (allocation_id)")
+
+    def _ledger_row(self, pk, deposit, bucket, amount):
+        return [
+            pk, deposit["wallet_id"], BUCKET_CODES[bucket], 1, 1, amount, amount,
+            f"{deposit['group_ref']}-{bucket}", deposit["group_ref"], deposit["created_at"],
+        ]
+
+    def _write(self, layout, tables, data):
+        """Les instructions d'un dépôt (comme `deposit`), tous les dépôts dans une même transaction."""
+        ledger, line_id = tables["ledger"], 0
+        placeholders = ", ".join(["%s"] * 11)
+        start = time.perf_counter()
+        with transaction.atomic(), connection.cursor() as cursor:
+            for run_id, deposit in enumerate(data, start=1):
+                rows = []
+                for offset, bucket in enumerate(BUCKETS):
+                    row = self._ledger_row(run_id * 3 + offset, deposit, bucket, 100_00)
+                    if layout == "json":
+                        meta = {
+                            "allocation": "AUTO_PLAN",
+                            "group_ref": deposit["group_ref"],
+                            "plan_id": deposit["plan_id"],
+                            "deposit_amount": "300.00",
+                            "savings_target": "50.00",
+                        }
+                        if bucket == "BILLS":
+                            meta["bills_breakdown"] = [
+                                {"bill_id": bill_id, "title": title, "need": f"{need / 100:.2f}",
+                                 "allocated": f"{allocated / 100:.2f}"}
+                                for bill_id, title, need, allocated in deposit["bills"]
+                            ]
+                        rows.append(row + [json.dumps(meta)])
+                    else:
+                        rows.append(row + ["{}", run_id])
+                if layout == "normalized":
+                    cursor.execute(
+                        f"INSERT INTO {tables['run']} VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+                        [run_id, deposit["wallet_id"], deposit["plan_id"], "AUTO_PLAN", deposit["group_ref"],
+                         300_00, 50_00, deposit["created_at"]],
+                    )
+                    lines = []
+                    for bill in deposit["bills"]:
+                        line_id += 1
+                        lines.append([line_id, run_id, *bill])
+                    if lines:
+                        cursor.executemany(f"INSERT INTO {tables['line']} VALUES (%s, %s, %s, %s, %s, %s)", lines)
+                    cursor.executemany(f"INSERT INTO {ledger} VALUES ({placeholders}, %s)", rows)
+                else:
+                    cursor.executemany(f"INSERT INTO {ledger} VALUES ({placeholders})", rows)
+        return time.perf_counter() - start
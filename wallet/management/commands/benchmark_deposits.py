@@ -0,0 +1,91 @@
+import time
+from decimal import Decimal
+from uuid import uuid4
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from budgeting.models import BillItem, BudgetPlan
+from parent_account.services import topup
+from relationships.models import ParentStudentLink
+from wallet.deposits import bulk_deposit, deposit
+from wallet.services import provision_wallets
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare N dépôts unitaires successifs (`deposit`) et un dépôt groupé de N étudiants (`bulk_deposit`) : "
+        "durée, dépôts/s et instructions SQL. Travaille sur un parent et des étudiants temporaires, supprimés à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=50, help="Étudiants financés par tour.")
+        parser.add_argument("--rounds", type=int, default=5, help="Tours par mode (meilleur tour retenu).")
+        parser.add_argument("--with-plans", action="store_true", help="Plan actif avec deux charges par étudiant.")
+
+    def handle(self, *args, **options):
+        count, rounds = max(1, options["students"]), max(1, options["rounds"])
+        prefix = f"bench-{uuid4().hex[:8]}"
+        parent = User.objects.create(username=f"{prefix}-parent", role=User.Role.PARENT)
+        students = [
+            User.objects.create(username=f"{prefix}-{i}", role=User.Role.STUDENT) for i in range(count)
+        ]
+        ids = [s.id for s in students]
+        try:
+            provision_wallets(ids)
+            ParentStudentLink.objects.bulk_create(ParentStudentLink(parent=parent, student=s) for s in students)
+            if options["with_plans"]:
+                self._plans(students)
+            topup(parent, Decimal("1000000000.00"))
+            amount = Decimal("100.00")
+
+            def sequential():
+                for student_id in ids:
+                    deposit(parent, student_id, amount)
+
+            def grouped():
+                result = bulk_deposit(parent, [{"student_id": i, "amount": amount} for i in ids])
+                failed = [r for r in result["results"] if r["status"] != "OK"]
+                if failed:
+                    raise RuntimeError(failed[0])
+
+            for mode, run in (("unitaire", sequential), ("groupé", grouped)):
+                best, statements = None, 0
+                for _ in range(rounds):
+                    with CaptureQueriesContext(connection) as queries:
+                        start = time.perf_counter()
+                        run()
+                        elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                    statements = sum(
+                        1 for q in queries if not q["sql"].startswith(("SAVEPOINT", "RELEASE SAVEPOINT"))
+                    )
+                self.stdout.write(
+                    f"{mode:>8} : {count} dépôt(s) en {best * 1000:.0f} ms, {count / best:.0f} dépôts/s, "
+                    f"{statements} instruction(s) SQL"
+                )
+        finally:
+            User.objects.filter(id__in=[parent.id, *ids]).delete()
+
+    def _plans(self, students):
+        plans = BudgetPlan.objects.bulk_create(
+            BudgetPlan(
+                student=s,
+                status=BudgetPlan.Status.ACTIVE,
+                savings_mode=BudgetPlan.SavingsMode.PERCENT,
+                savings_percent=Decimal("10"),
+            )
+            for s in students
+        )
+        BillItem.objects.bulk_create(
+            item
+            for plan in plans
+            for item in (
+                BillItem(plan=plan, title="Rent", amount=Decimal("30.00")),
+                BillItem(plan=plan, title="Data", amount=Decimal("5.00"), priority=2),
+            )
+        )
@@ -0,0 +1,112 @@
+import resource
+import time
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from uuid import uuid4
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from wallet.models import WalletBucket, WalletTransaction
+from wallet.serializers import WalletTransactionSerializer
+from wallet.services import provision_wallets
+from wallet.views import with_allocation
+
+User = get_user_model()
+
+EXPORT_URL = "/api/wallet/me/transactions/export/"
+BATCH_SIZE = 5_000
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure la mémoire de l'export du ledger quand l'historique grandit : export streamé "
+        "(/api/wallet/me/transactions/export/) vs liste JSON complète en mémoire (l'ancien accès à l'historique). "
+        "Pic du tas Python (tracemalloc) par export, et RSS maximal du processus. "
+        "Travaille sur un étudiant temporaire, supprimé à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="10000,100000,300000", help="Tailles d'historique, séparées par des virgules.")
+        parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+        parser.add_argument("--skip-list", action="store_true", help="Ne mesure que l'export streamé.")
+
+    def handle(self, *args, **options):
+        sizes = sorted({int(size) for size in options["sizes"].split(",") if size.strip()})
+        student = User.objects.create(username=f"bench-{uuid4().hex[:12]}", role=User.Role.STUDENT)
+        wallet = provision_wallets([student.id])[student.id]
+        start = timezone.now() - timedelta(seconds=sizes[-1])
+        factory = APIRequestFactory()
+        try:
+            inserted, results = 0, []
+            # Tous les exports streamés d'abord : le RSS maximal n'est pas faussé par les listes en mémoire.
+            for size in sizes:
+                self._grow(wallet, start, inserted, size)
+                inserted = size
+                with override_settings(ALLOWED_HOSTS=["testserver"]):
+                    results.append((size, self._measure(lambda: self._stream(factory, student, options["format"]))))
+            for size, (elapsed, peak, written, rss) in results:
+                self.stdout.write(
+                    f"{size:>8} lignes, streamé : {written / 2**20:.1f} Mo en {elapsed:.2f}s, "
+                    f"pic du tas {peak / 2**20:.1f} Mo, RSS max du processus {rss / 2**10:.0f} Mo"
+                )
+            if options["skip_list"]:
+                return
+            for size in sizes:
+                ledger = WalletTransaction.objects.filter(wallet=wallet).order_by("created_at", "id")[:size]
+                elapsed, peak, written, rss = self._measure(lambda: self._full_list(ledger))
+                self.stdout.write(
+                    f"{size:>8} lignes, liste  : {written / 2**20:.1f} Mo en {elapsed:.2f}s, "
+                    f"pic du tas {peak / 2**20:.1f} Mo, RSS max du processus {rss / 2**10:.0f} Mo"
+                )
+        finally:
+            User.objects.filter(id=student.id).delete()
+
+    def _grow(self, wallet, start, begin, end):
+        # created_at est en auto_now_add : désactivé le temps de l'insertion pour étaler l'historique.
+        field = WalletTransaction._meta.get_field("created_at")
+        with mock.patch.object(field, "auto_now_add", False):
+            for low in range(begin, end, BATCH_SIZE):
+                WalletTransaction.objects.bulk_create(
+                    WalletTransaction(
+                        wallet=wallet,
+                        bucket_type=WalletBucket.Type.DAILY,
+                        direction=WalletTransaction.Direction.CREDIT,
+                        txn_type=WalletTransaction.TxnType.ADJUSTMENT,
+                        amount=Decimal("1.00"),
+                        balance_after=Decimal(i + 1),
+                        description="benchmark",
+                        created_at=start + timedelta(seconds=i),
+                    )
+                    for i in range(low, min(end, low + BATCH_SIZE))
+                )
+
+    def _measure(self, run):
+        tracemalloc.start()
+        try:
+            begin = time.perf_counter()
+            written = run()
+            elapsed = time.perf_counter() - begin
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        # ru_maxrss : Ko sous Linux.
+        return elapsed, peak, written, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    def _stream(self, factory, student, fmt):
+        request = factory.get(f"{EXPORT_URL}?format={fmt}")
+        force_authenticate(request, user=student)
+        response = resolve(EXPORT_URL).func(request)
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}")
+        return sum(len(chunk) for chunk in response.streaming_content)
+
+    def _full_list(self, ledger):
+        return len(JSONRenderer().render(WalletTransactionSerializer(with_allocation(ledger), many=True).data))
@@ -0,0 +1,113 @@
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from uuid import uuid4
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from wallet.models import WalletBucket, WalletTransaction
+from wallet.pagination import LedgerCursorPagination
+from wallet.services import provision_wallets
+
+User = get_user_model()
+
+LIST_URL = "/api/wallet/me/transactions/"
+BATCH_SIZE = 5_000
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure la latence d'une page profonde du ledger (/api/wallet/me/transactions/) quand l'historique "
+        "grandit : curseur (keyset) vs OFFSET + COUNT(*). Travaille sur un étudiant temporaire, supprimé à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="1000,10000,100000", help="Tailles d'historique, séparées par des virgules.")
+        parser.add_argument("--depth", type=float, default=0.9, help="Position de la page mesurée (0 = plus récente).")
+        parser.add_argument("--page-size", type=int, default=50)
+        parser.add_argument("--repeat", type=int, default=5, help="Exécutions par mesure (médiane).")
+
+    def handle(self, *args, **options):
+        sizes = sorted({int(size) for size in options["sizes"].split(",") if size.strip()})
+        page_size, repeat = max(1, options["page_size"]), max(1, options["repeat"])
+
+        student = User.objects.create(username=f"bench-{uuid4().hex[:12]}", role=User.Role.STUDENT)
+        wallet = provision_wallets([student.id])[student.id]
+        start = timezone.now() - timedelta(seconds=sizes[-1])
+        factory = APIRequestFactory()
+        ledger = WalletTransaction.objects.filter(wallet=wallet)
+        try:
+            inserted = 0
+            for size in sizes:
+                self._grow(wallet, start, inserted, size)
+                inserted = size
+                depth = min(int(size * options["depth"]), max(0, size - page_size))
+                newest_first = ledger.order_by("-created_at", "-id")
+                anchor = newest_first[depth]
+
+                def keyset():
+                    position = LedgerCursorPagination()._position_filter(anchor.created_at, anchor.pk, reverse=False)
+                    return list(newest_first.filter(position)[: page_size + 1])
+
+                def offset():
+                    ledger.count()
+                    return list(newest_first[depth + 1: depth + 1 + page_size])
+
+                pager = LedgerCursorPagination()
+                pager.base_url = f"http://testserver{LIST_URL}"
+                cursor_url = pager.encode_cursor(anchor, reverse=False)
+                first_ms = self._time(repeat, lambda: list(newest_first[: page_size + 1]))
+                keyset_ms = self._time(repeat, keyset)
+                offset_ms = self._time(repeat, offset)
+                with override_settings(ALLOWED_HOSTS=["testserver"]):
+                    endpoint_ms = self._time(repeat, lambda: self._get(factory, student, cursor_url))
+                self.stdout.write(
+                    f"{size:>8} lignes, page {depth // page_size + 2} : première page {first_ms:.2f} ms, "
+                    f"curseur {keyset_ms:.2f} ms, OFFSET + COUNT {offset_ms:.2f} ms ; "
+                    f"endpoint (curseur) {endpoint_ms:.1f} ms"
+                )
+        finally:
+            User.objects.filter(id=student.id).delete()
+
+    def _grow(self, wallet, start, begin, end):
+        # created_at est en auto_now_add : désactivé le temps de l'insertion pour étaler l'historique.
+        field = WalletTransaction._meta.get_field("created_at")
+        with mock.patch.object(field, "auto_now_add", False):
+            for low in range(begin, end, BATCH_SIZE):
+                WalletTransaction.objects.bulk_create(
+                    WalletTransaction(
+                        wallet=wallet,
+                        bucket_type=WalletBucket.Type.DAILY,
+                        direction=WalletTransaction.Direction.CREDIT,
+                        txn_type=WalletTransaction.TxnType.ADJUSTMENT,
+                        amount=Decimal("1.00"),
+                        balance_after=Decimal(i + 1),
+                        description="benchmark",
+                        created_at=start + timedelta(seconds=i),
+                    )
+                    for i in range(low, min(end, low + BATCH_SIZE))
+                )
+
+    def _get(self, factory, student, url):
+        request = factory.get(url)
+        force_authenticate(request, user=student)
+        response = resolve(LIST_URL).func(request)
+        response.render()
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code} : {response.data}")
+        return response
+
+    def _time(self, repeat, run):
+        timings = []
+        for _ in range(repeat):
+            begin = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - begin)
+        return statistics.median(timings) * 1000
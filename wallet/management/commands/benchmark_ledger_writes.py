@@ -0,0 +1,89 @@
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from wallet.models import WalletBucket, WalletTransaction
+from wallet.services import credit, lock_for_movement, provision_wallets
+from wallet.writer import LedgerWriter
+
+User = get_user_model()
+
+
+@transaction.atomic
+def _adjust(wallet, amount):
+    lock_for_movement(wallet_ids=[wallet.id], bucket_types=[WalletBucket.Type.DAILY])
+    return credit(wallet, None, WalletBucket.Type.DAILY, amount, WalletTransaction.TxnType.ADJUSTMENT, "benchmark")
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le débit d'écriture du ledger (mouvements/s) : une transaction par mouvement vs écritures "
+        "groupées (wallet/writer.py). Travaille sur des comptes temporaires, supprimés à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8, help="Appelants concurrents (un wallet chacun).")
+        parser.add_argument("--writes", type=int, default=200, help="Mouvements par appelant.")
+        parser.add_argument("--mode", choices=["both", "direct", "group"], default="both")
+        parser.add_argument("--batch-size", type=int, default=None, help="Défaut : LEDGER_WRITER_BATCH_SIZE.")
+        parser.add_argument("--max-delay-ms", type=float, default=None, help="Défaut : LEDGER_WRITER_MAX_DELAY.")
+
+    def handle(self, *args, **options):
+        threads = max(1, options["threads"])
+        writes = max(1, options["writes"])
+        modes = ["direct", "group"] if options["mode"] == "both" else [options["mode"]]
+        max_delay = options["max_delay_ms"]
+        max_delay = timedelta(milliseconds=max_delay) if max_delay is not None else None
+
+        students = [
+            User.objects.create(username=f"bench-{uuid4().hex[:12]}", role=User.Role.STUDENT) for _ in range(threads)
+        ]
+        wallets = list(provision_wallets([s.id for s in students]).values())
+        try:
+            for mode in modes:
+                writer = LedgerWriter(options["batch_size"], max_delay) if mode == "group" else None
+                elapsed, done, errors = self._run(wallets, writes, writer)
+                if writer:
+                    writer.stop()
+                self.stdout.write(
+                    f"{mode:>6} : {done} mouvement(s) en {elapsed:.2f}s, {done / elapsed:.0f}/s, {errors} erreur(s)"
+                )
+        finally:
+            User.objects.filter(id__in=[s.id for s in students]).delete()
+
+    def _run(self, wallets, writes, writer):
+        counts = {"done": 0, "errors": 0}
+        lock = threading.Lock()
+        amount = Decimal("1.00")
+
+        def worker(wallet):
+            done = errors = 0
+            try:
+                for _ in range(writes):
+                    try:
+                        if writer:
+                            writer.submit(_adjust, wallet, amount).result()
+                        else:
+                            _adjust(wallet, amount)
+                        done += 1
+                    except Exception:
+                        errors += 1
+            finally:
+                connection.close()
+                with lock:
+                    counts["done"] += done
+                    counts["errors"] += errors
+
+        pool = [threading.Thread(target=worker, args=(w,)) for w in wallets]
+        start = time.perf_counter()
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        return time.perf_counter() - start, counts["done"], counts["errors"]
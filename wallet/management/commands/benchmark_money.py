@@ -0,0 +1,111 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Context, Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.db import table_sizes
+from core.money import CENT, from_minor
+
+LAYOUTS = {
+    # Avant : montants en DECIMAL (REAL pour SQLite) ; après : BIGINT en centimes (MoneyField).
+    "decimal": "NUMERIC(14, 2)",
+    "minor": "BIGINT",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare montants DECIMAL et entiers en centimes (MoneyField) sur des agrégats de tableau de bord "
+        "(total du mois d'un wallet, totaux par wallet) : durée, exactitude et taille de table. "
+        "Travaille sur deux tables temporaires, supprimées à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500_000)
+        parser.add_argument("--wallets", type=int, default=2_000)
+        parser.add_argument("--repeat", type=int, default=5, help="Exécutions par requête (médiane).")
+
+    def handle(self, *args, **options):
+        rows, wallets = max(1, options["rows"]), max(1, options["wallets"])
+        rng = random.Random(18)
+        now = timezone.now()
+        amounts = [rng.randint(1, 5_000_00) for _ in range(rows)]
+        data = [
+            (i + 1, i % wallets + 1, now - timedelta(minutes=rng.randint(0, 90 * 24 * 60)), minor)
+            for i, minor in enumerate(amounts)
+        ]
+        month_start = now - timedelta(days=30)
+        month_exact, per_wallet_exact = 0, {}
+        for _, wallet_id, created_at, minor in data:
+            per_wallet_exact[wallet_id] = per_wallet_exact.get(wallet_id, 0) + minor
+            if wallet_id == 1 and created_at >= month_start:
+                month_exact += minor
+
+        tables = {layout: f"bench_money_{layout}" for layout in LAYOUTS}
+        try:
+            for layout, column in LAYOUTS.items():
+                self._create(tables[layout], column, data, layout)
+            sizes = table_sizes(tables.values())
+            for layout, table in tables.items():
+                month, month_ms = self._time(options["repeat"], self._month_total, table, month_start, layout)
+                totals, overview_ms = self._time(options["repeat"], self._per_wallet, table, layout)
+                wrong = sum(1 for w, minor in per_wallet_exact.items() if totals[w] != from_minor(minor))
+                size, index = sizes[table]
+                self.stdout.write(
+                    f"{layout:>7} : total du mois {month_ms:.2f} ms (exact : {month == from_minor(month_exact)}), "
+                    f"totaux par wallet {overview_ms:.0f} ms ({wrong} faux sur {len(totals)}), "
+                    f"table {size / rows:.1f} o/ligne, index {index / rows:.1f} o/ligne"
+                )
+        finally:
+            with connection.cursor() as cursor:
+                for table in tables.values():
+                    cursor.execute(f"DROP TABLE IF EXISTS {table}")
+
+    def _create(self, table, column, data, layout):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            cursor.execute(
+                f"CREATE TABLE {table} (id BIGINT PRIMARY KEY, wallet_id INTEGER NOT NULL, "
+                f"created_at TIMESTAMP NOT NULL, amount {column} NOT NULL)"
+            )
+            cursor.execute(f"CREATE INDEX {table}_wallet_created ON {table} (wallet_id, created_at)")
+            cursor.executemany(
+                f"INSERT INTO {table} (id, wallet_id, created_at, amount) VALUES (%s, %s, %s, %s)",
+                [
+                    (pk, wallet_id, created_at, minor if layout == "minor" else from_minor(minor))
+                    for pk, wallet_id, created_at, minor in data
+                ],
+            )
+
+    def _time(self, repeat, query, *args):
+        timings = []
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            result = query(*args)
+            timings.append(time.perf_counter() - start)
+        return result, statistics.median(timings) * 1000
+
+    def _convert(self, value, layout):
+        # Ce que rendent MoneyField (entier / 100) et DecimalField sur SQLite (REAL, 15 chiffres, arrondi au centime).
+        if layout == "minor":
+            return from_minor(value)
+        if isinstance(value, float):
+            return Context(prec=15).create_decimal_from_float(value).quantize(CENT)
+        return Decimal(value)
+
+    def _month_total(self, table, month_start, layout):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT SUM(amount) FROM {table} WHERE wallet_id = %s AND created_at >= %s", [1, month_start]
+            )
+            return self._convert(cursor.fetchone()[0], layout)
+
+    def _per_wallet(self, table, layout):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT wallet_id, SUM(amount) FROM {table} GROUP BY wallet_id")
+            return {wallet_id: self._convert(total, layout) for wallet_id, total in cursor.fetchall()}
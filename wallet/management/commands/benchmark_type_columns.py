@@ -0,0 +1,112 @@
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.db import table_sizes
+from wallet.models import WalletTransaction
+
+TYPE_COLUMNS = ("bucket_type", "direction", "txn_type")
+LAYOUTS = {
+    # Avant : chaînes (CharField 10 / 10 / 20) ; après : codes SMALLINT (EnumField).
+    "text": {"bucket_type": "VARCHAR(10)", "direction": "VARCHAR(10)", "txn_type": "VARCHAR(20)"},
+    "smallint": {column: "SMALLINT" for column in TYPE_COLUMNS},
+}
+# Index composites de WalletTransaction (cf. Meta.indexes).
+INDEXES = [
+    ("wallet_id", "created_at"),
+    ("wallet_id", "bucket_type", "created_at"),
+    ("wallet_id", "txn_type", "created_at"),
+    ("wallet_id", "direction", "created_at"),
+    ("wallet_id", "actor_id", "created_at"),
+]
+# Mouvement type d'un ledger étudiant : surtout des dépenses DAILY, des dépôts répartis sur trois enveloppes.
+MOVEMENTS = [
+    (("DAILY", "DEBIT", "EXPENSE"), 55),
+    (("BILLS", "DEBIT", "EXPENSE"), 5),
+    (("DAILY", "CREDIT", "DEPOSIT"), 14),
+    (("BILLS", "CREDIT", "DEPOSIT"), 10),
+    (("SAVINGS", "CREDIT", "DEPOSIT"), 10),
+    (("DAILY", "CREDIT", "ALLOCATION"), 3),
+    (("DAILY", "CREDIT", "ADJUSTMENT"), 3),
+]
+CHUNK = 50_000
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure la taille de table et d'index d'un ledger avec les colonnes de type en texte (avant) ou en "
+        "SMALLINT (après), sur un ledger généré de --rows lignes avec les index composites de WalletTransaction. "
+        "Travaille sur deux tables temporaires, supprimées à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--wallets", type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        rows, wallets = max(1, options["rows"]), max(1, options["wallets"])
+        codes = {column: WalletTransaction._meta.get_field(column).codes for column in TYPE_COLUMNS}
+        tables = {layout: f"bench_types_{layout}" for layout in LAYOUTS}
+        try:
+            for layout, columns in LAYOUTS.items():
+                self._create(tables[layout], columns)
+            rng = random.Random(19)
+            movements, weights = zip(*MOVEMENTS)
+            start = timezone.now() - timedelta(seconds=rows)
+            for low in range(0, rows, CHUNK):
+                chunk = []
+                for pk in range(low + 1, min(rows, low + CHUNK) + 1):
+                    bucket_type, direction, txn_type = rng.choices(movements, weights)[0]
+                    wallet_id = rng.randint(1, wallets)
+                    chunk.append((
+                        pk, wallet_id, wallet_id if direction == "DEBIT" else None, bucket_type, direction, txn_type,
+                        rng.randint(1, 200_00), start + timedelta(seconds=pk),
+                    ))
+                for layout, table in tables.items():
+                    self._insert(table, chunk, codes if layout == "smallint" else None)
+
+            self._report("insertion", tables, rows)
+            # Index reconstruits : pages pleines, l'écart ne dépend plus de l'ordre d'insertion.
+            with connection.cursor() as cursor:
+                for table in tables.values():
+                    cursor.execute(f"REINDEX TABLE {table}" if connection.vendor == "postgresql" else f"REINDEX {table}")
+            self._report("REINDEX", tables, rows)
+        finally:
+            with connection.cursor() as cursor:
+                for table in tables.values():
+                    cursor.execute(f"DROP TABLE IF EXISTS {table}")
+
+    def _report(self, label, tables, rows):
+        sizes = table_sizes(tables.values())
+        text_table, text_index = sizes[tables["text"]]
+        for layout, table in tables.items():
+            size, index = sizes[table]
+            self.stdout.write(
+                f"{label:>9} {layout:>8} : table {size / 2**20:.1f} Mo ({size / rows:.1f} o/ligne, "
+                f"{100 * (size - text_table) / text_table:+.0f} %), index {index / 2**20:.1f} Mo "
+                f"({index / rows:.1f} o/ligne, {100 * (index - text_index) / text_index:+.0f} %)"
+            )
+
+    def _create(self, table, columns):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            cursor.execute(
+                f"CREATE TABLE {table} (id BIGINT PRIMARY KEY, wallet_id INTEGER NOT NULL, actor_id INTEGER, "
+                f"bucket_type {columns['bucket_type']} NOT NULL, direction {columns['direction']} NOT NULL, "
+                f"txn_type {columns['txn_type']} NOT NULL, amount BIGINT NOT NULL, created_at TIMESTAMP NOT NULL)"
+            )
+            for i, fields in enumerate(INDEXES):
+                cursor.execute(f"CREATE INDEX {table}_{i} ON {table} ({', '.join(fields)})")
+
+    def _insert(self, table, chunk, codes):
+        if codes:
+            chunk = [
+                (pk, wallet_id, actor_id, codes["bucket_type"][bucket_type], codes["direction"][direction],
+                 codes["txn_type"][txn_type], amount, created_at)
+                for pk, wallet_id, actor_id, bucket_type, direction, txn_type, amount, created_at in chunk
+            ]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(f"INSERT INTO {table} VALUES (%s, %s, %s, %s, %s, %s, %s, %s)", chunk)
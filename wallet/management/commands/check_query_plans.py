@@ -0,0 +1,119 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+User = get_user_model()
+
+# (endpoint, utilisateur, table, colonne datée) : chaque SELECT de l'endpoint qui lit `table` doit la
+# parcourir par un intervalle d'index sur `colonne`, jamais en lecture complète.
+STUDENT_CASES = [
+    ("/api/wallet/me/transactions/?date_from={d0}&date_to={d1}", "wallet_wallettransaction", "created_at"),
+    ("/api/expenses/me/?date_from={d0}&date_to={d1}", "expenses_expense", "occurred_at"),
+    ("/api/expenses/me/summary/?date_from={d0}&date_to={d1}", "expenses_expense", "occurred_at"),
+    ("/api/dashboard/student/?date_from={d0}&date_to={d1}", "expenses_expense", "occurred_at"),
+]
+PARENT_CASES = [
+    ("/api/parent-account/me/transactions/?date_from={d0}&date_to={d1}", "parent_account_parentaccounttransaction", "created_at"),
+    ("/api/wallet/students/{sid}/transactions/?date_from={d0}&date_to={d1}", "wallet_wallettransaction", "created_at"),
+    ("/api/expenses/students/{sid}/?date_from={d0}&date_to={d1}", "expenses_expense", "occurred_at"),
+    ("/api/dashboard/parent/students/{sid}/?date_from={d0}&date_to={d1}", "expenses_expense", "occurred_at"),
+]
+
+
+def explain(sql) -> list:
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return [row[-1] for row in cursor.fetchall()]
+        if connection.vendor == "postgresql":
+            # Petites tables : sans cela le planificateur préfère un Seq Scan même quand l'index convient.
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute(f"EXPLAIN {sql}")
+        return [" ".join(str(col) for col in row) for row in cursor.fetchall()]
+
+
+def plan_problem(plan, column):
+    """None si le plan lit la table par un intervalle d'index sur `column`, sinon la raison."""
+    full_scans = [
+        line for line in plan
+        if (line.startswith("SCAN ") and "INDEX" not in line) or "Seq Scan" in line
+    ]
+    if full_scans:
+        return f"lecture complète : {full_scans[0]}"
+    if not any(column in line and ("INDEX" in line or "Index Cond" in line) for line in plan):
+        return f"aucun intervalle d'index sur {column}"
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Vérifie que les endpoints filtrés par dates lisent le ledger et les dépenses par intervalle "
+        "d'index (created_at / occurred_at) : EXPLAIN de chaque requête émise. Code de sortie non nul "
+        "en cas de régression."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--student", type=int, required=True, help="Id d'un étudiant (avec wallet).")
+        parser.add_argument("--parent", type=int, help="Id d'un parent lié à l'étudiant (endpoints parent).")
+        parser.add_argument("--days", type=int, default=30, help="Largeur de la période filtrée.")
+        parser.add_argument("--verbose-plans", action="store_true", help="Affiche tous les plans.")
+
+    def handle(self, *args, **options):
+        student = User.objects.get(id=options["student"])
+        today = timezone.localdate()
+        params = {"d0": today - timedelta(days=options["days"]), "d1": today, "sid": student.id}
+
+        cases = [(url, student, table, column) for url, table, column in STUDENT_CASES]
+        if options["parent"]:
+            parent = User.objects.get(id=options["parent"])
+            cases += [(url, parent, table, column) for url, table, column in PARENT_CASES]
+
+        failures = 0
+        factory = APIRequestFactory()
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            for url, user, table, column in cases:
+                url = url.format(**params)
+                failures += self._check(factory, url, user, table, column, options["verbose_plans"])
+
+        if failures:
+            raise CommandError(f"{failures} requête(s) sans intervalle d'index.")
+        self.stdout.write(self.style.SUCCESS("Tous les plans utilisent leur index."))
+
+    def _check(self, factory, url, user, table, column, verbose) -> int:
+        request = factory.get(url)
+        force_authenticate(request, user=user)
+        match = resolve(url.split("?")[0])
+        with CaptureQueriesContext(connection) as ctx:
+            response = match.func(request, *match.args, **match.kwargs)
+            response.render()
+        if response.status_code != 200:
+            self.stdout.write(self.style.ERROR(f"FAIL {url} : HTTP {response.status_code}"))
+            return 1
+
+        failures = 0
+        checked = 0
+        for query in ctx.captured_queries:
+            sql = query["sql"]
+            if not sql.startswith("SELECT") or f'"{table}"' not in sql:
+                continue
+            checked += 1
+            plan = explain(sql)
+            problem = plan_problem(plan, column)
+            if problem or verbose:
+                self.stdout.write(f"  {sql[:160]}")
+                for line in plan:
+                    self.stdout.write(f"    {line}")
+            if problem:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f"FAIL {url} : {problem}"))
+        if not checked:
+            self.stdout.write(self.style.WARNING(f"?    {url} : aucune requête sur {table}"))
+        elif not failures:
+            self.stdout.write(f"OK   {url} ({checked} requête(s) sur {table})")
+        return failures
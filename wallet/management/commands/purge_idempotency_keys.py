@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from wallet.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Supprime par paquets les clés Idempotency-Key expirées."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Clés supprimées par requête.")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        now = timezone.now()
+        deleted = 0
+        while True:
+            ids = list(
+                IdempotencyKey.objects.filter(expires_at__lte=now).order_by("id").values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            IdempotencyKey.objects.filter(id__in=ids).delete()
+            deleted += len(ids)
+
+        self.stdout.write(self.style.SUCCESS(f"{deleted} clé(s) expirée(s) supprimée(s)."))
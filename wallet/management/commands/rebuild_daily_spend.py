@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from wallet.models import Wallet
+from wallet.services import rebuild_daily_spend
+
+
+class Command(BaseCommand):
+    help = "Reconstruit les compteurs de dépense journalière (WalletDailySpend) à partir du ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--wallet", type=int, action="append", dest="wallets", help="Limiter à ce wallet (répétable).")
+        parser.add_argument("--chunk-size", type=int, default=500, help="Nombre de wallets traités par transaction.")
+
+    def handle(self, *args, **options):
+        chunk_size = max(1, options["chunk_size"])
+        qs = Wallet.objects.order_by("id")
+        if options["wallets"]:
+            qs = qs.filter(id__in=options["wallets"])
+
+        last_id = 0
+        wallets = counters = 0
+        while True:
+            ids = list(qs.filter(id__gt=last_id).values_list("id", flat=True)[:chunk_size])
+            if not ids:
+                break
+            counters += rebuild_daily_spend(ids)
+            wallets += len(ids)
+            last_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f"{wallets} wallet(s) traités, {counters} compteur(s) écrits."))
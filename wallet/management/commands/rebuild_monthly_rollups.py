@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from wallet.models import Wallet
+from wallet.services import rebuild_monthly_rollups
+
+
+class Command(BaseCommand):
+    help = "Reconstruit les totaux mensuels (WalletMonthlyRollup) à partir du ledger, archive comprise."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--wallet", type=int, action="append", dest="wallets", help="Limiter à ce wallet (répétable).")
+        parser.add_argument("--chunk-size", type=int, default=500, help="Nombre de wallets traités par transaction.")
+
+    def handle(self, *args, **options):
+        chunk_size = max(1, options["chunk_size"])
+        qs = Wallet.objects.order_by("id")
+        if options["wallets"]:
+            qs = qs.filter(id__in=options["wallets"])
+
+        last_id = 0
+        wallets = rollups = 0
+        while True:
+            ids = list(qs.filter(id__gt=last_id).values_list("id", flat=True)[:chunk_size])
+            if not ids:
+                break
+            rollups += rebuild_monthly_rollups(ids)
+            wallets += len(ids)
+            last_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f"{wallets} wallet(s) traités, {rollups} total(aux) mensuel(s) écrits."))
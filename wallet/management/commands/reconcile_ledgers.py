@@ -0,0 +1,83 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from wallet.models import ReconciliationDrift, ReconciliationReport
+from wallet.reconciliation import CHECKS, id_chunks, init_worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Vérifie que les soldes (WalletBucket, ParentAccount) correspondent à la somme CREDIT - DEBIT du ledger, "
+        "par paquets de wallets/comptes, et enregistre un rapport de réconciliation."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", help="Aligner les soldes en écart sur le ledger.")
+        parser.add_argument("--chunk-size", type=int, default=500, help="Nombre de wallets/comptes par paquet.")
+        parser.add_argument("--workers", type=int, default=1, help="Processus en parallèle (1 = dans ce processus).")
+        parser.add_argument("--scope", choices=["all", "wallets", "accounts"], default="all")
+
+    def handle(self, *args, **options):
+        fix = options["fix"]
+        chunk_size = max(1, options["chunk_size"])
+        workers = max(1, options["workers"])
+        scopes = ["wallets", "accounts"] if options["scope"] == "all" else [options["scope"]]
+
+        report = ReconciliationReport.objects.create(fix_applied=fix)
+        checked = {"wallets": 0, "accounts": 0}
+        drifts = []
+
+        pool = None
+        if workers > 1:
+            # Les processus fils ne doivent pas partager les connexions ouvertes du parent.
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+
+        try:
+            for scope in scopes:
+                model, check = CHECKS[scope]
+                chunks = id_chunks(model, chunk_size)
+                run = partial(check, fix=fix)
+                if pool:
+                    chunks = list(chunks)
+                    outcomes = zip(chunks, pool.map(run, chunks))
+                else:
+                    outcomes = ((ids, run(ids)) for ids in chunks)
+                for ids, found in outcomes:
+                    checked[scope] += len(ids)
+                    drifts.extend(found)
+        finally:
+            if pool:
+                pool.shutdown()
+
+        ReconciliationDrift.objects.bulk_create(
+            [ReconciliationDrift(report=report, **drift) for drift in drifts], batch_size=500
+        )
+        report.wallets_checked = checked["wallets"]
+        report.accounts_checked = checked["accounts"]
+        report.drift_count = len(drifts)
+        report.finished_at = timezone.now()
+        report.save(update_fields=["wallets_checked", "accounts_checked", "drift_count", "finished_at"])
+
+        for drift in drifts:
+            target = (
+                f"wallet {drift['wallet_id']} {drift['bucket_type']}"
+                if drift["scope"] == ReconciliationDrift.Scope.WALLET_BUCKET
+                else f"compte {drift['account_id']}"
+            )
+            status = " (corrigé)" if drift["fixed"] else ""
+            self.stdout.write(
+                f"Écart {target} : solde {drift['recorded_balance']} / ledger {drift['ledger_balance']}{status}"
+            )
+
+        style = self.style.WARNING if drifts else self.style.SUCCESS
+        self.stdout.write(
+            style(
+                f"Rapport #{report.id} : {checked['wallets']} wallet(s), {checked['accounts']} compte(s), "
+                f"{len(drifts)} écart(s)."
+            )
+        )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from wallet.cache import cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Affiche le hit-rate du cache des payloads wallet, tous processus confondus (compteurs en base)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Remet les compteurs à zéro après affichage.")
+
+    def handle(self, *args, **options):
+        stats = cache_stats()
+        rate = "n/a" if stats["hit_rate"] is None else f"{stats['hit_rate']:.2%}"
+        self.stdout.write(f"hits={stats['hits']} misses={stats['misses']} hit_rate={rate}")
+        if options["reset"]:
+            reset_cache_stats()
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.11 on 2026-10-17 03:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0002_wallet_daily_spend'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='walletbucket',
+            constraint=models.CheckConstraint(condition=models.Q(('balance__gte', 0)), name='wallet_bucket_balance_gte_0'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from decimal import Decimal
+
+from django.db import migrations
+
+OWNER_CHUNK = 200
+BATCH_SIZE = 1000
+
+
+def backfill(apps, schema_editor):
+    WalletTransaction = apps.get_model("wallet", "WalletTransaction")
+    owner_ids = list(
+        WalletTransaction.objects.order_by("wallet_id").values_list("wallet_id", flat=True).distinct()
+    )
+    # Par paquets de propriétaires : mémoire bornée, et pas d'écriture pendant un curseur ouvert (SQLite).
+    for start in range(0, len(owner_ids), OWNER_CHUNK):
+        chunk = owner_ids[start:start + OWNER_CHUNK]
+        rows = list(
+            WalletTransaction.objects.filter(wallet_id__in=chunk)
+            .order_by("wallet_id", "bucket_type", "created_at", "id")
+            .only("id", "wallet_id", "bucket_type", "direction", "amount")
+        )
+        running = {}
+        for txn in rows:
+            key = (txn.wallet_id, txn.bucket_type)
+            delta = txn.amount if txn.direction == "CREDIT" else -txn.amount
+            running[key] = running.get(key, Decimal("0")) + delta
+            txn.balance_after = running[key]
+        WalletTransaction.objects.bulk_update(rows, ["balance_after"], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0004_wallettransaction_balance_after'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
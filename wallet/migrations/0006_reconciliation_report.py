@@ -0,0 +1,41 @@
+# Generated by Django 5.2.11 on 2026-10-17 03:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parent_account', '0004_backfill_balance_after'),
+        ('wallet', '0005_backfill_balance_after'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReconciliationReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('fix_applied', models.BooleanField(default=False)),
+                ('wallets_checked', models.PositiveIntegerField(default=0)),
+                ('accounts_checked', models.PositiveIntegerField(default=0)),
+                ('drift_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ReconciliationDrift',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('WALLET_BUCKET', 'Wallet bucket'), ('PARENT_ACCOUNT', 'Parent account')], max_length=20)),
+                ('bucket_type', models.CharField(blank=True, choices=[('BILLS', 'Bills'), ('SAVINGS', 'Savings'), ('DAILY', 'Daily')], default='', max_length=10)),
+                ('recorded_balance', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('ledger_balance', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('fixed', models.BooleanField(default=False)),
+                ('account', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='parent_account.parentaccount')),
+                ('wallet', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wallet.wallet')),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='drifts', to='wallet.reconciliationreport')),
+            ],
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.11 on 2026-10-17 03:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0008_idempotencykey'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['wallet', 'txn_type', 'created_at'], name='wallet_wall_wallet__bd1f7f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['wallet', 'direction', 'created_at'], name='wallet_wall_wallet__03926f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['wallet', 'actor', 'created_at'], name='wallet_wall_wallet__ec11ba_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wallettransactionarchive',
+            index=models.Index(fields=['wallet', 'txn_type', 'created_at'], name='wallet_wall_wallet__98545a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wallettransactionarchive',
+            index=models.Index(fields=['wallet', 'direction', 'created_at'], name='wallet_wall_wallet__b9351c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wallettransactionarchive',
+            index=models.Index(fields=['wallet', 'actor', 'created_at'], name='wallet_wall_wallet__4e84bc_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.11 on 2026-10-17 03:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgeting', '0001_initial'),
+        ('wallet', '0009_ledger_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AllocationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mode', models.CharField(choices=[('AUTO_PLAN', 'Plan'), ('AUTO_FALLBACK', 'Fallback (DAILY)')], max_length=20)),
+                ('group_ref', models.CharField(max_length=80)),
+                ('deposit_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True)),
+                ('savings_target', models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('plan', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='budgeting.budgetplan')),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='allocation_runs', to='wallet.wallet')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AllocationLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(blank=True, default='', max_length=80)),
+                ('need', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('allocated', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('bill', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='budgeting.billitem')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='wallet.allocationrun')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='wallettransaction',
+            name='allocation',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transactions', to='wallet.allocationrun'),
+        ),
+        migrations.AddField(
+            model_name='wallettransactionarchive',
+            name='allocation',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_transactions', to='wallet.allocationrun'),
+        ),
+        migrations.AddIndex(
+            model_name='allocationrun',
+            index=models.Index(fields=['wallet', 'group_ref'], name='wallet_allo_wallet__be5b4d_idx'),
+        ),
+    ]
@@ -0,0 +1,121 @@
+from decimal import Decimal
+
+from django.db import migrations
+
+OWNER_CHUNK = 200
+BATCH_SIZE = 1000
+ALLOCATION_KEYS = ("allocation", "group_ref", "plan_id", "deposit_amount", "savings_target", "bills_breakdown")
+
+
+def _dec(v):
+    return Decimal(str(v)) if v not in (None, "") else None
+
+
+def _normalize(apps, model_name):
+    Txn = apps.get_model("wallet", model_name)
+    AllocationRun = apps.get_model("wallet", "AllocationRun")
+    AllocationLine = apps.get_model("wallet", "AllocationLine")
+    BudgetPlan = apps.get_model("budgeting", "BudgetPlan")
+    BillItem = apps.get_model("budgeting", "BillItem")
+
+    pending = Txn.objects.filter(txn_type="DEPOSIT", allocation__isnull=True, metadata__has_key="group_ref")
+    owner_ids = list(pending.order_by("wallet_id").values_list("wallet_id", flat=True).distinct())
+    # Par paquets de wallets : un dépôt (toutes ses lignes) est toujours traité dans un même paquet.
+    for start in range(0, len(owner_ids), OWNER_CHUNK):
+        rows = list(pending.filter(wallet_id__in=owner_ids[start:start + OWNER_CHUNK]).order_by("id"))
+
+        groups = {}
+        for txn in rows:
+            groups.setdefault((txn.wallet_id, txn.metadata["group_ref"]), []).append(txn)
+
+        plan_ids = {t.metadata.get("plan_id") for t in rows if t.metadata.get("plan_id")}
+        known_plans = set(BudgetPlan.objects.filter(id__in=plan_ids).values_list("id", flat=True))
+        bill_ids = {
+            b.get("bill_id") for t in rows for b in t.metadata.get("bills_breakdown", []) if b.get("bill_id")
+        }
+        known_bills = set(BillItem.objects.filter(id__in=bill_ids).values_list("id", flat=True))
+
+        runs = []
+        for (wallet_id, group_ref), txns in groups.items():
+            meta = txns[0].metadata
+            runs.append(
+                AllocationRun(
+                    wallet_id=wallet_id,
+                    plan_id=meta.get("plan_id") if meta.get("plan_id") in known_plans else None,
+                    mode=meta.get("allocation") or "AUTO_FALLBACK",
+                    group_ref=group_ref[:80],
+                    deposit_amount=_dec(meta.get("deposit_amount")),
+                    savings_target=_dec(meta.get("savings_target")),
+                )
+            )
+        AllocationRun.objects.bulk_create(runs, batch_size=BATCH_SIZE)
+
+        lines = []
+        for run, txns in zip(runs, groups.values()):
+            # auto_now_add a écrasé la date : on reprend celle du dépôt.
+            run.created_at = txns[0].created_at
+            for txn in txns:
+                for b in txn.metadata.get("bills_breakdown", []):
+                    lines.append(
+                        AllocationLine(
+                            run=run,
+                            bill_id=b.get("bill_id") if b.get("bill_id") in known_bills else None,
+                            title=(b.get("title") or "")[:80],
+                            need=_dec(b.get("need")) or Decimal("0"),
+                            allocated=_dec(b.get("allocated")) or Decimal("0"),
+                        )
+                    )
+                txn.allocation = run
+                txn.metadata = {k: v for k, v in txn.metadata.items() if k not in ALLOCATION_KEYS}
+        AllocationRun.objects.bulk_update(runs, ["created_at"], batch_size=BATCH_SIZE)
+        AllocationLine.objects.bulk_create(lines, batch_size=BATCH_SIZE)
+        Txn.objects.bulk_update(rows, ["allocation", "metadata"], batch_size=BATCH_SIZE)
+
+
+def _restore(apps, model_name):
+    Txn = apps.get_model("wallet", model_name)
+    AllocationLine = apps.get_model("wallet", "AllocationLine")
+
+    while True:
+        rows = list(Txn.objects.filter(allocation__isnull=False).select_related("allocation").order_by("id")[:BATCH_SIZE])
+        if not rows:
+            return
+        lines = {}
+        for line in AllocationLine.objects.filter(run_id__in={t.allocation_id for t in rows}).order_by("id"):
+            lines.setdefault(line.run_id, []).append(
+                {"bill_id": line.bill_id, "title": line.title, "need": str(line.need), "allocated": str(line.allocated)}
+            )
+        for txn in rows:
+            run = txn.allocation
+            meta = {"allocation": run.mode, "group_ref": run.group_ref}
+            if run.mode == "AUTO_PLAN":
+                meta.update(
+                    plan_id=run.plan_id, deposit_amount=str(run.deposit_amount), savings_target=str(run.savings_target)
+                )
+                if txn.bucket_type == "BILLS":
+                    meta["bills_breakdown"] = lines.get(run.id, [])
+            txn.metadata = {**txn.metadata, **meta}
+            txn.allocation = None
+        Txn.objects.bulk_update(rows, ["allocation", "metadata"])
+
+
+def forwards(apps, schema_editor):
+    for model_name in ("WalletTransaction", "WalletTransactionArchive"):
+        _normalize(apps, model_name)
+
+
+def backwards(apps, schema_editor):
+    for model_name in ("WalletTransaction", "WalletTransactionArchive"):
+        _restore(apps, model_name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgeting', '0001_initial'),
+        ('wallet', '0010_allocation_run'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.11 on 2026-10-17 03:51
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DateField, Sum
+from django.db.models.functions import TruncMonth
+
+OWNER_CHUNK = 500
+BATCH_SIZE = 1000
+KEYS = ["wallet_id", "month", "bucket_type", "txn_type", "direction", "actor_id"]
+
+
+def backfill(apps, schema_editor):
+    Wallet = apps.get_model("wallet", "Wallet")
+    WalletMonthlyRollup = apps.get_model("wallet", "WalletMonthlyRollup")
+    sources = [apps.get_model("wallet", "WalletTransactionArchive"), apps.get_model("wallet", "WalletTransaction")]
+
+    wallet_ids = list(Wallet.objects.order_by("id").values_list("id", flat=True))
+    for start in range(0, len(wallet_ids), OWNER_CHUNK):
+        chunk = wallet_ids[start:start + OWNER_CHUNK]
+        totals = {}
+        for model in sources:
+            rows = (
+                model.objects.filter(wallet_id__in=chunk)
+                .annotate(month=TruncMonth("created_at", output_field=DateField()))
+                .values(*KEYS)
+                .annotate(total=Sum("amount"), count=Count("id"))
+                .order_by()
+            )
+            for r in rows:
+                key = tuple(r[k] for k in KEYS)
+                total, count = totals.get(key, (Decimal("0"), 0))
+                totals[key] = (total + r["total"], count + r["count"])
+        WalletMonthlyRollup.objects.bulk_create(
+            [WalletMonthlyRollup(**dict(zip(KEYS, key)), total=t, count=c) for key, (t, c) in totals.items()],
+            batch_size=BATCH_SIZE,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0011_normalize_allocation_metadata'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('bucket_type', models.CharField(choices=[('BILLS', 'Bills'), ('SAVINGS', 'Savings'), ('DAILY', 'Daily')], max_length=10)),
+                ('txn_type', models.CharField(choices=[('DEPOSIT', 'Deposit'), ('ALLOCATION', 'Allocation'), ('EXPENSE', 'Expense'), ('ADJUSTMENT', 'Adjustment')], max_length=20)),
+                ('direction', models.CharField(choices=[('CREDIT', 'Credit'), ('DEBIT', 'Debit')], max_length=10)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('actor', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to='wallet.wallet')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('actor__isnull', False)), fields=('wallet', 'month', 'bucket_type', 'txn_type', 'direction', 'actor'), name='uniq_wallet_rollup_actor'), models.UniqueConstraint(condition=models.Q(('actor__isnull', True)), fields=('wallet', 'month', 'bucket_type', 'txn_type', 'direction'), name='uniq_wallet_rollup_no_actor')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
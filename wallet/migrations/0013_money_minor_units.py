@@ -0,0 +1,197 @@
+# Generated by Django 5.2.11 on 2026-10-17 03:58
+
+import core.money
+from django.db import migrations, models
+from django.db.models import ExpressionWrapper, F, Value
+from django.db.models.functions import Round
+
+# Passage en centimes en trois temps, portable (SQLite / PostgreSQL) et réversible :
+# 1. colonnes élargies (le montant × 100 doit tenir), 2. montants × 100, 3. colonnes BIGINT (MoneyField).
+WIDE = models.DecimalField(decimal_places=2, max_digits=20)
+MONEY_FIELDS = {
+    "allocationline": ["allocated", "need"],
+    "allocationrun": ["deposit_amount", "savings_target"],
+    "reconciliationdrift": ["ledger_balance", "recorded_balance"],
+    "wallet": ["daily_limit"],
+    "walletbucket": ["balance"],
+    "walletdailyspend": ["amount"],
+    "walletledgermonth": ["total"],
+    "walletmonthlyrollup": ["total"],
+    "wallettransaction": ["amount", "balance_after"],
+    "wallettransactionarchive": ["amount", "balance_after"],
+}
+
+
+def to_minor_units(apps, schema_editor):
+    for model_name, fields in MONEY_FIELDS.items():
+        model = apps.get_model("wallet", model_name)
+        model.objects.update(**{f: Round(F(f) * 100) for f in fields})
+
+
+def from_minor_units(apps, schema_editor):
+    for model_name, fields in MONEY_FIELDS.items():
+        model = apps.get_model("wallet", model_name)
+        model.objects.update(
+            **{f: ExpressionWrapper(F(f) / Value(100.0), output_field=WIDE) for f in fields}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0012_wallet_monthly_rollup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='allocationline',
+            name='allocated',
+            field=models.DecimalField(decimal_places=2, max_digits=20),
+        ),
+        migrations.AlterField(
+            model_name='allocationline',
+            name='need',
+            field=models.DecimalField(decimal_places=2, max_digits=20),
+        ),
+        migrations.AlterField(
+            model_name='allocationrun',
+            name='deposit_amount',
+            field=models.DecimalField(decimal_places=2, max_digits=20, blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='allocationrun',
+            name='savings_target',
+            field=models.DecimalField(decimal_places=2, max_digits=20, blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='reconciliationdrift',
+            name='ledger_balance',
+            field=models.DecimalField(decimal_places=2, max_digits=20),
+        ),
+        migrations.AlterField(
+            model_name='reconciliationdrift',
+            name='recorded_balance',
+            field=models.DecimalField(decimal_places=2, max_digits=20),
+        ),
+        migrations.AlterField(
+            model_name='wallet',
+            name='daily_limit',
+            field=models.DecimalField(decimal_places=2, max_digits=20, default=0),
+        ),
+        migrations.AlterField(
+            model_name='walletbucket',
+            name='balance',
+            field=models.DecimalField(decimal_places=2, max_digits=20, default=0),
+        ),
+        migrations.AlterField(
+            model_name='walletdailyspend',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, max_digits=20, default=0),
+        ),
+        migrations.AlterField(
+            model_name='walletledgermonth',
+            name='total',
+            field=models.DecimalField(decimal_places=2, max_digits=20, default=0),
+        ),
+        migrations.AlterField(
+            model_name='walletmonthlyrollup',
+            name='total',
+            field=models.DecimalField(decimal_places=2, max_digits=20, default=0),
+        ),
+        migrations.AlterField(
+            model_name='wallettransaction',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, max_digits=20),
+        ),
+        migrations.AlterField(
+            model_name='wallettransaction',
+            name='balance_after',
+            field=models.DecimalField(decimal_places=2, max_digits=20, blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='wallettransactionarchive',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, max_digits=20),
+        ),
+        migrations.AlterField(
+            model_name='wallettransactionarchive',
+            name='balance_after',
+            field=models.DecimalField(decimal_places=2, max_digits=20, blank=True, null=True),
+        ),
+        migrations.RunPython(to_minor_units, from_minor_units),
+        migrations.AlterField(
+            model_name='allocationline',
+            name='allocated',
+            field=core.money.MoneyField(decimal_places=2, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='allocationline',
+            name='need',
+            field=core.money.MoneyField(decimal_places=2, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='allocationrun',
+            name='deposit_amount',
+            field=core.money.MoneyField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AlterField(
+            model_name='allocationrun',
+            name='savings_target',
+            field=core.money.MoneyField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AlterField(
+            model_name='reconciliationdrift',
+            name='ledger_balance',
+            field=core.money.MoneyField(decimal_places=2, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='reconciliationdrift',
+            name='recorded_balance',
+            field=core.money.MoneyField(decimal_places=2, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='wallet',
+            name='daily_limit',
+            field=core.money.MoneyField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='walletbucket',
+            name='balance',
+            field=core.money.MoneyField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='walletdailyspend',
+            name='amount',
+            field=core.money.MoneyField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='walletledgermonth',
+            name='total',
+            field=core.money.MoneyField(decimal_places=2, default=0, max_digits=16),
+        ),
+        migrations.AlterField(
+            model_name='walletmonthlyrollup',
+            name='total',
+            field=core.money.MoneyField(decimal_places=2, default=0, max_digits=16),
+        ),
+        migrations.AlterField(
+            model_name='wallettransaction',
+            name='amount',
+            field=core.money.MoneyField(decimal_places=2, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='wallettransaction',
+            name='balance_after',
+            field=core.money.MoneyField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AlterField(
+            model_name='wallettransactionarchive',
+            name='amount',
+            field=core.money.MoneyField(decimal_places=2, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='wallettransactionarchive',
+            name='balance_after',
+            field=core.money.MoneyField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+    ]
@@ -0,0 +1,128 @@
+# Generated by Django 5.2.11 on 2026-10-17 04:05
+
+import core.enums
+from django.db import migrations
+from django.db.models import Case, F, Value, When
+
+# Les valeurs texte sont d'abord remplacées par leur code ("DEBIT" → "2") dans la colonne texte,
+# puis la colonne passe en SMALLINT : conversion directe ("2"::smallint), portable et réversible.
+TYPE_COLUMNS = {
+    "walletdailyspend": {
+        "bucket_type": {"BILLS": 1, "SAVINGS": 2, "DAILY": 3},
+    },
+    "walletledgermonth": {
+        "bucket_type": {"BILLS": 1, "SAVINGS": 2, "DAILY": 3},
+        "direction": {"CREDIT": 1, "DEBIT": 2},
+        "txn_type": {"DEPOSIT": 1, "ALLOCATION": 2, "EXPENSE": 3, "ADJUSTMENT": 4},
+    },
+    "walletmonthlyrollup": {
+        "bucket_type": {"BILLS": 1, "SAVINGS": 2, "DAILY": 3},
+        "direction": {"CREDIT": 1, "DEBIT": 2},
+        "txn_type": {"DEPOSIT": 1, "ALLOCATION": 2, "EXPENSE": 3, "ADJUSTMENT": 4},
+    },
+    "wallettransaction": {
+        "bucket_type": {"BILLS": 1, "SAVINGS": 2, "DAILY": 3},
+        "direction": {"CREDIT": 1, "DEBIT": 2},
+        "txn_type": {"DEPOSIT": 1, "ALLOCATION": 2, "EXPENSE": 3, "ADJUSTMENT": 4},
+    },
+    "wallettransactionarchive": {
+        "bucket_type": {"BILLS": 1, "SAVINGS": 2, "DAILY": 3},
+        "direction": {"CREDIT": 1, "DEBIT": 2},
+        "txn_type": {"DEPOSIT": 1, "ALLOCATION": 2, "EXPENSE": 3, "ADJUSTMENT": 4},
+    },
+}
+
+
+def _recode(apps, mapping):
+    for model_name, fields in TYPE_COLUMNS.items():
+        model = apps.get_model("wallet", model_name)
+        model.objects.update(
+            **{
+                field: Case(*[When(**{field: old}, then=Value(new)) for old, new in mapping(codes)], default=F(field))
+                for field, codes in fields.items()
+            }
+        )
+
+
+def to_codes(apps, schema_editor):
+    _recode(apps, lambda codes: [(value, str(code)) for value, code in codes.items()])
+
+
+def from_codes(apps, schema_editor):
+    _recode(apps, lambda codes: [(str(code), value) for value, code in codes.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0013_money_minor_units'),
+    ]
+
+    operations = [
+        migrations.RunPython(to_codes, from_codes),
+        migrations.AlterField(
+            model_name='walletdailyspend',
+            name='bucket_type',
+            field=core.enums.EnumField(choices=[('BILLS', 'Bills'), ('SAVINGS', 'Savings'), ('DAILY', 'Daily')], codes={'BILLS': 1, 'DAILY': 3, 'SAVINGS': 2}, max_length=7),
+        ),
+        migrations.AlterField(
+            model_name='walletledgermonth',
+            name='bucket_type',
+            field=core.enums.EnumField(choices=[('BILLS', 'Bills'), ('SAVINGS', 'Savings'), ('DAILY', 'Daily')], codes={'BILLS': 1, 'DAILY': 3, 'SAVINGS': 2}, max_length=7),
+        ),
+        migrations.AlterField(
+            model_name='walletledgermonth',
+            name='direction',
+            field=core.enums.EnumField(choices=[('CREDIT', 'Credit'), ('DEBIT', 'Debit')], codes={'CREDIT': 1, 'DEBIT': 2}, max_length=6),
+        ),
+        migrations.AlterField(
+            model_name='walletledgermonth',
+            name='txn_type',
+            field=core.enums.EnumField(choices=[('DEPOSIT', 'Deposit'), ('ALLOCATION', 'Allocation'), ('EXPENSE', 'Expense'), ('ADJUSTMENT', 'Adjustment')], codes={'ADJUSTMENT': 4, 'ALLOCATION': 2, 'DEPOSIT': 1, 'EXPENSE': 3}, max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='walletmonthlyrollup',
+            name='bucket_type',
+            field=core.enums.EnumField(choices=[('BILLS', 'Bills'), ('SAVINGS', 'Savings'), ('DAILY', 'Daily')], codes={'BILLS': 1, 'DAILY': 3, 'SAVINGS': 2}, max_length=7),
+        ),
+        migrations.AlterField(
+            model_name='walletmonthlyrollup',
+            name='direction',
+            field=core.enums.EnumField(choices=[('CREDIT', 'Credit'), ('DEBIT', 'Debit')], codes={'CREDIT': 1, 'DEBIT': 2}, max_length=6),
+        ),
+        migrations.AlterField(
+            model_name='walletmonthlyrollup',
+            name='txn_type',
+            field=core.enums.EnumField(choices=[('DEPOSIT', 'Deposit'), ('ALLOCATION', 'Allocation'), ('EXPENSE', 'Expense'), ('ADJUSTMENT', 'Adjustment')], codes={'ADJUSTMENT': 4, 'ALLOCATION': 2, 'DEPOSIT': 1, 'EXPENSE': 3}, max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='wallettransaction',
+            name='bucket_type',
+            field=core.enums.EnumField(choices=[('BILLS', 'Bills'), ('SAVINGS', 'Savings'), ('DAILY', 'Daily')], codes={'BILLS': 1, 'DAILY': 3, 'SAVINGS': 2}, max_length=7),
+        ),
+        migrations.AlterField(
+            model_name='wallettransaction',
+            name='direction',
+            field=core.enums.EnumField(choices=[('CREDIT', 'Credit'), ('DEBIT', 'Debit')], codes={'CREDIT': 1, 'DEBIT': 2}, max_length=6),
+        ),
+        migrations.AlterField(
+            model_name='wallettransaction',
+            name='txn_type',
+            field=core.enums.EnumField(choices=[('DEPOSIT', 'Deposit'), ('ALLOCATION', 'Allocation'), ('EXPENSE', 'Expense'), ('ADJUSTMENT', 'Adjustment')], codes={'ADJUSTMENT': 4, 'ALLOCATION': 2, 'DEPOSIT': 1, 'EXPENSE': 3}, max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='wallettransactionarchive',
+            name='bucket_type',
+            field=core.enums.EnumField(choices=[('BILLS', 'Bills'), ('SAVINGS', 'Savings'), ('DAILY', 'Daily')], codes={'BILLS': 1, 'DAILY': 3, 'SAVINGS': 2}, max_length=7),
+        ),
+        migrations.AlterField(
+            model_name='wallettransactionarchive',
+            name='direction',
+            field=core.enums.EnumField(choices=[('CREDIT', 'Credit'), ('DEBIT', 'Debit')], codes={'CREDIT': 1, 'DEBIT': 2}, max_length=6),
+        ),
+        migrations.AlterField(
+            model_name='wallettransactionarchive',
+            name='txn_type',
+            field=core.enums.EnumField(choices=[('DEPOSIT', 'Deposit'), ('ALLOCATION', 'Allocation'), ('EXPENSE', 'Expense'), ('ADJUSTMENT', 'Adjustment')], codes={'ADJUSTMENT': 4, 'ALLOCATION': 2, 'DEPOSIT': 1, 'EXPENSE': 3}, max_length=10),
+        ),
+    ]
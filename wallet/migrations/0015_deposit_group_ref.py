@@ -0,0 +1,62 @@
+# Generated by Django 5.2.11 on 2026-10-17 04:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_deposit_links(apps, schema_editor):
+    AllocationRun = apps.get_model("wallet", "AllocationRun")
+    transfer_models = [
+        apps.get_model("parent_account", "ParentAccountTransaction"),
+        apps.get_model("parent_account", "ParentAccountTransactionArchive"),
+    ]
+    for model_name in ("WalletTransaction", "WalletTransactionArchive"):
+        Txn = apps.get_model("wallet", model_name)
+        Txn.objects.filter(allocation__isnull=False, group_ref__isnull=True).update(
+            group_ref=Subquery(AllocationRun.objects.filter(pk=OuterRef("allocation_id")).values("group_ref")[:1])
+        )
+        # Dépôt simple : transfert du même parent portant la même référence (vivant, sinon archivé).
+        # Les anciens dépôts groupés (un transfert "BULK-..." pour tout le lot) restent sans lien.
+        for Transfer in transfer_models:
+            Txn.objects.filter(txn_type="DEPOSIT", group_ref__isnull=False, transfer__isnull=True).update(
+                transfer_id=Subquery(
+                    Transfer.objects.filter(
+                        txn_type="TRANSFER_OUT",
+                        group_ref=OuterRef("group_ref"),
+                        account__parent_id=OuterRef("actor_id"),
+                    ).values("id")[:1]
+                )
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parent_account', '0009_deposit_group_ref'),
+        ('wallet', '0014_compact_type_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wallettransaction',
+            name='group_ref',
+            field=models.CharField(blank=True, db_index=True, max_length=80, null=True),
+        ),
+        migrations.AddField(
+            model_name='wallettransaction',
+            name='transfer',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='wallet_legs', to='parent_account.parentaccounttransaction'),
+        ),
+        migrations.AddField(
+            model_name='wallettransactionarchive',
+            name='group_ref',
+            field=models.CharField(blank=True, db_index=True, max_length=80, null=True),
+        ),
+        migrations.AddField(
+            model_name='wallettransactionarchive',
+            name='transfer',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='archived_wallet_legs', to='parent_account.parentaccounttransaction'),
+        ),
+        migrations.RunPython(backfill_deposit_links, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations
+from django.db.models import Sum
+from django.db.models.functions import Coalesce, TruncDate
+
+OWNER_CHUNK = 500
+BATCH_SIZE = 1000
+
+
+def backfill(apps, schema_editor):
+    """
+    Compteurs journaliers recalculés depuis le ledger (cf. `wallet.services.rebuild_daily_spend`) :
+    sans eux, `spent_today()` vaut 0 et le plafond journalier n'est plus appliqué après la mise à jour.
+    """
+    Wallet = apps.get_model("wallet", "Wallet")
+    WalletDailySpend = apps.get_model("wallet", "WalletDailySpend")
+    WalletTransaction = apps.get_model("wallet", "WalletTransaction")
+
+    wallet_ids = list(Wallet.objects.order_by("id").values_list("id", flat=True))
+    for start in range(0, len(wallet_ids), OWNER_CHUNK):
+        chunk = wallet_ids[start:start + OWNER_CHUNK]
+        WalletDailySpend.objects.filter(wallet_id__in=chunk).delete()
+        rows = (
+            WalletTransaction.objects.filter(wallet_id__in=chunk, direction="DEBIT", txn_type="EXPENSE")
+            .annotate(day=Coalesce(TruncDate("expense__occurred_at"), TruncDate("created_at")))
+            .values("wallet_id", "bucket_type", "day")
+            .annotate(total=Sum("amount"))
+            .order_by()
+        )
+        WalletDailySpend.objects.bulk_create(
+            [
+                WalletDailySpend(wallet_id=r["wallet_id"], bucket_type=r["bucket_type"], day=r["day"], amount=r["total"])
+                for r in rows
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallet", "0015_deposit_group_ref"),
+        ("expenses", "0005_expense_client_id"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,8 @@
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from core.enums import EnumField
+from core.money import MoneyField
 
 User = settings.AUTH_USER_MODEL
 
@@ -7,7 +10,7 @@ User = settings.AUTH_USER_MODEL
 class Wallet(models.Model):
     student = models.OneToOneField(User, on_delete=models.CASCADE, related_name="wallet")
     currency = models.CharField(max_length=8, default="XAF")
-    daily_limit = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    daily_limit = MoneyField(max_digits=12, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -22,18 +25,75 @@ class WalletBucket(models.Model):
 
     wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="buckets")
     bucket_type = models.CharField(max_length=10, choices=Type.choices)
-    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    balance = MoneyField(default=0)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=["wallet", "bucket_type"], name="uniq_wallet_bucket"),
+            models.CheckConstraint(condition=models.Q(balance__gte=0), name="wallet_bucket_balance_gte_0"),
         ]
 
     def __str__(self):
         return f"{self.wallet_id}:{self.bucket_type}"
 
 
+class AllocationRun(models.Model):
+    """Répartition d'un dépôt : paramètres communs aux lignes de ledger créées par ce dépôt."""
+
+    class Mode(models.TextChoices):
+        AUTO_PLAN = "AUTO_PLAN", "Plan"
+        AUTO_FALLBACK = "AUTO_FALLBACK", "Fallback (DAILY)"
+
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="allocation_runs")
+    plan = models.ForeignKey(
+        "budgeting.BudgetPlan", on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    mode = models.CharField(max_length=20, choices=Mode.choices)
+    group_ref = models.CharField(max_length=80)
+    deposit_amount = MoneyField(null=True, blank=True)
+    savings_target = MoneyField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["wallet", "group_ref"])]
+
+    def as_metadata(self, bucket_type: str) -> dict:
+        """Forme historique du JSON `metadata` des lignes de dépôt (compatibilité API)."""
+        meta = {"allocation": self.mode, "group_ref": self.group_ref}
+        if self.mode == self.Mode.AUTO_PLAN:
+            meta.update(
+                plan_id=self.plan_id,
+                deposit_amount=str(self.deposit_amount),
+                savings_target=str(self.savings_target),
+            )
+            if bucket_type == WalletBucket.Type.BILLS:
+                meta["bills_breakdown"] = [line.as_breakdown() for line in self.lines.all()]
+        return meta
+
+    def __str__(self):
+        return f"{self.wallet_id}:{self.group_ref} {self.mode}"
+
+
+class AllocationLine(models.Model):
+    """Part d'un dépôt affectée à une charge (enveloppe BILLS)."""
+
+    run = models.ForeignKey(AllocationRun, on_delete=models.CASCADE, related_name="lines")
+    bill = models.ForeignKey("budgeting.BillItem", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    title = models.CharField(max_length=80, blank=True, default="")
+    need = MoneyField()
+    allocated = MoneyField()
+
+    class Meta:
+        ordering = ["id"]
+
+    def as_breakdown(self) -> dict:
+        return {"bill_id": self.bill_id, "title": self.title, "need": str(self.need), "allocated": str(self.allocated)}
+
+    def __str__(self):
+        return f"{self.run_id}:{self.title} {self.allocated}"
+
+
 class WalletTransaction(models.Model):
     class Direction(models.TextChoices):
         CREDIT = "CREDIT", "Credit"
@@ -49,20 +109,229 @@ class WalletTransaction(models.Model):
     actor = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="wallet_actions"
     )
-    bucket_type = models.CharField(max_length=10, choices=WalletBucket.Type.choices)
-    direction = models.CharField(max_length=10, choices=Direction.choices)
-    txn_type = models.CharField(max_length=20, choices=TxnType.choices)
-    amount = models.DecimalField(max_digits=14, decimal_places=2)
+    bucket_type = EnumField(WalletBucket.Type)
+    direction = EnumField(Direction)
+    txn_type = EnumField(TxnType)
+    amount = MoneyField()
+    balance_after = MoneyField(null=True, blank=True)
     description = models.CharField(max_length=255, blank=True, default="")
     external_ref = models.CharField(max_length=80, null=True, blank=True, unique=True)
     metadata = models.JSONField(default=dict, blank=True)
+    allocation = models.ForeignKey(
+        AllocationRun, on_delete=models.SET_NULL, null=True, blank=True, related_name="transactions"
+    )
+    # Dépôts : référence du dépôt (commune à ses lignes) et transfert parent qui l'a financé (un seul
+    # transfert pour tout un dépôt groupé). Pas de contrainte en base : l'archivage déplace les
+    # transferts sans toucher aux lignes wallet, l'identifiant est conservé dans l'archive.
+    group_ref = models.CharField(max_length=80, null=True, blank=True, db_index=True)
+    transfer = models.ForeignKey(
+        "parent_account.ParentAccountTransaction",
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name="wallet_legs",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         indexes = [
             models.Index(fields=["wallet", "created_at"]),
             models.Index(fields=["wallet", "bucket_type", "created_at"]),
+            models.Index(fields=["wallet", "txn_type", "created_at"]),
+            models.Index(fields=["wallet", "direction", "created_at"]),
+            models.Index(fields=["wallet", "actor", "created_at"]),
         ]
 
     def __str__(self):
         return f"{self.wallet_id} {self.txn_type} {self.direction} {self.amount}"
+
+
+class WalletTransactionArchive(models.Model):
+    """Ligne de ledger archivée (mois clos). `id` reprend l'identifiant d'origine de la WalletTransaction."""
+
+    id = models.BigIntegerField(primary_key=True)
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="archived_transactions")
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    bucket_type = EnumField(WalletBucket.Type)
+    direction = EnumField(WalletTransaction.Direction)
+    txn_type = EnumField(WalletTransaction.TxnType)
+    amount = MoneyField()
+    balance_after = MoneyField(null=True, blank=True)
+    description = models.CharField(max_length=255, blank=True, default="")
+    external_ref = models.CharField(max_length=80, null=True, blank=True)
+    metadata = models.JSONField(default=dict, blank=True)
+    allocation = models.ForeignKey(
+        AllocationRun, on_delete=models.SET_NULL, null=True, blank=True, related_name="archived_transactions"
+    )
+    group_ref = models.CharField(max_length=80, null=True, blank=True, db_index=True)
+    transfer = models.ForeignKey(
+        "parent_account.ParentAccountTransaction",
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name="archived_wallet_legs",
+    )
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["wallet", "created_at"]),
+            models.Index(fields=["wallet", "bucket_type", "created_at"]),
+            models.Index(fields=["wallet", "txn_type", "created_at"]),
+            models.Index(fields=["wallet", "direction", "created_at"]),
+            models.Index(fields=["wallet", "actor", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.wallet_id} {self.txn_type} {self.direction} {self.amount} (archived)"
+
+
+class WalletLedgerMonth(models.Model):
+    """Résumé laissé par l'archivage : total et nombre de lignes archivées par mois et par type."""
+
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="ledger_months")
+    month = models.DateField()
+    bucket_type = EnumField(WalletBucket.Type)
+    direction = EnumField(WalletTransaction.Direction)
+    txn_type = EnumField(WalletTransaction.TxnType)
+    total = MoneyField(max_digits=16, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["wallet", "month", "bucket_type", "direction", "txn_type"], name="uniq_wallet_ledger_month"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.wallet_id}:{self.month:%Y-%m} {self.bucket_type} {self.txn_type} {self.total}"
+
+
+class WalletMonthlyRollup(models.Model):
+    """
+    Totaux mensuels du ledger par (wallet, mois, enveloppe, type, sens, acteur), tenus à jour dans la
+    même transaction que chaque écriture. Lus par les dashboards à la place des agrégats sur le ledger ;
+    l'archivage n'y touche pas (cf. `manage.py rebuild_monthly_rollups` pour les recalculer).
+    """
+
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="monthly_rollups")
+    month = models.DateField()
+    bucket_type = EnumField(WalletBucket.Type)
+    txn_type = EnumField(WalletTransaction.TxnType)
+    direction = EnumField(WalletTransaction.Direction)
+    # Sans contrainte en base : supprimer un utilisateur ne doit ni effacer ni fusionner ses totaux.
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    total = MoneyField(max_digits=16, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["wallet", "month", "bucket_type", "txn_type", "direction", "actor"],
+                condition=models.Q(actor__isnull=False),
+                name="uniq_wallet_rollup_actor",
+            ),
+            models.UniqueConstraint(
+                fields=["wallet", "month", "bucket_type", "txn_type", "direction"],
+                condition=models.Q(actor__isnull=True),
+                name="uniq_wallet_rollup_no_actor",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.wallet_id}:{self.month:%Y-%m} {self.bucket_type} {self.txn_type} {self.total}"
+
+
+class WalletDailySpend(models.Model):
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="daily_spend")
+    bucket_type = EnumField(WalletBucket.Type)
+    day = models.DateField()
+    amount = MoneyField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["wallet", "bucket_type", "day"], name="uniq_wallet_daily_spend"),
+        ]
+
+    def __str__(self):
+        return f"{self.wallet_id}:{self.bucket_type}:{self.day} {self.amount}"
+
+
+class CacheCounter(models.Model):
+    """Compteur de métriques partagé par les processus (hits / misses du cache wallet, cf. wallet/cache.py)."""
+    name = models.CharField(max_length=64, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}={self.value}"
+
+
+class ReconciliationReport(models.Model):
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    fix_applied = models.BooleanField(default=False)
+    wallets_checked = models.PositiveIntegerField(default=0)
+    accounts_checked = models.PositiveIntegerField(default=0)
+    drift_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Reconciliation({self.started_at:%Y-%m-%d %H:%M}, drift={self.drift_count})"
+
+
+class ReconciliationDrift(models.Model):
+    class Scope(models.TextChoices):
+        WALLET_BUCKET = "WALLET_BUCKET", "Wallet bucket"
+        PARENT_ACCOUNT = "PARENT_ACCOUNT", "Parent account"
+
+    report = models.ForeignKey(ReconciliationReport, on_delete=models.CASCADE, related_name="drifts")
+    scope = models.CharField(max_length=20, choices=Scope.choices)
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    bucket_type = models.CharField(max_length=10, choices=WalletBucket.Type.choices, blank=True, default="")
+    account = models.ForeignKey(
+        "parent_account.ParentAccount", on_delete=models.CASCADE, null=True, blank=True, related_name="+"
+    )
+    recorded_balance = MoneyField()
+    ledger_balance = MoneyField()
+    fixed = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"{self.scope} {self.recorded_balance} != {self.ledger_balance}"
+
+
+class IdempotencyKey(models.Model):
+    class Status(models.TextChoices):
+        IN_PROGRESS = "IN_PROGRESS", "In progress"
+        COMPLETED = "COMPLETED", "Completed"
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="idempotency_keys")
+    key = models.CharField(max_length=255)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status = models.CharField(max_length=12, choices=Status.choices, default=Status.IN_PROGRESS)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="uniq_idempotency_user_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key} {self.status}"
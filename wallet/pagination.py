@@ -0,0 +1,166 @@
+from base64 import b64decode, b64encode
+from urllib import parse
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Pagination par curseur (keyset) sur `(ordering_field, id)`, du plus récent au plus ancien.
+
+    Chaque page est une simple lecture de l'index `(owner, ordering_field)` à partir de la dernière
+    ligne vue : pas d'OFFSET ni de COUNT(*), donc la latence reste la même quelle que soit la page.
+    Les curseurs `next` / `previous` sont opaques pour le client.
+    """
+
+    ordering_field = "created_at"
+    page_size = getattr(settings, "LEDGER_PAGE_SIZE", 50)
+    max_page_size = getattr(settings, "LEDGER_MAX_PAGE_SIZE", 200)
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+
+        reverse = bool(self.cursor and self.cursor["reverse"])
+        sources = [queryset]
+        # Historique archivé : la vue peut exposer une seconde source (mêmes champs), fusionnée ici.
+        get_archive_queryset = getattr(view, "get_archive_queryset", None)
+        if get_archive_queryset is not None:
+            sources.append(view.filter_queryset(get_archive_queryset()))
+
+        rows = []
+        for qs in sources:
+            if self.cursor:
+                qs = qs.filter(self._position_filter(self.cursor["value"], self.cursor["id"], reverse))
+            if reverse:
+                qs = qs.order_by(self.ordering_field, "id")
+            else:
+                qs = qs.order_by(f"-{self.ordering_field}", "-id")
+            rows.extend(qs[: self.size + 1])
+
+        if len(sources) > 1:
+            rows.sort(key=lambda r: (getattr(r, self.ordering_field), r.pk), reverse=not reverse)
+        has_more = len(rows) > self.size
+        rows = rows[: self.size]
+
+        if reverse:
+            rows.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        self.page = rows
+        return rows
+
+    def _position_filter(self, value, pk, reverse):
+        # La borne large seule en tête du filtre : sans elle, le `OR` empêche le moteur de se placer
+        # dans l'index (owner, ordering_field) et il parcourt toutes les lignes plus récentes.
+        field = self.ordering_field
+        if reverse:
+            return Q(**{f"{field}__gte": value}) & (Q(**{f"{field}__gt": value}) | Q(id__gt=pk))
+        return Q(**{f"{field}__lte": value}) & (Q(**{f"{field}__lt": value}) | Q(id__lt=pk))
+
+    def get_page_size(self, request):
+        raw = request.query_params.get(self.page_size_query_param)
+        if raw:
+            try:
+                size = int(raw)
+            except ValueError:
+                size = 0
+            if size > 0:
+                return min(size, self.max_page_size)
+        return self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            querystring = b64decode(encoded.encode("ascii")).decode("ascii")
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            value = parse_datetime(tokens["p"][0])
+            pk = int(tokens["i"][0])
+            reverse = tokens.get("r", ["0"])[0] == "1"
+        except (TypeError, ValueError, KeyError, IndexError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return {"value": value, "id": pk, "reverse": reverse}
+
+    def encode_cursor(self, row, reverse):
+        tokens = {"p": getattr(row, self.ordering_field).isoformat(), "i": str(row.pk)}
+        if reverse:
+            tokens["r"] = "1"
+        encoded = b64encode(parse.urlencode(tokens, doseq=True).encode("ascii")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Curseur opaque renvoyé dans `next` / `previous`.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": f"Nombre d'éléments par page (max {self.max_page_size}).",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+
+class LedgerCursorPagination(KeysetCursorPagination):
+    ordering_field = "created_at"
+
+
+class ExpenseCursorPagination(KeysetCursorPagination):
+    ordering_field = "occurred_at"
@@ -0,0 +1,155 @@
+"""
+Réconciliation des soldes avec le ledger.
+
+Le contrôle se fait par paquets d'identifiants (ordre croissant) : une requête groupée pour les sommes
+CREDIT − DEBIT du paquet (plus une sur les résumés mensuels laissés par l'archivage), une pour les
+soldes enregistrés. Ces lectures ne posent aucun verrou ; seuls
+les écarts détectés sont re-vérifiés (et éventuellement corrigés) dans une courte transaction qui
+verrouille la ligne concernée, ce qui écarte les faux positifs dus à une écriture concurrente.
+
+Les fonctions `check_*_chunk` ne prennent que des types simples : elles peuvent tourner dans un
+ProcessPoolExecutor.
+"""
+from decimal import Decimal
+
+import django
+from django.db import connections, transaction
+from django.db.models import Q, Sum
+
+from core.money import quantize
+from parent_account.models import ParentAccount, ParentAccountLedgerMonth, ParentAccountTransaction
+from .cache import bump_wallet_version
+from .models import Wallet, WalletBucket, WalletLedgerMonth, WalletTransaction
+
+ZERO = Decimal("0.00")
+
+
+def id_chunks(model, chunk_size):
+    """Identifiants de `model` par paquets ordonnés (pagination keyset, pas d'OFFSET)."""
+    last_id = 0
+    while True:
+        ids = list(model.objects.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:chunk_size])
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def _grouped_sums(qs, keys, amount_field) -> dict:
+    rows = (
+        qs.values(*keys)
+        .annotate(
+            credits=Sum(amount_field, filter=Q(direction=WalletTransaction.Direction.CREDIT)),
+            debits=Sum(amount_field, filter=Q(direction=WalletTransaction.Direction.DEBIT)),
+        )
+        .order_by()
+    )
+    return {tuple(r[k] for k in keys): quantize(r["credits"]) - quantize(r["debits"]) for r in rows}
+
+
+def _merge(*sums) -> dict:
+    merged = {}
+    for part in sums:
+        for key, value in part.items():
+            merged[key] = merged.get(key, ZERO) + value
+    return merged
+
+
+def wallet_ledger_sums(wallet_ids) -> dict:
+    """CREDIT − DEBIT par (wallet, enveloppe) : ledger vivant + résumés mensuels des lignes archivées."""
+    keys = ["wallet_id", "bucket_type"]
+    return _merge(
+        _grouped_sums(WalletTransaction.objects.filter(wallet_id__in=wallet_ids), keys, "amount"),
+        _grouped_sums(WalletLedgerMonth.objects.filter(wallet_id__in=wallet_ids), keys, "total"),
+    )
+
+
+def account_ledger_sums(account_ids) -> dict:
+    keys = ["account_id"]
+    sums = _merge(
+        _grouped_sums(ParentAccountTransaction.objects.filter(account_id__in=account_ids), keys, "net_amount"),
+        _grouped_sums(ParentAccountLedgerMonth.objects.filter(account_id__in=account_ids), keys, "net_total"),
+    )
+    return {key[0]: value for key, value in sums.items()}
+
+
+@transaction.atomic
+def _confirm_bucket(wallet_id, bucket_type, fix):
+    bucket = WalletBucket.objects.select_for_update().filter(wallet_id=wallet_id, bucket_type=bucket_type).first()
+    recorded = quantize(bucket.balance) if bucket else ZERO
+    ledger = wallet_ledger_sums([wallet_id]).get((wallet_id, bucket_type), ZERO)
+    if recorded == ledger:
+        return None
+    fixed = False
+    if fix and ledger >= 0:
+        WalletBucket.objects.update_or_create(wallet_id=wallet_id, bucket_type=bucket_type, defaults={"balance": ledger})
+        bump_wallet_version(wallet_id)
+        fixed = True
+    return {
+        "scope": "WALLET_BUCKET",
+        "wallet_id": wallet_id,
+        "bucket_type": bucket_type,
+        "recorded_balance": recorded,
+        "ledger_balance": ledger,
+        "fixed": fixed,
+    }
+
+
+@transaction.atomic
+def _confirm_account(account_id, fix):
+    recorded = quantize(ParentAccount.objects.select_for_update().values_list("balance", flat=True).get(id=account_id))
+    ledger = account_ledger_sums([account_id]).get(account_id, ZERO)
+    if recorded == ledger:
+        return None
+    fixed = False
+    if fix and ledger >= 0:
+        ParentAccount.objects.filter(id=account_id).update(balance=ledger)
+        fixed = True
+    return {
+        "scope": "PARENT_ACCOUNT",
+        "account_id": account_id,
+        "recorded_balance": recorded,
+        "ledger_balance": ledger,
+        "fixed": fixed,
+    }
+
+
+def check_wallet_chunk(wallet_ids, fix=False) -> list:
+    ledger = wallet_ledger_sums(wallet_ids)
+    recorded = {
+        (wallet_id, bucket_type): quantize(balance)
+        for wallet_id, bucket_type, balance in WalletBucket.objects.filter(wallet_id__in=wallet_ids).values_list(
+            "wallet_id", "bucket_type", "balance"
+        )
+    }
+    drifts = []
+    for key in sorted(set(ledger) | set(recorded)):
+        if ledger.get(key, ZERO) != recorded.get(key, ZERO):
+            drift = _confirm_bucket(key[0], key[1], fix)
+            if drift:
+                drifts.append(drift)
+    return drifts
+
+
+def check_account_chunk(account_ids, fix=False) -> list:
+    ledger = account_ledger_sums(account_ids)
+    recorded = dict(ParentAccount.objects.filter(id__in=account_ids).values_list("id", "balance"))
+    drifts = []
+    for account_id in sorted(recorded):
+        if ledger.get(account_id, ZERO) != quantize(recorded[account_id]):
+            drift = _confirm_account(account_id, fix)
+            if drift:
+                drifts.append(drift)
+    return drifts
+
+
+def init_worker():
+    """Initialiseur des processus du pool : Django prêt, aucune connexion héritée du parent."""
+    django.setup()
+    connections.close_all()
+
+
+CHECKS = {
+    "wallets": (Wallet, check_wallet_chunk),
+    "accounts": (ParentAccount, check_account_chunk),
+}
@@ -1,15 +1,14 @@
 from decimal import Decimal
-from uuid import uuid4
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import transaction
 from rest_framework import serializers
 from accounts.permissions import IsParent, IsStudent
 from relationships.models import ParentStudentLink
 from .models import Wallet, WalletBucket, WalletTransaction
-from .services import get_or_create_wallet_for_student, credit, debit, spent_today
-from budgeting.allocation import compute_allocation
-from budgeting.models import BudgetPlan
-from parent_account.services import transfer_out
+from .cache import bump_wallet_version
+from .deposits import deposit
+from .services import get_wallet_for_student, spend, spent_today
+from .writer import run_ledger_write
 
 User = get_user_model()
 
@@ -39,18 +38,33 @@ class WalletTransactionSerializer(serializers.ModelSerializer):
             "direction",
             "txn_type",
             "amount",
+            "balance_after",
             "description",
             "external_ref",
+            "group_ref",
             "metadata",
             "created_at",
         ]
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Les paramètres d'allocation vivent dans AllocationRun / AllocationLine : on les remet dans
+        # `metadata` pour garder la forme historique de la réponse.
+        if instance.allocation_id:
+            data["metadata"] = {**instance.allocation.as_metadata(instance.bucket_type), **(instance.metadata or {})}
+        return data
+
 
 class WalletSettingsUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Wallet
         fields = ["currency", "daily_limit"]
 
+    def update(self, instance, validated_data):
+        instance = super().update(instance, validated_data)
+        bump_wallet_version(instance.id)
+        return instance
+
 
 class DepositSerializer(serializers.Serializer):
     student_id = serializers.IntegerField()
@@ -83,112 +97,43 @@ class DepositSerializer(serializers.Serializer):
 
         return attrs
 
-    @transaction.atomic
     def create(self, validated_data):
-        parent = self.context["request"].user
-        student = User.objects.get(id=validated_data["student_id"])
-        wallet = get_or_create_wallet_for_student(student)
+        return run_ledger_write(
+            deposit,
+            parent=self.context["request"].user,
+            student_id=validated_data["student_id"],
+            amount=validated_data["amount"],
+            external_ref=validated_data.get("external_ref"),
+            description=validated_data.get("description", ""),
+        )
 
-        amount = validated_data["amount"]
-        ext = (validated_data.get("external_ref") or "").strip() or None
-        desc = validated_data.get("description", "")
 
-        group_ref = ext or f"AUTO-{uuid4().hex[:10].upper()}"
+class BulkDepositItemSerializer(serializers.Serializer):
+    student_id = serializers.IntegerField()
+    amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+    external_ref = serializers.CharField(max_length=80, required=False, allow_blank=True)
 
-        plan = (
-            BudgetPlan.objects.prefetch_related("bills")
-            .filter(student=student, status=BudgetPlan.Status.ACTIVE)
-            .order_by("-created_at")
-            .first()
-        )
+    def validate_amount(self, v):
+        if v <= 0:
+            raise serializers.ValidationError("Amount must be > 0.")
+        return v
 
-        txns = []
 
-        parent_account, transfer_txn = transfer_out(
-            parent=parent,
-            amount=amount,
-            external_ref=f"{group_ref}-TRANSFER"[:80],
-            description=desc,
-            metadata={"student_id": student.id},
-        )
+class BulkDepositSerializer(serializers.Serializer):
+    items = BulkDepositItemSerializer(many=True, allow_empty=False)
+    description = serializers.CharField(max_length=255, required=False, allow_blank=True)
+
+    def validate_items(self, items):
+        max_items = getattr(settings, "BULK_DEPOSIT_MAX_ITEMS", 200)
+        if len(items) > max_items:
+            raise serializers.ValidationError(f"At most {max_items} items per request.")
+        return items
 
-        if not plan:
-            meta = {"allocation": "AUTO_FALLBACK", "group_ref": group_ref}
-            txns.append(
-                credit(
-                    wallet,
-                    parent,
-                    WalletBucket.Type.DAILY,
-                    amount,
-                    WalletTransaction.TxnType.DEPOSIT,
-                    desc,
-                    external_ref=(f"{group_ref}-DAILY"[:80]),
-                    metadata=meta,
-                )
-            )
-            return wallet, txns
-
-        alloc = compute_allocation(plan, Decimal(amount))
-
-        wallet.currency = alloc["currency"] or wallet.currency
-        wallet.daily_limit = Decimal(alloc["daily_limit"])
-        wallet.save(update_fields=["currency", "daily_limit"])
-
-        meta_base = {
-            "allocation": "AUTO_PLAN",
-            "group_ref": group_ref,
-            "plan_id": alloc["plan_id"],
-            "deposit_amount": alloc["deposit_amount"],
-            "savings_target": alloc["savings_target"],
-        }
-
-        bills_amount = Decimal(alloc["bills_allocated"])
-        savings_amount = Decimal(alloc["savings_allocated"])
-        daily_amount = Decimal(alloc["daily_allocated"])
-
-        if bills_amount > 0:
-            txns.append(
-                credit(
-                    wallet,
-                    parent,
-                    WalletBucket.Type.BILLS,
-                    bills_amount,
-                    WalletTransaction.TxnType.DEPOSIT,
-                    desc,
-                    external_ref=(f"{group_ref}-BILLS"[:80]),
-                    metadata={**meta_base, "bills_breakdown": alloc["bills_breakdown"]},
-                )
-            )
-
-        if savings_amount > 0:
-            txns.append(
-                credit(
-                    wallet,
-                    parent,
-                    WalletBucket.Type.SAVINGS,
-                    savings_amount,
-                    WalletTransaction.TxnType.DEPOSIT,
-                    desc,
-                    external_ref=(f"{group_ref}-SAVINGS"[:80]),
-                    metadata=meta_base,
-                )
-            )
-
-        if daily_amount > 0:
-            txns.append(
-                credit(
-                    wallet,
-                    parent,
-                    WalletBucket.Type.DAILY,
-                    daily_amount,
-                    WalletTransaction.TxnType.DEPOSIT,
-                    desc,
-                    external_ref=(f"{group_ref}-DAILY"[:80]),
-                    metadata=meta_base,
-                )
-            )
-
-        return wallet, txns
+    def validate(self, attrs):
+        parent = self.context["request"].user
+        if not (parent.is_superuser or getattr(parent, "role", None) in {"ADMIN", "PARENT"}):
+            raise serializers.ValidationError("Only parents/admin can deposit.")
+        return attrs
 
 
 class ExpenseSerializer(serializers.Serializer):
@@ -203,7 +148,7 @@ class ExpenseSerializer(serializers.Serializer):
 
     def validate(self, attrs):
         student = self.context["request"].user
-        wallet = get_or_create_wallet_for_student(student)
+        wallet = get_wallet_for_student(student)
         attrs["_wallet"] = wallet
 
         bucket_type = attrs["bucket_type"]
@@ -215,12 +160,11 @@ class ExpenseSerializer(serializers.Serializer):
                     raise serializers.ValidationError({"amount": "Daily limit exceeded."})
         return attrs
 
-    @transaction.atomic
     def create(self, validated_data):
         student = self.context["request"].user
         wallet = validated_data["_wallet"]
         amount = validated_data["amount"]
         bucket_type = validated_data["bucket_type"]
         desc = validated_data.get("description", "")
-        txn = debit(wallet, student, bucket_type, amount, WalletTransaction.TxnType.EXPENSE, desc)
+        txn = run_ledger_write(spend, wallet, student, bucket_type, amount, desc)
         return wallet, txn
@@ -1,77 +1,397 @@
 from decimal import Decimal
 from django.contrib.auth import get_user_model
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, DateField, F, IntegerField, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth
 from django.utils import timezone
-from .models import Wallet, WalletBucket, WalletTransaction
+from core.db import update_returning
+from core.money import MoneyField, money_expr, money_value, quantize
+from parent_account.models import ParentAccount
+from .cache import bump_wallet_version
+from .models import (
+    Wallet,
+    WalletBucket,
+    WalletDailySpend,
+    WalletMonthlyRollup,
+    WalletTransaction,
+    WalletTransactionArchive,
+)
 
 User = get_user_model()
 
 
-def get_or_create_wallet_for_student(student: User) -> Wallet:
+def provision_wallets(student_ids) -> dict:
+    """
+    Crée les wallets manquants et leurs trois enveloppes, en requêtes groupées (idempotent).
+    Retourne {student_id: Wallet}.
+    """
+    student_ids = set(student_ids)
+    if not student_ids:
+        return {}
+    Wallet.objects.bulk_create([Wallet(student_id=i) for i in student_ids], ignore_conflicts=True)
+    wallets = {w.student_id: w for w in Wallet.objects.filter(student_id__in=student_ids)}
+    existing = set(
+        WalletBucket.objects.filter(wallet__in=wallets.values()).values_list("wallet_id", "bucket_type")
+    )
+    WalletBucket.objects.bulk_create(
+        [
+            WalletBucket(wallet=w, bucket_type=t)
+            for w in wallets.values()
+            for t in WalletBucket.Type.values
+            if (w.id, t) not in existing
+        ],
+        ignore_conflicts=True,
+    )
+    return wallets
+
+
+def provision_wallet(student: User) -> Wallet:
+    """Appelé à l'inscription : wallet + enveloppes (un seul INSERT groupé pour les enveloppes)."""
     wallet, created = Wallet.objects.get_or_create(student=student)
     if created:
-        WalletBucket.objects.get_or_create(wallet=wallet, bucket_type=WalletBucket.Type.BILLS)
-        WalletBucket.objects.get_or_create(wallet=wallet, bucket_type=WalletBucket.Type.SAVINGS)
-        WalletBucket.objects.get_or_create(wallet=wallet, bucket_type=WalletBucket.Type.DAILY)
+        WalletBucket.objects.bulk_create(
+            [WalletBucket(wallet=wallet, bucket_type=t) for t in WalletBucket.Type.values], ignore_conflicts=True
+        )
     return wallet
 
 
-def get_bucket_locked(wallet: Wallet, bucket_type: str) -> WalletBucket:
-    bucket, _ = WalletBucket.objects.select_for_update().get_or_create(wallet=wallet, bucket_type=bucket_type)
-    return bucket
+def get_wallet_for_student(student: User) -> Wallet:
+    """
+    Lecture simple via `student.wallet` : Django garde le résultat sur l'instance, donc une seule
+    requête par requête HTTP pour `request.user`. Le provisionnement ne sert ici que de filet pour
+    un compte créé avant le provisionnement à l'inscription (cf. `manage.py provision_accounts`).
+    """
+    try:
+        return student.wallet
+    except Wallet.DoesNotExist:
+        wallet = provision_wallet(student)
+        student.wallet = wallet
+        return wallet
+
+
+def lock_for_movement(account_id=None, wallet_ids=None, student_ids=None, bucket_types=None):
+    """
+    Verrouille d'emblée toutes les lignes d'un mouvement d'argent, dans un ordre global unique :
+    le compte parent d'abord, puis les enveloppes par id croissant. Deux mouvements concurrents
+    prennent donc leurs verrous dans le même ordre et ne peuvent pas s'interbloquer.
+
+    À appeler dans une transaction. Retourne (compte parent | None, enveloppes triées par id),
+    chaque enveloppe avec son wallet joint (seule l'enveloppe est verrouillée).
+    """
+    account = None
+    if account_id is not None:
+        account = ParentAccount.objects.select_for_update().get(pk=account_id)
+
+    buckets = []
+    if wallet_ids or student_ids:
+        qs = WalletBucket.objects.select_for_update(of=("self",)).select_related("wallet").order_by("id")
+        if wallet_ids:
+            qs = qs.filter(wallet_id__in=wallet_ids)
+        else:
+            qs = qs.filter(wallet__student_id__in=student_ids)
+        if bucket_types:
+            qs = qs.filter(bucket_type__in=bucket_types)
+        buckets = list(qs)
+    return account, buckets
+
+
+@transaction.atomic
+def spend(wallet: Wallet, actor, bucket_type: str, amount: Decimal, description: str = "") -> WalletTransaction:
+    """Dépense directe sur une enveloppe : verrou de l'enveloppe, puis débit."""
+    lock_for_movement(wallet_ids=[wallet.id], bucket_types=[bucket_type])
+    return debit(wallet, actor, bucket_type, amount, WalletTransaction.TxnType.EXPENSE, description)
+
+
+def _shift_balance(delta: Decimal):
+    # Soldes en centimes (MoneyField) : addition entière, exacte, sans arrondi.
+    return money_expr(F("balance") + money_value(delta))
+
+
+def _shift_bucket(wallet: Wallet, bucket_type: str, delta: Decimal, **conditions):
+    """UPDATE de l'enveloppe, nouveau solde rendu par la même instruction (None si aucune ligne)."""
+    rows = update_returning(
+        WalletBucket.objects.filter(wallet=wallet, bucket_type=bucket_type, **conditions),
+        balance=_shift_balance(delta),
+        updated_at=timezone.now(),
+    )
+    return rows[0].balance if rows else None
 
 
 def credit(wallet: Wallet, actor, bucket_type: str, amount: Decimal, txn_type: str, description: str = "", external_ref: str = None, metadata=None):
     if metadata is None:
         metadata = {}
-    bucket = get_bucket_locked(wallet, bucket_type)
-    bucket.balance = (bucket.balance or Decimal("0")) + amount
-    bucket.save(update_fields=["balance", "updated_at"])
-    return WalletTransaction.objects.create(
+    balance = _shift_bucket(wallet, bucket_type, amount)
+    if balance is None:
+        bucket, created = WalletBucket.objects.get_or_create(
+            wallet=wallet, bucket_type=bucket_type, defaults={"balance": amount}
+        )
+        balance = bucket.balance if created else _shift_bucket(wallet, bucket_type, amount)
+    bump_wallet_version(wallet.id)
+    txn = WalletTransaction.objects.create(
         wallet=wallet,
         actor=actor,
         bucket_type=bucket_type,
         direction=WalletTransaction.Direction.CREDIT,
         txn_type=txn_type,
         amount=amount,
+        balance_after=balance,
         description=description,
         external_ref=external_ref,
         metadata=metadata,
     )
+    record_rollups([txn])
+    return txn
 
 
-def debit(wallet: Wallet, actor, bucket_type: str, amount: Decimal, txn_type: str, description: str = "", metadata=None):
+def debit(
+    wallet: Wallet, actor, bucket_type: str, amount: Decimal, txn_type: str, description: str = "", metadata=None,
+    spend_day=None,
+):
+    """`spend_day` : jour compté dans les dépenses journalières (dépense datée), aujourd'hui par défaut."""
     if metadata is None:
         metadata = {}
-    bucket = get_bucket_locked(wallet, bucket_type)
-    if (bucket.balance or Decimal("0")) < amount:
+    # UPDATE conditionnel : le contrôle de solde et l'écriture forment une seule instruction,
+    # il n'y a donc pas de fenêtre pour une mise à jour perdue (même sans select_for_update sur SQLite).
+    balance = _shift_bucket(wallet, bucket_type, -amount, balance__gte=amount)
+    if balance is None:
         raise ValueError("Insufficient funds.")
-    bucket.balance = (bucket.balance or Decimal("0")) - amount
-    bucket.save(update_fields=["balance", "updated_at"])
-    return WalletTransaction.objects.create(
+    bump_wallet_version(wallet.id)
+    if txn_type == WalletTransaction.TxnType.EXPENSE:
+        record_daily_spend(wallet, bucket_type, amount, day=spend_day)
+    txn = WalletTransaction.objects.create(
         wallet=wallet,
         actor=actor,
         bucket_type=bucket_type,
         direction=WalletTransaction.Direction.DEBIT,
         txn_type=txn_type,
         amount=amount,
+        balance_after=balance,
         description=description,
         metadata=metadata,
     )
+    record_rollups([txn])
+    return txn
 
 
-def spent_today(wallet: Wallet, bucket_type: str) -> Decimal:
-    from django.db.models import Sum
-    today = timezone.localdate()
+def balances_at(wallet: Wallet, at) -> dict:
+    """
+    Solde de chaque enveloppe à l'instant `at` : `balance_after` de la dernière transaction <= at.
+    Une seule requête (une sous-requête indexée par enveloppe sur (wallet, bucket_type, created_at)) ;
+    l'archive n'est consultée que si aucune ligne vivante ne précède `at`.
+    """
+
+    def latest(model, bucket_type):
+        return Subquery(
+            model.objects.filter(wallet=wallet, bucket_type=bucket_type, created_at__lte=at)
+            .order_by("-created_at", "-id")
+            .values("balance_after")[:1]
+        )
+
+    lookups = {
+        bucket_type: Coalesce(latest(WalletTransaction, bucket_type), latest(WalletTransactionArchive, bucket_type))
+        for bucket_type in WalletBucket.Type.values
+    }
+    row = Wallet.objects.filter(pk=wallet.pk).values(**lookups).get()
+    return {
+        bucket_type: quantize(row[bucket_type]) for bucket_type in WalletBucket.Type.values
+    }
+
+
+def record_daily_spend(wallet: Wallet, bucket_type: str, amount: Decimal, day=None):
+    """
+    Ajoute `amount` au compteur du jour (wallet, enveloppe) : UPDATE, ou INSERT à la première dépense
+    du jour. Dans `debit`, l'UPDATE de l'enveloppe qui précède tient déjà la ligne en écriture ; si une
+    autre écriture crée le compteur entre-temps (appelant sans ce verrou), l'INSERT échoue sur la
+    contrainte unique et le montant est ajouté au compteur qu'elle a créé.
+    """
+    day = day or timezone.localdate()
+    counter = WalletDailySpend.objects.filter(wallet=wallet, bucket_type=bucket_type, day=day)
+    if counter.update(amount=money_expr(F("amount") + money_value(amount)), updated_at=timezone.now()):
+        return
+    try:
+        with transaction.atomic():
+            WalletDailySpend.objects.create(wallet=wallet, bucket_type=bucket_type, day=day, amount=amount)
+    except IntegrityError:
+        counter.update(amount=money_expr(F("amount") + money_value(amount)), updated_at=timezone.now())
+
+
+def record_daily_spends(wallet: Wallet, amounts: dict):
+    """
+    Version groupée de `record_daily_spend` : {(enveloppe, jour): montant}, en 3 requêtes au plus
+    (SELECT des compteurs existants, UPDATE groupé en CASE, INSERT groupé des manquants). Si un
+    compteur manquant a été créé entre-temps, les manquants repassent un par un par `record_daily_spend`.
+    """
+    if not amounts:
+        return
+    existing = {
+        (bucket_type, day): counter_id
+        for counter_id, bucket_type, day in WalletDailySpend.objects.filter(
+            wallet=wallet,
+            bucket_type__in={bucket_type for bucket_type, _ in amounts},
+            day__in={day for _, day in amounts},
+        ).values_list("id", "bucket_type", "day")
+    }
+    updates = {existing[key]: amount for key, amount in amounts.items() if key in existing}
+    if updates:
+        WalletDailySpend.objects.filter(id__in=updates).update(
+            amount=money_expr(
+                F("amount")
+                + Case(
+                    *[When(id=counter_id, then=money_value(amount)) for counter_id, amount in updates.items()],
+                    output_field=MoneyField(),
+                )
+            ),
+            updated_at=timezone.now(),
+        )
+    missing = [
+        WalletDailySpend(wallet=wallet, bucket_type=bucket_type, day=day, amount=amount)
+        for (bucket_type, day), amount in amounts.items()
+        if (bucket_type, day) not in existing
+    ]
+    if missing:
+        try:
+            with transaction.atomic():
+                WalletDailySpend.objects.bulk_create(missing)
+        except IntegrityError:
+            for counter in missing:
+                record_daily_spend(wallet, counter.bucket_type, counter.amount, day=counter.day)
+
+
+def month_of(dt):
+    """Premier jour du mois (fuseau courant) de l'instant `dt`."""
+    return timezone.localtime(dt).date().replace(day=1)
+
+
+def record_rollups(txns):
+    """
+    Ajoute des transactions qui viennent d'être écrites aux totaux mensuels (WalletMonthlyRollup),
+    en 3 requêtes au plus quel que soit leur nombre : SELECT des lignes existantes, UPDATE groupé
+    (incréments en CASE), INSERT groupé des lignes manquantes.
+
+    Une seule transaction (credit / debit) : un UPDATE de sa ligne, INSERT seulement au premier
+    mouvement du mois pour cette clé.
+
+    À appeler dans la transaction de l'écriture, enveloppe(s) verrouillée(s) : ce verrou sérialise
+    la création des lignes d'un même (wallet, enveloppe).
+    """
+    deltas = {}
+    for txn in txns:
+        key = (txn.wallet_id, month_of(txn.created_at), txn.bucket_type, txn.txn_type, txn.direction, txn.actor_id)
+        total, count = deltas.get(key, (Decimal("0"), 0))
+        deltas[key] = (total + txn.amount, count + 1)
+    if not deltas:
+        return
+
+    if len(deltas) == 1:
+        [(key, (total, count))] = deltas.items()
+        fields = dict(zip(["wallet_id", "month", "bucket_type", "txn_type", "direction", "actor_id"], key))
+        updated = WalletMonthlyRollup.objects.filter(**fields).update(
+            total=money_expr(F("total") + money_value(total)), count=F("count") + count
+        )
+        if not updated:
+            WalletMonthlyRollup.objects.create(**fields, total=total, count=count)
+        return
+
+    existing = {
+        (r.wallet_id, r.month, r.bucket_type, r.txn_type, r.direction, r.actor_id): r.id
+        for r in WalletMonthlyRollup.objects.filter(
+            wallet_id__in={k[0] for k in deltas}, month__in={k[1] for k in deltas}
+        )
+    }
+    updates = {existing[key]: delta for key, delta in deltas.items() if key in existing}
+    if updates:
+        WalletMonthlyRollup.objects.filter(id__in=updates).update(
+            total=money_expr(
+                F("total")
+                + Case(
+                    *[When(id=rollup_id, then=money_value(total)) for rollup_id, (total, _) in updates.items()],
+                    output_field=MoneyField(),
+                )
+            ),
+            count=F("count")
+            + Case(
+                *[When(id=rollup_id, then=Value(count)) for rollup_id, (_, count) in updates.items()],
+                output_field=IntegerField(),
+            ),
+        )
+    missing = [
+        WalletMonthlyRollup(
+            wallet_id=wallet_id, month=month, bucket_type=bucket_type, txn_type=txn_type,
+            direction=direction, actor_id=actor_id, total=total, count=count,
+        )
+        for (wallet_id, month, bucket_type, txn_type, direction, actor_id), (total, count) in deltas.items()
+        if (wallet_id, month, bucket_type, txn_type, direction, actor_id) not in existing
+    ]
+    if missing:
+        WalletMonthlyRollup.objects.bulk_create(missing)
+
+
+@transaction.atomic
+def rebuild_monthly_rollups(wallet_ids) -> int:
+    """Recalcule les totaux mensuels des wallets donnés à partir du ledger (lignes vivantes et archivées)."""
+    WalletMonthlyRollup.objects.filter(wallet_id__in=wallet_ids).delete()
+    keys = ["wallet_id", "month", "bucket_type", "txn_type", "direction", "actor_id"]
+    totals = {}
+    for model in (WalletTransactionArchive, WalletTransaction):
+        rows = (
+            model.objects.filter(wallet_id__in=wallet_ids)
+            .annotate(month=TruncMonth("created_at", output_field=DateField()))
+            .values(*keys)
+            .annotate(total=Sum("amount"), count=Count("id"))
+            .order_by()
+        )
+        for r in rows:
+            key = tuple(r[k] for k in keys)
+            total, count = totals.get(key, (Decimal("0"), 0))
+            totals[key] = (total + r["total"], count + r["count"])
+    rollups = [
+        WalletMonthlyRollup(**dict(zip(keys, key)), total=total, count=count) for key, (total, count) in totals.items()
+    ]
+    WalletMonthlyRollup.objects.bulk_create(rollups, batch_size=500)
+    return len(rollups)
+
+
+def spent_on(wallet: Wallet, bucket_type: str, day) -> Decimal:
     total = (
+        WalletDailySpend.objects.filter(wallet=wallet, bucket_type=bucket_type, day=day)
+        .values_list("amount", flat=True)
+        .first()
+    )
+    return total or Decimal("0")
+
+
+def spent_today(wallet: Wallet, bucket_type: str) -> Decimal:
+    return spent_on(wallet, bucket_type, timezone.localdate())
+
+
+def spent_by_day(wallet: Wallet, bucket_type: str, days) -> dict:
+    """Dépenses journalières de plusieurs jours en une requête : {jour: montant} (jours sans dépense absents)."""
+    return dict(
+        WalletDailySpend.objects.filter(wallet=wallet, bucket_type=bucket_type, day__in=days).values_list("day", "amount")
+    )
+
+
+@transaction.atomic
+def rebuild_daily_spend(wallet_ids) -> int:
+    """
+    Recalcule les compteurs journaliers des wallets donnés à partir du ledger (dépenses uniquement).
+    Une dépense saisie (Expense) compte pour le jour où elle a eu lieu, les autres pour le jour d'écriture.
+    """
+    WalletDailySpend.objects.filter(wallet_id__in=wallet_ids).delete()
+    rows = (
         WalletTransaction.objects.filter(
-            wallet=wallet,
-            bucket_type=bucket_type,
+            wallet_id__in=wallet_ids,
             direction=WalletTransaction.Direction.DEBIT,
             txn_type=WalletTransaction.TxnType.EXPENSE,
-            created_at__date=today,
         )
-        .aggregate(s=Sum("amount"))
-        .get("s")
+        .annotate(day=Coalesce(TruncDate("expense__occurred_at"), TruncDate("created_at")))
+        .values("wallet_id", "bucket_type", "day")
+        .annotate(total=Sum("amount"))
+        .order_by()
     )
-    return total or Decimal("0")
+    counters = [
+        WalletDailySpend(wallet_id=r["wallet_id"], bucket_type=r["bucket_type"], day=r["day"], amount=r["total"])
+        for r in rows
+    ]
+    WalletDailySpend.objects.bulk_create(counters, batch_size=500)
+    return len(counters)
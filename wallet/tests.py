@@ -1,3 +1,650 @@
-from django.test import TestCase
+import csv
+import importlib
+import json
+import threading
+import tracemalloc
+from io import StringIO
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F, Q, Sum
+from django.db.models.query import QuerySet
+from django.http import StreamingHttpResponse
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from budgeting.models import BillItem, BudgetPlan
+from core.money import money_expr, money_value
+from relationships.models import ParentStudentLink
+from . import cache as wallet_cache
+from .cache import cache_stats, reset_cache_stats
+from .models import CacheCounter, Wallet, WalletBucket, WalletDailySpend, WalletTransaction
+from .management.commands.check_query_plans import explain, plan_problem
+from expenses.cache import reset_category_cache
+from expenses.services import create_expense, get_category_for_student
+from parent_account.models import ParentAccount
+from .deposits import deposit
+from .archive import archive_account_batch, archive_wallet_batch
+from .reconciliation import check_account_chunk, check_wallet_chunk
+from .services import credit, debit, provision_wallets, record_daily_spend, spent_today
+
+User = get_user_model()
+
+TEST_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "tests"}}
+
+
+class LedgerFixtures:
+    """Parent et étudiant liés, clients API authentifiés, raccourcis pour alimenter le ledger."""
+
+    def setUp(self):
+        super().setUp()
+        # Cache en mémoire propre aux tests : le cache fichier partagé (.cache) n'est ni lu ni vidé, et
+        # comme les ids repartent de 1, rien ne doit survivre d'un test à l'autre.
+        self.enterContext(override_settings(CACHES=TEST_CACHES))
+        cache.clear()
+        reset_category_cache()
+        self.parent = User.objects.create_user("parent", password="x" * 10, role=User.Role.PARENT)
+        self.student = User.objects.create_user("student", password="x" * 10, role=User.Role.STUDENT)
+        ParentStudentLink.objects.create(parent=self.parent, student=self.student)
+        self.parent_client = APIClient()
+        self.parent_client.force_authenticate(self.parent)
+        self.student_client = APIClient()
+        self.student_client.force_authenticate(self.student)
+
+    @contextmanager
+    def assertStatements(self, expected):
+        """`assertNumQueries` sans les SAVEPOINT / RELEASE des `atomic` imbriqués dans la transaction du test."""
+        with CaptureQueriesContext(connection) as ctx:
+            yield
+        statements = [q["sql"] for q in ctx.captured_queries if not q["sql"].startswith(("SAVEPOINT", "RELEASE"))]
+        self.assertEqual(len(statements), expected, "\n".join(statements))
+
+    def topup(self, amount="100000.00"):
+        response = self.parent_client.post(
+            "/api/parent-account/topup/", {"amount": amount, "provider": "MTN"}, format="json"
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        return response
+
+    def deposit(self, amount="1000.00", **extra):
+        response = self.parent_client.post(
+            "/api/wallet/deposits/", {"student_id": self.student.id, "amount": amount, **extra}, format="json"
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        return response
+
+    def expense(self, amount="10.00", **extra):
+        return self.student_client.post(
+            "/api/expenses/me/create/", {"amount": amount, "category_slug": "food", **extra}, format="json"
+        )
+
+
+class MoneyExpressionTests(TestCase):
+    def setUp(self):
+        student = User.objects.create_user("student", password="x" * 10, role=User.Role.STUDENT)
+        self.wallet = provision_wallets([student.id])[student.id]
+        credit(self.wallet, None, WalletBucket.Type.DAILY, Decimal("935.50"), WalletTransaction.TxnType.ADJUSTMENT)
+        self.buckets = WalletBucket.objects.filter(wallet=self.wallet, bucket_type=WalletBucket.Type.DAILY)
+
+    def test_annotated_arithmetic_is_in_currency_units(self):
+        plus_one = money_expr(F("balance") + money_value(Decimal("1.00")))
+        value = self.buckets.annotate(x=plus_one).values_list("x", flat=True).get()
+        self.assertEqual(value, Decimal("936.50"))
+
+    def test_aggregated_arithmetic_is_in_currency_units(self):
+        total = self.buckets.aggregate(x=Sum(money_expr(F("balance") - money_value(Decimal("0.50")))))["x"]
+        self.assertEqual(total, Decimal("935.00"))
+        doubled = self.buckets.annotate(x=money_expr(F("balance") * 2)).values_list("x", flat=True).get()
+        self.assertEqual(doubled, Decimal("1871.00"))
+
+
+class DailySpendTests(LedgerFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.topup()
+        self.deposit("1000.00")
+        self.wallet = Wallet.objects.get(student=self.student)
+
+    def test_counter_created_concurrently_is_incremented(self):
+        WalletDailySpend.objects.create(
+            wallet=self.wallet, bucket_type=WalletBucket.Type.DAILY, day=timezone.localdate(), amount=Decimal("5.00")
+        )
+        # Premier UPDATE « avant » la création concurrente : aucune ligne, l'INSERT heurte la contrainte unique.
+        real_update = QuerySet.update
+        calls = iter([lambda *args, **kwargs: 0])
+        with mock.patch.object(
+            QuerySet, "update", autospec=True,
+            side_effect=lambda qs, **kwargs: next(calls, real_update)(qs, **kwargs),
+        ):
+            record_daily_spend(self.wallet, WalletBucket.Type.DAILY, Decimal("2.50"))
+        self.assertEqual(spent_today(self.wallet, WalletBucket.Type.DAILY), Decimal("7.50"))
+
+    def test_migration_backfills_counters(self):
+        Wallet.objects.filter(pk=self.wallet.pk).update(daily_limit=Decimal("50.00"))
+        self.assertEqual(self.expense("30.00").status_code, 201)
+        self.assertEqual(self.expense("5.00", occurred_at=(timezone.now() - timedelta(days=1)).isoformat()).status_code, 201)
+        WalletDailySpend.objects.all().delete()
+
+        migration = importlib.import_module("wallet.migrations.0016_backfill_daily_spend")
+        migration.backfill(apps, None)
+        self.assertEqual(spent_today(self.wallet, WalletBucket.Type.DAILY), Decimal("30.00"))
+        self.assertEqual(WalletDailySpend.objects.count(), 2)
+        self.assertEqual(self.expense("30.00").status_code, 400)
+
+
+@override_settings(WALLET_CACHE_STATS_FLUSH_EVERY=10**9, WALLET_CACHE_STATS_FLUSH_INTERVAL=10**9)
+class WalletCacheTests(LedgerFixtures, TestCase):
+    """Le payload de /api/wallet/me/ vient du cache jusqu'à la prochaine écriture validée."""
+
+    def setUp(self):
+        super().setUp()
+        reset_cache_stats()
+        self.topup()
+
+    def daily_balance(self):
+        response = self.student_client.get("/api/wallet/me/")
+        self.assertEqual(response.status_code, 200)
+        return next(Decimal(b["balance"]) for b in response.data["buckets"] if b["bucket_type"] == "DAILY")
+
+    def test_cached_until_credit(self):
+        self.assertEqual(self.daily_balance(), Decimal("0.00"))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.daily_balance(), Decimal("0.00"))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.deposit("100.00")
+        self.assertEqual(self.daily_balance(), Decimal("100.00"))
+
+    def test_debit_invalidates(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.deposit("100.00")
+        self.assertEqual(self.daily_balance(), Decimal("100.00"))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.expense("30.00").status_code, 201)
+        self.assertEqual(self.daily_balance(), Decimal("70.00"))
+
+    def test_settings_update_invalidates(self):
+        self.assertEqual(self.student_client.get("/api/wallet/me/").data["daily_limit"], "0.00")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.student_client.patch("/api/wallet/me/settings/", {"daily_limit": "50.00"}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.student_client.get("/api/wallet/me/").data["daily_limit"], "50.00")
+
+    def test_uncommitted_write_keeps_cached_payload(self):
+        self.assertEqual(self.daily_balance(), Decimal("0.00"))
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.deposit("100.00")
+        # Version remplacée seulement au COMMIT : avant, l'ancien payload reste servi.
+        self.assertEqual(self.daily_balance(), Decimal("0.00"))
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.daily_balance(), Decimal("100.00"))
+
+    def test_hit_rate(self):
+        for _ in range(3):
+            self.daily_balance()
+        self.assertEqual(cache_stats(), {"hits": 2, "misses": 1, "hit_rate": 0.6667})
+
+    @override_settings(WALLET_CACHE_STATS_FLUSH_EVERY=2)
+    def test_counts_reach_the_database_in_batches(self):
+        for _ in range(5):
+            self.daily_balance()
+        counters = dict(CacheCounter.objects.values_list("name", "value"))
+        self.assertEqual(sum(counters.values()), 4)
+        self.assertEqual(cache_stats()["hits"], 4)
+
+    def test_concurrent_counts_are_not_lost(self):
+        def count():
+            for _ in range(500):
+                wallet_cache._count(wallet_cache.HITS)
+
+        threads = [threading.Thread(target=count) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(cache_stats()["hits"], 4000)
+
+
+class BulkDepositTests(LedgerFixtures, TestCase):
+    URL = "/api/wallet/deposits/bulk/"
+
+    def setUp(self):
+        super().setUp()
+        self.second = User.objects.create_user("second", password="x" * 10, role=User.Role.STUDENT)
+        ParentStudentLink.objects.create(parent=self.parent, student=self.second)
+        self.stranger = User.objects.create_user("stranger", password="x" * 10, role=User.Role.STUDENT)
+        self.topup("1000.00")  # 975.00 net
+
+    def daily(self, student):
+        return WalletBucket.objects.get(wallet__student=student, bucket_type=WalletBucket.Type.DAILY).balance
+
+    def test_items_succeed_or_fail_independently(self):
+        items = [
+            {"student_id": self.student.id, "amount": "100.00", "external_ref": "MAR-1"},
+            {"student_id": self.second.id, "amount": "250.00", "external_ref": "MAR-2"},
+            {"student_id": self.stranger.id, "amount": "10.00"},
+            {"student_id": self.second.id, "amount": "20.00", "external_ref": "MAR-1"},
+            {"student_id": self.student.id, "amount": "700.00"},
+            {"student_id": self.second.id, "amount": "25.00"},
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.parent_client.post(self.URL, {"items": items, "description": "March"}, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual((response.data["succeeded"], response.data["failed"]), (3, 3))
+        self.assertEqual(
+            [(r["status"], r.get("error")) for r in response.data["results"]],
+            [
+                ("OK", None),
+                ("OK", None),
+                ("FAILED", "Parent not linked to this student."),
+                ("FAILED", "Duplicate external_ref in request."),
+                ("FAILED", "INSUFFICIENT_PARENT_BALANCE"),
+                ("OK", None),
+            ],
+        )
+
+        # Un seul transfert pour le lot, du montant total accepté.
+        transfer = response.data["transfer"]
+        self.assertEqual(Decimal(transfer["net_amount"]), Decimal("375.00"))
+        account = ParentAccount.objects.get(parent=self.parent)
+        self.assertEqual(account.balance, Decimal("600.00"))
+        self.assertEqual(self.daily(self.student), Decimal("100.00"))
+        self.assertEqual(self.daily(self.second), Decimal("275.00"))
+        self.assertEqual(check_wallet_chunk([self.student.wallet.id, self.second.wallet.id]), [])
+        self.assertEqual(check_account_chunk([account.id]), [])
+
+        group = self.parent_client.get(f"/api/wallet/deposits/{response.data['results'][1]['group_ref']}/")
+        self.assertEqual(group.status_code, 200)
+        self.assertEqual(group.data["transfer"]["id"], transfer["id"])
+
+        # La payload /me/ de l'étudiant suit le dépôt (version invalidée au COMMIT).
+        buckets = self.student_client.get("/api/wallet/me/").data["buckets"]
+        self.assertEqual(next(b["balance"] for b in buckets if b["bucket_type"] == "DAILY"), "100.00")
+
+    def test_reused_reference_fails_whole_request(self):
+        self.parent_client.post(
+            self.URL, {"items": [{"student_id": self.student.id, "amount": "10.00", "external_ref": "MAR-1"}]}, format="json"
+        )
+        response = self.parent_client.post(
+            self.URL, {"items": [{"student_id": self.second.id, "amount": "10.00", "external_ref": "MAR-1"}]}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["results"][0]["error"], "external_ref already used.")
+        self.assertIsNone(response.data["transfer"])
+        self.assertEqual(ParentAccount.objects.get(parent=self.parent).balance, Decimal("965.00"))
+
+    def test_statements_do_not_grow_with_items(self):
+        students = [self.student, self.second]
+        for student in students:
+            provision_wallets([student.id])
+
+        def run(count):
+            items = [{"student_id": students[i % 2].id, "amount": "1.00"} for i in range(count)]
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.parent_client.post(self.URL, {"items": items}, format="json")
+            self.assertEqual(response.status_code, 201, response.content)
+            return len(ctx.captured_queries)
+
+        run(2)  # totaux du mois créés
+        self.assertEqual(run(2), run(10))
+
+
+class LedgerFilterTests(LedgerFixtures, TestCase):
+    WALLET_URLS = ["/api/wallet/me/transactions/", "/api/wallet/students/{sid}/transactions/"]
+    ACCOUNT_URL = "/api/parent-account/me/transactions/"
+
+    # filtre -> colonne que l'index parcouru doit contraindre (propriétaire seul quand le filtre
+    # s'applique sur l'intervalle (propriétaire, created_at) : montant, plusieurs valeurs)
+    WALLET_FILTERS = {
+        "txn_type=DEPOSIT": "txn_type",
+        "direction=CREDIT": "direction",
+        "bucket_type=DAILY": "bucket_type",
+        "bucket_type=DAILY,BILLS": "wallet_id",
+        "actor={pid}": "actor_id",
+        "min_amount=1&max_amount=500": "wallet_id",
+        "date_from={today}&date_to={today}": "created_at",
+    }
+    ACCOUNT_FILTERS = {
+        "txn_type=TOPUP": "txn_type",
+        "direction=DEBIT": "direction",
+        "min_amount=1": "account_id",
+        "date_from={today}": "created_at",
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.topup()
+        self.deposit()
+        self.expense()
+
+    def client_for(self, url):
+        return self.parent_client if "students" in url or "parent-account" in url else self.student_client
+
+    def plans(self, url, table):
+        """Plans (EXPLAIN QUERY PLAN) des SELECT émis par l'endpoint sur `table`."""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client_for(url).get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        sqls = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("SELECT") and f'"{table}"' in q["sql"]]
+        self.assertTrue(sqls, url)
+        return [explain(sql) for sql in sqls]
+
+    def test_every_filter_uses_an_index(self):
+        params = {"sid": self.student.id, "pid": self.parent.id, "today": timezone.localdate()}
+        cases = [
+            (url, query, column, "wallet_wallettransaction")
+            for url in self.WALLET_URLS
+            for query, column in self.WALLET_FILTERS.items()
+        ] + [
+            (self.ACCOUNT_URL, query, column, "parent_account_parentaccounttransaction")
+            for query, column in self.ACCOUNT_FILTERS.items()
+        ]
+        for url, query, column, table in cases:
+            full_url = f"{url}?{query}".format(**params)
+            for plan in self.plans(full_url, table):
+                self.assertIsNone(plan_problem(plan, column), f"{full_url} : {plan}")
+
+    def test_rejects_non_finite_amounts(self):
+        for raw in ["nan", "inf", "-Infinity", "1e999", "abc"]:
+            response = self.student_client.get(f"/api/wallet/me/transactions/?min_amount={raw}")
+            self.assertEqual(response.status_code, 400, raw)
+            self.assertEqual(response.data, {"min_amount": "Invalid amount."})
+
+
+class DepositQueryBudgetTests(LedgerFixtures, TestCase):
+    """Budget d'instructions de `deposit()` (cf. sa docstring), indépendant du nombre d'enveloppes créditées."""
+
+    def setUp(self):
+        super().setUp()
+        self.topup()
+        # Premier dépôt du mois : crée les totaux mensuels, hors budget mesuré.
+        deposit(self.parent, self.student.id, Decimal("10.00"))
+
+    def fresh_parent(self):
+        # Instance relue : l'id du compte parent n'est pas en cache, comme dans une requête HTTP.
+        return User.objects.get(pk=self.parent.pk)
+
+    def test_without_plan(self):
+        parent = self.fresh_parent()
+        with self.assertStatements(10):
+            deposit(parent, self.student.id, Decimal("100.00"))
+
+    def test_with_plan(self):
+        plan = BudgetPlan.objects.create(
+            student=self.student,
+            status=BudgetPlan.Status.ACTIVE,
+            savings_mode=BudgetPlan.SavingsMode.PERCENT,
+            savings_percent=Decimal("10"),
+        )
+        BillItem.objects.create(plan=plan, title="Rent", amount=Decimal("30.00"))
+        BillItem.objects.create(plan=plan, title="Data", amount=Decimal("5.00"), priority=2)
+        # Crée les totaux du mois des trois enveloppes.
+        deposit(self.parent, self.student.id, Decimal("100.00"))
+
+        parent = self.fresh_parent()
+        with self.assertStatements(14):
+            _, txns = deposit(parent, self.student.id, Decimal("100.00"))
+        self.assertEqual(
+            {t.bucket_type: t.amount for t in txns},
+            {"BILLS": Decimal("35.00"), "SAVINGS": Decimal("10.00"), "DAILY": Decimal("55.00")},
+        )
+
+
+class BalanceWriteTests(LedgerFixtures, TestCase):
+    """credit / debit : le nouveau solde revient de l'UPDATE (RETURNING), sans relecture de l'enveloppe."""
+
+    def setUp(self):
+        super().setUp()
+        self.wallet = provision_wallets([self.student.id])[self.student.id]
+        # Premier mouvement du mois : crée les totaux mensuels et le compteur du jour, hors mesure.
+        credit(self.wallet, None, WalletBucket.Type.DAILY, Decimal("100.00"), WalletTransaction.TxnType.ADJUSTMENT)
+        debit(self.wallet, None, WalletBucket.Type.DAILY, Decimal("1.00"), WalletTransaction.TxnType.EXPENSE)
+
+    def test_credit(self):
+        # UPDATE ... RETURNING de l'enveloppe, INSERT de la transaction, UPDATE du total mensuel.
+        with self.assertStatements(3):
+            txn = credit(self.wallet, None, WalletBucket.Type.DAILY, Decimal("10.50"), WalletTransaction.TxnType.ADJUSTMENT)
+        self.assertEqual(txn.balance_after, Decimal("109.50"))
+
+    def test_debit(self):
+        # + UPDATE du compteur journalier.
+        with self.assertStatements(4):
+            txn = debit(self.wallet, None, WalletBucket.Type.DAILY, Decimal("9.50"), WalletTransaction.TxnType.EXPENSE)
+        self.assertEqual(txn.balance_after, Decimal("89.50"))
+        self.assertEqual(spent_today(self.wallet, WalletBucket.Type.DAILY), Decimal("10.50"))
+        with self.assertRaisesMessage(ValueError, "Insufficient funds."):
+            debit(self.wallet, None, WalletBucket.Type.DAILY, Decimal("89.51"), WalletTransaction.TxnType.EXPENSE)
+        self.assertEqual(check_wallet_chunk([self.wallet.id]), [])
+
+
+class LedgerPaginationTests(LedgerFixtures, TestCase):
+    """Pages curseur : chaque ligne une seule fois, dans l'ordre, tables vivantes et archives fusionnées."""
+
+    def setUp(self):
+        super().setUp()
+        self.topup()
+        self.topup("2000.00")
+        self.deposit()
+        for _ in range(4):
+            self.assertEqual(self.expense().status_code, 201)
+        # Les lignes les plus anciennes passent sur un mois clos, puis en archive.
+        old = timezone.now() - timedelta(days=40)
+        cutoff = timezone.now() - timedelta(days=30)
+        wallet_ids = list(WalletTransaction.objects.order_by("id").values_list("id", flat=True)[:3])
+        WalletTransaction.objects.filter(id__in=wallet_ids).update(created_at=old)
+        account = ParentAccount.objects.get(parent=self.parent)
+        account_ids = list(account.transactions.order_by("id").values_list("id", flat=True)[:2])
+        account.transactions.filter(id__in=account_ids).update(created_at=old)
+        self.assertEqual(archive_wallet_batch(cutoff, 100), 3)
+        self.assertEqual(archive_account_batch(cutoff, 100), 2)
+
+    def walk(self, client, url, link):
+        """Pages (listes d'ids) dans l'ordre de parcours, en suivant `link` jusqu'au bout."""
+        pages = []
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            pages.append([row["id"] for row in response.data["results"]])
+            url = response.data[link]
+        return pages
+
+    def assertPagesCover(self, client, url, expected):
+        pages = self.walk(client, f"{url}?page_size=2", "next")
+        self.assertEqual(sum(pages, []), expected)
+        self.assertEqual(len(pages), (len(expected) + 1) // 2)
+
+        # Retour en arrière depuis la dernière page : mêmes pages, dans l'ordre inverse.
+        response = client.get(f"{url}?page_size=2")
+        while response.data["next"]:
+            response = client.get(response.data["next"])
+        back = self.walk(client, response.data["previous"], "previous")
+        self.assertEqual(sum(reversed(back), []) + pages[-1], expected)
+
+    def test_wallet_pages_merge_archive(self):
+        wallet = self.student.wallet
+        live = list(WalletTransaction.objects.filter(wallet=wallet).values_list("created_at", "id"))
+        archived = list(wallet.archived_transactions.values_list("created_at", "id"))
+        self.assertEqual(len(archived), 3)
+        expected = [pk for _, pk in sorted(live + archived, reverse=True)]
+        self.assertPagesCover(self.student_client, "/api/wallet/me/transactions/", expected)
+        self.assertPagesCover(self.parent_client, f"/api/wallet/students/{self.student.id}/transactions/", expected)
+
+    def test_account_pages_merge_archive(self):
+        account = ParentAccount.objects.get(parent=self.parent)
+        live = list(account.transactions.values_list("created_at", "id"))
+        archived = list(account.archived_transactions.values_list("created_at", "id"))
+        self.assertEqual(len(archived), 2)
+        expected = [pk for _, pk in sorted(live + archived, reverse=True)]
+        self.assertPagesCover(self.parent_client, "/api/parent-account/me/transactions/", expected)
+
+    def test_invalid_cursor(self):
+        response = self.student_client.get("/api/wallet/me/transactions/?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, 404)
+
+
+class LedgerExportTests(LedgerFixtures, TestCase):
+    URL = "/api/wallet/me/transactions/export/"
+
+    def setUp(self):
+        super().setUp()
+        self.topup()
+        for _ in range(3):
+            self.deposit("100.00")
+        self.expense("10.00")
+
+    def read(self, response):
+        return b"".join(response.streaming_content).decode()
+
+    @override_settings(LEDGER_EXPORT_CHUNK_SIZE=2)
+    def test_export_streams_rows_through_iterator(self):
+        with mock.patch.object(QuerySet, "iterator", autospec=True, side_effect=QuerySet.iterator) as iterator:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.student_client.get(self.URL)
+            self.assertIsInstance(response, StreamingHttpResponse)
+            # Rien n'est lu avant que le client ne consomme le flux.
+            self.assertFalse([q for q in ctx.captured_queries if "wallet_wallettransaction" in q["sql"]])
+            iterator.assert_not_called()
+            body = self.read(response)
+        # Archive puis ledger vivant, chacun lu par paquets de LEDGER_EXPORT_CHUNK_SIZE.
+        self.assertEqual([c.kwargs for c in iterator.call_args_list], [{"chunk_size": 2}, {"chunk_size": 2}])
+        self.assertTrue(body)
+
+    def test_csv_content(self):
+        response = self.student_client.get(self.URL)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn('filename="wallet-transactions.csv"', response["Content-Disposition"])
+        rows = list(csv.DictReader(self.read(response).splitlines()))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual([r["txn_type"] for r in rows], ["DEPOSIT"] * 3 + ["EXPENSE"])
+        self.assertEqual([r["balance_after"] for r in rows], ["100.00", "200.00", "300.00", "290.00"])
+
+    def test_ndjson_content_and_filters(self):
+        response = self.student_client.get(f"{self.URL}?format=ndjson&txn_type=EXPENSE")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson; charset=utf-8")
+        lines = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual(len(lines), 1)
+        self.assertEqual((lines[0]["txn_type"], lines[0]["direction"], lines[0]["amount"]), ("EXPENSE", "DEBIT", "10.00"))
+
+    @override_settings(LEDGER_EXPORT_CHUNK_SIZE=100)
+    def test_peak_memory_does_not_grow_with_rows(self):
+        wallet = Wallet.objects.get(student=self.student)
+
+        def grow(count):
+            WalletTransaction.objects.bulk_create(
+                WalletTransaction(
+                    wallet=wallet,
+                    bucket_type=WalletBucket.Type.DAILY,
+                    direction=WalletTransaction.Direction.CREDIT,
+                    txn_type=WalletTransaction.TxnType.ADJUSTMENT,
+                    amount=Decimal("1.00"),
+                    description="x" * 100,
+                )
+                for _ in range(count)
+            )
+
+        def peak():
+            response = self.student_client.get(self.URL)
+            tracemalloc.start()
+            try:
+                lines = sum(1 for _ in response.streaming_content)
+                return lines, tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        grow(200)
+        small_lines, small_peak = peak()
+        grow(4000)
+        large_lines, large_peak = peak()
+        self.assertEqual(large_lines - small_lines, 4000)
+        # 20 fois plus de lignes, même pic : seul un paquet de LEDGER_EXPORT_CHUNK_SIZE est en mémoire.
+        self.assertLess(large_peak, small_peak * 1.5)
+
+
+class QueryPlanTests(LedgerFixtures, TestCase):
+    """Endpoints filtrés par dates : intervalle d'index sur created_at / occurred_at (cf. check_query_plans)."""
+
+    def setUp(self):
+        super().setUp()
+        self.topup()
+        self.deposit()
+        self.expense()
+
+    def check_plans(self, out):
+        call_command("check_query_plans", student=self.student.id, parent=self.parent.id, stdout=out)
+
+    def test_date_filtered_endpoints_use_their_index(self):
+        out = StringIO()
+        self.check_plans(out)
+        self.assertNotIn("FAIL", out.getvalue())
+        self.assertNotIn("aucune requête", out.getvalue())
+
+    def test_reports_a_date_lookup_on_the_column(self):
+        # Régression type : filtre `occurred_at__date`, qui empêche l'usage de l'index.
+        def date_lookup(field, date_from=None, date_to=None):
+            return Q(**{f"{field}__date__gte": date_from}) if date_from else Q()
+
+        out = StringIO()
+        with mock.patch("expenses.views.date_range_q", date_lookup):
+            with self.assertRaises(CommandError):
+                self.check_plans(out)
+        self.assertIn("FAIL /api/expenses/me/?", out.getvalue())
+        self.assertNotIn("FAIL /api/wallet/", out.getvalue())
+
+
+class ConcurrentMovementTests(LedgerFixtures, TransactionTestCase):
+    """
+    Dépôts et dépenses concurrents sur les mêmes lignes (compte parent, enveloppe DAILY) : aucun
+    interblocage, aucune mise à jour perdue, soldes égaux aux sommes du ledger, avec la configuration
+    de base livrée (DATABASES).
+    """
+
+    THREADS = 6
+    ROUNDS = 8
+
+    def test_concurrent_deposits_and_expenses(self):
+        self.topup("10000.00")
+        self.deposit("500.00")
+        category = get_category_for_student(self.student, category_slug="food")
+        account = ParentAccount.objects.get(parent=self.parent)
+        start = threading.Barrier(self.THREADS)
+        errors = []
+
+        def worker(index):
+            try:
+                parent = User.objects.get(pk=self.parent.pk)
+                student = User.objects.get(pk=self.student.pk)
+                start.wait()
+                for round_ in range(self.ROUNDS):
+                    if (index + round_) % 2:
+                        deposit(parent, student.id, Decimal("10.00"))
+                    else:
+                        create_expense(student, Decimal("1.00"), WalletBucket.Type.DAILY, category)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        movements = self.THREADS * self.ROUNDS // 2
+        daily = WalletBucket.objects.get(wallet__student=self.student, bucket_type=WalletBucket.Type.DAILY)
+        self.assertEqual(daily.balance, Decimal("500.00") + movements * Decimal("10.00") - movements * Decimal("1.00"))
+        before = account.balance
+        account.refresh_from_db()
+        self.assertEqual(account.balance, before - movements * Decimal("10.00"))
+        self.assertEqual(check_wallet_chunk([daily.wallet_id]), [])
+        self.assertEqual(check_account_chunk([account.id]), [])
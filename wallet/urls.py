@@ -2,19 +2,29 @@ from django.urls import path
 from .views import (
     WalletMeAPIView,
     WalletMeSettingsAPIView,
+    WalletMeBalanceAPIView,
     WalletMeTransactionsAPIView,
+    WalletMeTransactionsExportAPIView,
     WalletStudentAPIView,
     WalletStudentTransactionsAPIView,
+    WalletStudentTransactionsExportAPIView,
     DepositAPIView,
+    BulkDepositAPIView,
+    DepositGroupAPIView,
     ExpenseAPIView,
 )
 
 urlpatterns = [
     path("me/", WalletMeAPIView.as_view()),
     path("me/settings/", WalletMeSettingsAPIView.as_view()),
+    path("me/balance/", WalletMeBalanceAPIView.as_view()),
     path("me/transactions/", WalletMeTransactionsAPIView.as_view()),
+    path("me/transactions/export/", WalletMeTransactionsExportAPIView.as_view()),
     path("students/<int:student_id>/", WalletStudentAPIView.as_view()),
     path("students/<int:student_id>/transactions/", WalletStudentTransactionsAPIView.as_view()),
+    path("students/<int:student_id>/transactions/export/", WalletStudentTransactionsExportAPIView.as_view()),
     path("deposits/", DepositAPIView.as_view()),
+    path("deposits/bulk/", BulkDepositAPIView.as_view()),
+    path("deposits/<str:group_ref>/", DepositGroupAPIView.as_view()),
     path("expenses/", ExpenseAPIView.as_view()),
 ]
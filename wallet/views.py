@@ -1,22 +1,49 @@
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework import generics, permissions, status, serializers
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
-from drf_spectacular.utils import extend_schema, OpenApiExample, inline_serializer
+from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiParameter, OpenApiResponse, inline_serializer
 
 from accounts.permissions import IsStudent, IsParent
+from parent_account.serializers import ParentAccountTransactionSerializer
+from .filters import LedgerFilterBackend
+from .pagination import LedgerCursorPagination
 from .permissions import IsLinkedParent
-from .models import Wallet, WalletTransaction
+from .models import Wallet, WalletTransaction, WalletTransactionArchive
 from .serializers import (
     WalletSerializer,
     WalletTransactionSerializer,
     WalletSettingsUpdateSerializer,
     DepositSerializer,
+    BulkDepositSerializer,
     ExpenseSerializer,
 )
-from .services import get_or_create_wallet_for_student
+from .deposits import bulk_deposit, deposit_group
+from .cache import cached_wallet_payload
+from .exports import LedgerExportAPIView
+from .idempotency import IDEMPOTENCY_PARAMETER, IdempotentCreateMixin
+from .services import get_wallet_for_student, balances_at
+from .writer import run_ledger_write
 
 User = get_user_model()
 
+
+def with_allocation(qs):
+    """Allocation jointe et ses lignes préchargées : une requête de plus par page, au lieu d'une par ligne."""
+    return qs.select_related("allocation").prefetch_related("allocation__lines")
+
+
+def wallet_payload(wallet):
+    """Wallet sérialisé (avec enveloppes), servi depuis le cache versionné jusqu'à la prochaine écriture."""
+
+    def build():
+        return WalletSerializer(Wallet.objects.prefetch_related("buckets").get(pk=wallet.pk)).data
+
+    return cached_wallet_payload(wallet.id, build)
+
+
 DepositResponseSerializer = inline_serializer(
     name="DepositResponse",
     fields={
@@ -25,6 +52,50 @@ DepositResponseSerializer = inline_serializer(
     },
 )
 
+BulkDepositResponseSerializer = inline_serializer(
+    name="BulkDepositResponse",
+    fields={
+        "transfer": ParentAccountTransactionSerializer(allow_null=True),
+        "succeeded": serializers.IntegerField(),
+        "failed": serializers.IntegerField(),
+        "results": serializers.ListField(child=serializers.DictField()),
+    },
+)
+
+DepositGroupResponseSerializer = inline_serializer(
+    name="DepositGroupResponse",
+    fields={
+        "group_ref": serializers.CharField(),
+        "transfer": ParentAccountTransactionSerializer(allow_null=True),
+        "transactions": WalletTransactionSerializer(many=True),
+    },
+)
+
+WALLET_EXPORT_FIELDS = [
+    "id",
+    "created_at",
+    "bucket_type",
+    "direction",
+    "txn_type",
+    "amount",
+    "balance_after",
+    "description",
+    "external_ref",
+]
+
+EXPORT_PARAMETERS = [
+    OpenApiParameter(name="format", type=str, required=False, enum=["csv", "ndjson"], description="csv par défaut"),
+]
+
+BalanceAtResponseSerializer = inline_serializer(
+    name="WalletBalanceAt",
+    fields={
+        "at": serializers.DateTimeField(),
+        "currency": serializers.CharField(),
+        "buckets": serializers.DictField(child=serializers.CharField()),
+    },
+)
+
 ExpenseResponseSerializer = inline_serializer(
     name="ExpenseResponse",
     fields={
@@ -64,9 +135,8 @@ class WalletMeAPIView(generics.RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticated, IsStudent]
     serializer_class = WalletSerializer
 
-    def get_object(self):
-        wallet = get_or_create_wallet_for_student(self.request.user)
-        return Wallet.objects.prefetch_related("buckets").get(id=wallet.id)
+    def retrieve(self, request, *args, **kwargs):
+        return Response(wallet_payload(get_wallet_for_student(request.user)))
 
 
 @extend_schema(
@@ -93,28 +163,94 @@ class WalletMeSettingsAPIView(generics.UpdateAPIView):
     serializer_class = WalletSettingsUpdateSerializer
 
     def get_object(self):
-        return get_or_create_wallet_for_student(self.request.user)
+        return get_wallet_for_student(self.request.user)
 
 
 @extend_schema(
     tags=["Wallet"],
     summary="Lister mes transactions (Étudiant)",
     description=(
-        "Retourne l'historique des transactions du wallet de l'étudiant (ledger), trié par date décroissante.\n\n"
+        "Retourne l'historique des transactions du wallet de l'étudiant (ledger, archives incluses), "
+        "trié par date décroissante.\n\n"
         "Types usuels :\n"
         "- CREDIT / DEBIT\n"
         "- txn_type : DEPOSIT, ALLOCATION, EXPENSE, ADJUSTMENT\n\n"
-        "NB : pas de filtres dans ce MVP (tu peux les ajouter plus tard via query params)."
+        "Filtres (query params, combinables) : `txn_type`, `direction`, `bucket_type` "
+        "(plusieurs valeurs séparées par des virgules), `actor`, `min_amount` / `max_amount`, "
+        "`date_from` / `date_to` (YYYY-MM-DD).\n\n"
+        "Pagination par curseur : suivre `next` / `previous` (`page_size` optionnel)."
     ),
     responses={200: WalletTransactionSerializer(many=True)},
 )
 class WalletMeTransactionsAPIView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated, IsStudent]
     serializer_class = WalletTransactionSerializer
+    pagination_class = LedgerCursorPagination
+    filter_backends = [LedgerFilterBackend]
 
     def get_queryset(self):
-        wallet = get_or_create_wallet_for_student(self.request.user)
-        return WalletTransaction.objects.filter(wallet=wallet).order_by("-created_at")
+        return with_allocation(WalletTransaction.objects.filter(wallet__student=self.request.user)).order_by("-created_at")
+
+    def get_archive_queryset(self):
+        return with_allocation(WalletTransactionArchive.objects.filter(wallet__student=self.request.user))
+
+
+@extend_schema(
+    tags=["Wallet"],
+    summary="Exporter mes transactions (Étudiant)",
+    description=(
+        "Export complet du ledger en flux (`text/csv` ou `application/x-ndjson`), trié par date croissante.\n\n"
+        "La réponse est streamée : adaptée aux historiques volumineux."
+    ),
+    parameters=EXPORT_PARAMETERS,
+    responses={200: OpenApiResponse(description="Fichier CSV ou NDJSON")},
+)
+class WalletMeTransactionsExportAPIView(LedgerExportAPIView):
+    permission_classes = [permissions.IsAuthenticated, IsStudent]
+    export_fields = WALLET_EXPORT_FIELDS
+    export_name = "wallet-transactions"
+
+    def get_queryset(self):
+        return WalletTransaction.objects.filter(wallet__student=self.request.user)
+
+    def get_archive_queryset(self):
+        return WalletTransactionArchive.objects.filter(wallet__student=self.request.user)
+
+
+@extend_schema(
+    tags=["Wallet"],
+    summary="Soldes de mon wallet à une date donnée (Étudiant)",
+    description=(
+        "Retourne le solde de chaque enveloppe à l'instant `at` (ISO 8601), "
+        "d'après le `balance_after` de la dernière transaction antérieure.\n\n"
+        "Sans `at` : soldes actuels selon le ledger."
+    ),
+    parameters=[OpenApiParameter(name="at", type=str, required=False, description="ex: 2026-02-16T08:30:00Z")],
+    responses={200: BalanceAtResponseSerializer},
+)
+class WalletMeBalanceAPIView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated, IsStudent]
+
+    def get(self, request):
+        raw = request.query_params.get("at")
+        at = timezone.now()
+        if raw:
+            at = parse_datetime(raw)
+            if at is None:
+                raise serializers.ValidationError({"at": "Invalid datetime."})
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+
+        wallet = get_wallet_for_student(request.user)
+        buckets = balances_at(wallet, at)
+        return Response(
+            {
+                "at": at,
+                "currency": wallet.currency,
+                "buckets": {bucket_type: str(balance) for bucket_type, balance in buckets.items()},
+            },
+            status=status.HTTP_200_OK,
+        )
 
 
 @extend_schema(
@@ -131,10 +267,9 @@ class WalletStudentAPIView(generics.RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticated, IsLinkedParent]
     serializer_class = WalletSerializer
 
-    def get_object(self):
+    def retrieve(self, request, *args, **kwargs):
         student = User.objects.get(id=self.kwargs["student_id"])
-        wallet = get_or_create_wallet_for_student(student)
-        return Wallet.objects.prefetch_related("buckets").get(id=wallet.id)
+        return Response(wallet_payload(get_wallet_for_student(student)))
 
 
 @extend_schema(
@@ -143,18 +278,42 @@ class WalletStudentAPIView(generics.RetrieveAPIView):
     description=(
         "Permet à un parent de consulter l'historique des transactions (ledger) d’un étudiant "
         "**uniquement s'ils sont liés**.\n\n"
-        "Tri : date décroissante."
+        "Tri : date décroissante. Pagination par curseur (`next` / `previous`)."
     ),
     responses={200: WalletTransactionSerializer(many=True)},
 )
 class WalletStudentTransactionsAPIView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated, IsLinkedParent]
     serializer_class = WalletTransactionSerializer
+    pagination_class = LedgerCursorPagination
+    filter_backends = [LedgerFilterBackend]
 
     def get_queryset(self):
-        student = User.objects.get(id=self.kwargs["student_id"])
-        wallet = get_or_create_wallet_for_student(student)
-        return WalletTransaction.objects.filter(wallet=wallet).order_by("-created_at")
+        return with_allocation(
+            WalletTransaction.objects.filter(wallet__student_id=self.kwargs["student_id"])
+        ).order_by("-created_at")
+
+    def get_archive_queryset(self):
+        return with_allocation(WalletTransactionArchive.objects.filter(wallet__student_id=self.kwargs["student_id"]))
+
+
+@extend_schema(
+    tags=["Wallet"],
+    summary="Exporter les transactions d'un étudiant lié (Parent)",
+    description="Même export que côté étudiant, accessible au parent si lien actif.",
+    parameters=EXPORT_PARAMETERS,
+    responses={200: OpenApiResponse(description="Fichier CSV ou NDJSON")},
+)
+class WalletStudentTransactionsExportAPIView(LedgerExportAPIView):
+    permission_classes = [permissions.IsAuthenticated, IsLinkedParent]
+    export_fields = WALLET_EXPORT_FIELDS
+
+    def get_queryset(self):
+        self.export_name = f"wallet-{self.kwargs['student_id']}-transactions"
+        return WalletTransaction.objects.filter(wallet__student_id=self.kwargs["student_id"])
+
+    def get_archive_queryset(self):
+        return WalletTransactionArchive.objects.filter(wallet__student_id=self.kwargs["student_id"])
 
 
 @extend_schema(
@@ -170,6 +329,7 @@ class WalletStudentTransactionsAPIView(generics.ListAPIView):
         "⚠️ `external_ref` sert de référence (et est suffixé automatiquement par bucket : -BILLS/-SAVINGS/-DAILY)."
     ),
     request=DepositSerializer,
+    parameters=[IDEMPOTENCY_PARAMETER],
     responses={201: DepositResponseSerializer},
     examples=[
         OpenApiExample(
@@ -184,7 +344,7 @@ class WalletStudentTransactionsAPIView(generics.ListAPIView):
         ),
     ],
 )
-class DepositAPIView(generics.CreateAPIView):
+class DepositAPIView(IdempotentCreateMixin, generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated, IsParent]
     serializer_class = DepositSerializer
 
@@ -192,13 +352,101 @@ class DepositAPIView(generics.CreateAPIView):
         s = self.get_serializer(data=request.data)
         s.is_valid(raise_exception=True)
         wallet, txns = s.save()
-        wallet = Wallet.objects.prefetch_related("buckets").get(id=wallet.id)
         return Response(
             {"wallet": WalletSerializer(wallet).data, "transactions": WalletTransactionSerializer(txns, many=True).data},
             status=status.HTTP_201_CREATED,
         )
 
 
+@extend_schema(
+    tags=["Wallet"],
+    summary="Dépôts groupés vers plusieurs étudiants (Parent)",
+    description=(
+        "Finance plusieurs étudiants liés en une seule requête (ex: début de mois).\n\n"
+        "Chaque élément suit la même allocation automatique que `POST /deposits/`. "
+        "Le compte parent est débité **une seule fois** du total accepté.\n\n"
+        "Chaque élément réussit ou échoue indépendamment (`status`: OK / FAILED + `error`) : "
+        "étudiant non lié, `external_ref` déjà utilisée, solde parent insuffisant.\n\n"
+        "Réponse 201 si au moins un dépôt est passé, sinon 400."
+    ),
+    request=BulkDepositSerializer,
+    parameters=[IDEMPOTENCY_PARAMETER],
+    responses={201: BulkDepositResponseSerializer, 400: BulkDepositResponseSerializer},
+    examples=[
+        OpenApiExample(
+            "Requête (exemple)",
+            value={
+                "description": "Allowance March",
+                "items": [
+                    {"student_id": 2, "amount": "10000.00", "external_ref": "DEP-0101"},
+                    {"student_id": 5, "amount": "7500.00", "external_ref": "DEP-0102"},
+                ],
+            },
+            request_only=True,
+        ),
+    ],
+)
+class BulkDepositAPIView(IdempotentCreateMixin, generics.CreateAPIView):
+    permission_classes = [permissions.IsAuthenticated, IsParent]
+    serializer_class = BulkDepositSerializer
+
+    def create(self, request, *args, **kwargs):
+        s = self.get_serializer(data=request.data)
+        s.is_valid(raise_exception=True)
+        outcome = run_ledger_write(
+            bulk_deposit,
+            parent=request.user,
+            items=s.validated_data["items"],
+            description=s.validated_data.get("description", ""),
+        )
+
+        results = []
+        for r in outcome["results"]:
+            if "transactions" in r:
+                r = {**r, "transactions": WalletTransactionSerializer(r["transactions"], many=True).data}
+            results.append(r)
+        succeeded = sum(1 for r in results if r["status"] == "OK")
+        transfer = outcome["transfer"]
+        return Response(
+            {
+                "transfer": ParentAccountTransactionSerializer(transfer).data if transfer else None,
+                "succeeded": succeeded,
+                "failed": len(results) - succeeded,
+                "results": results,
+            },
+            status=status.HTTP_201_CREATED if succeeded else status.HTTP_400_BAD_REQUEST,
+        )
+
+
+@extend_schema(
+    tags=["Wallet"],
+    summary="Détail d'un dépôt (transfert parent + lignes par enveloppe)",
+    description=(
+        "Retourne, pour une référence de dépôt (`group_ref`, ex: DEP-0003 ou AUTO-…), "
+        "les lignes créditées sur chaque enveloppe et le transfert du compte parent qui les a financées, "
+        "en une seule lecture indexée (archives incluses).\n\n"
+        "Pour un dépôt groupé, `transfer` est le transfert unique du lot (montant total du lot).\n\n"
+        "Accessible au parent auteur du dépôt et à l'étudiant crédité ; "
+        "`transfer` vaut null pour l'étudiant."
+    ),
+    responses={200: DepositGroupResponseSerializer, 404: OpenApiResponse(description="Dépôt introuvable")},
+)
+class DepositGroupAPIView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, group_ref):
+        transfer, legs = deposit_group(request.user, group_ref)
+        if not legs:
+            raise NotFound("Deposit not found.")
+        return Response(
+            {
+                "group_ref": group_ref,
+                "transfer": ParentAccountTransactionSerializer(transfer).data if transfer else None,
+                "transactions": WalletTransactionSerializer(legs, many=True).data,
+            }
+        )
+
+
 @extend_schema(
     tags=["Wallet"],
     summary="Enregistrer une dépense (Étudiant)",
@@ -210,6 +458,7 @@ class DepositAPIView(generics.CreateAPIView):
         "Retourne le wallet mis à jour + la transaction créée."
     ),
     request=ExpenseSerializer,
+    parameters=[IDEMPOTENCY_PARAMETER],
     responses={201: ExpenseResponseSerializer},
     examples=[
         OpenApiExample(
@@ -219,7 +468,7 @@ class DepositAPIView(generics.CreateAPIView):
         ),
     ],
 )
-class ExpenseAPIView(generics.CreateAPIView):
+class ExpenseAPIView(IdempotentCreateMixin, generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated, IsStudent]
     serializer_class = ExpenseSerializer
 
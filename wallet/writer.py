@@ -0,0 +1,142 @@
+"""
+Écritures de ledger groupées (group commit), activées par `LEDGER_GROUP_COMMIT = True`.
+
+Sans ce mode, chaque mouvement ouvre sa propre transaction d'écriture : sur SQLite, tout le site se
+sérialise alors sur le verrou d'écriture de la base (chaque écriture attend son tour, cf. OPTIONS de
+DATABASES). En mode groupé, les
+mouvements sont posés dans une file en mémoire ; un thread écrivain unique par processus en prend
+jusqu'à `LEDGER_WRITER_BATCH_SIZE` (ou ce qui arrive pendant `LEDGER_WRITER_MAX_DELAY`) et les exécute
+dans une seule transaction, chacun dans son savepoint : un mouvement qui échoue (solde insuffisant...)
+n'annule que lui. Chaque appelant attend son Future, résolu après le COMMIT ; l'exception levée par le
+mouvement lui est renvoyée telle quelle.
+
+Un appel fait depuis une transaction déjà ouverte (requête avec Idempotency-Key, par exemple) est
+exécuté directement : le thread écrivain ne peut pas rejoindre la transaction de l'appelant.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+_STOP = object()
+
+
+class LedgerWriter:
+    def __init__(self, batch_size=None, max_delay=None):
+        self.batch_size = max(1, batch_size or getattr(settings, "LEDGER_WRITER_BATCH_SIZE", 50))
+        max_delay = max_delay or getattr(settings, "LEDGER_WRITER_MAX_DELAY", timedelta(milliseconds=5))
+        self.max_delay = max_delay.total_seconds()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """Met `fn(*args, **kwargs)` en file ; le Future porte son résultat une fois la transaction validée."""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((future, fn, args, kwargs))
+        return future
+
+    def stop(self):
+        """Termine le thread après les mouvements déjà en file."""
+        with self._lock:
+            if self._thread is not None:
+                self._queue.put(_STOP)
+                self._thread.join()
+                self._thread = None
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="ledger-writer", daemon=True)
+                self._thread.start()
+
+    def _next_batch(self):
+        first = self._queue.get()
+        if first is _STOP:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        try:
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    return
+                close_old_connections()
+                self._commit(batch)
+        finally:
+            connection.close()
+
+    def _commit(self, batch):
+        # Un appelant qui a abandonné (délai dépassé) avant le début du lot n'est pas exécuté.
+        batch = [item for item in batch if item[0].set_running_or_notify_cancel()]
+        outcomes = []
+        try:
+            with transaction.atomic():
+                for _, fn, args, kwargs in batch:
+                    try:
+                        with transaction.atomic():
+                            outcomes.append((True, fn(*args, **kwargs)))
+                    except Exception as exc:
+                        outcomes.append((False, exc))
+        except Exception as exc:
+            for future, *_ in batch:
+                future.set_exception(exc)
+            return
+
+        for (future, *_), (ok, value) in zip(batch, outcomes):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> LedgerWriter:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = LedgerWriter()
+    return _writer
+
+
+def run_ledger_write(fn, *args, **kwargs):
+    """
+    Exécute un mouvement d'argent (`fn` : fonction atomique qui verrouille ses lignes puis écrit le ledger).
+    En mode groupé, passe par le thread écrivain ; sinon (ou dans une transaction ouverte), appel direct.
+    """
+    if not getattr(settings, "LEDGER_GROUP_COMMIT", False) or connection.in_atomic_block:
+        return fn(*args, **kwargs)
+
+    future = get_writer().submit(fn, *args, **kwargs)
+    timeout = getattr(settings, "LEDGER_WRITER_TIMEOUT", timedelta(seconds=30)).total_seconds()
+    try:
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        if future.cancel():
+            raise
+        # Déjà en cours d'écriture : le mouvement aura lieu, on attend son issue plutôt que de l'ignorer.
+        return future.result()